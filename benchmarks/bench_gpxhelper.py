@@ -0,0 +1,46 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+import pytest
+
+pytest.importorskip("gi")
+
+from benchmarks.conftest import SIZES, get_rounds  # noqa: E402
+from pygpxviewer.helpers.gpxhelper import GpxHelper  # noqa: E402
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_get_gpx_details(benchmark, gpx_files, size):
+    # Cold parse and statistics, like a scan of the library
+    details = benchmark.pedantic(lambda: GpxHelper(str(gpx_files[size]), use_cache=False).get_gpx_details(),
+                                 rounds=get_rounds(size))
+    assert details[2] == size
+
+
+@pytest.mark.parametrize("interpolate", [False, True])
+@pytest.mark.parametrize("size", SIZES)
+def test_set_gpx_elevations(benchmark, gpx_files, dem_path, size, interpolate):
+    def setup():
+        gpx_helper = GpxHelper(str(gpx_files[size]), use_cache=False)
+        gpx_helper.track
+        return (gpx_helper, interpolate), {}
+
+    benchmark.pedantic(GpxHelper._set_gpx_elevations, setup=setup, rounds=get_rounds(size))
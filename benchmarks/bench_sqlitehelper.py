@@ -0,0 +1,87 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+import numpy as np
+import pytest
+
+from pygpxviewer.helpers.sqlitehelper import SQLiteHelper
+
+COUNTS = [1000, 100000]
+
+
+def get_gpx_records(count: int) -> list[tuple]:
+    """Get synthetic records, see SQLiteHelper.upsert_gpx_records.
+
+    :param count: Number of records
+    :type count: int
+    :returns: Full gpx records
+    :rtype: list[tuple]
+    """
+    rng = np.random.default_rng(0)
+    words = ["Col", "Lac", "Refuge", "Pointe", "Tour", "Mont", "Aiguille", "Vallon"]
+    records = []
+    for index, (latitude, longitude) in enumerate(rng.uniform((43, 5), (47, 8), (count, 2)).tolist()):
+        name = f"{words[index % len(words)]} {words[index // len(words) % len(words)]} {index}"
+        records.append((f"/home/user/gpx/{index // 100}/track_{index}.gpx", index % 3, 1000, 25.0, 800.0, 800.0,
+                        index, 100000, None, name, f"Hike number {index}", str(index % 3),
+                        latitude, longitude, latitude + 0.1, longitude + 0.1))
+    return records
+
+
+@pytest.fixture(scope="module", params=COUNTS)
+def sqlite_helper(request, tmp_path_factory):
+    db_file = tmp_path_factory.mktemp("db").joinpath("db.sqlite")
+
+    class SQLiteHelperBenchmark(SQLiteHelper):
+        _db_file = db_file
+
+    sqlite_helper = SQLiteHelperBenchmark()
+    sqlite_helper.upsert_gpx_records(get_gpx_records(request.param))
+    yield sqlite_helper
+    SQLiteHelperBenchmark.close()
+
+
+@pytest.fixture(scope="module", params=COUNTS)
+def sqlite_helper_with_pois(request, tmp_path_factory):
+    db_file = tmp_path_factory.mktemp("db").joinpath("db.sqlite")
+
+    class SQLiteHelperBenchmark(SQLiteHelper):
+        _db_file = db_file
+
+    # The spatial index is built from the poi table on creation
+    locations = np.random.default_rng(0).uniform((43, 5), (47, 8), (request.param, 2)).tolist()
+    with SQLiteHelperBenchmark().transaction() as conn:
+        conn.execute("CREATE TABLE poi (id INTEGER PRIMARY KEY, name TEXT, type TEXT, link TEXT, lat REAL, lng REAL)")
+        conn.executemany("INSERT INTO poi(name, type, link, lat, lng) VALUES(?, ?, ?, ?, ?)",
+                         [(f"poi_{index}", "refuge", f"link_{index}", latitude, longitude)
+                          for index, (latitude, longitude) in enumerate(locations)])
+    yield SQLiteHelperBenchmark()
+    SQLiteHelperBenchmark.close()
+
+
+@pytest.mark.parametrize("search_entry", ["refuge", "col lac", "track_42", "/gpx/"])
+def test_search_gpx_records(benchmark, sqlite_helper, search_entry):
+    benchmark(sqlite_helper.search_gpx_records, search_entry)
+
+
+@pytest.mark.parametrize("bounds", [(45.0, 6.0, 45.1, 6.1), (44.0, 5.0, 46.0, 7.0)], ids=["small", "large"])
+def test_search_pois_records(benchmark, sqlite_helper_with_pois, bounds):
+    benchmark(sqlite_helper_with_pois.search_pois_records, bounds)
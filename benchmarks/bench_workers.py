@@ -0,0 +1,61 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+import shutil
+
+import pytest
+
+pytest.importorskip("gi")
+
+from benchmarks.generators import write_gpx  # noqa: E402
+from pygpxviewer.helpers.sqlitehelper import SQLiteHelper  # noqa: E402
+from pygpxviewer.threads.workers import WorkerUpdateRecords  # noqa: E402
+
+POINTS = 1000
+
+
+@pytest.fixture(scope="module")
+def gpx_folders(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("library")
+    folders = {}
+    for count in [10, 100, 1000]:
+        folders[count] = folder.joinpath(str(count))
+        folders[count].mkdir()
+        for seed in range(count):
+            write_gpx(folders[count].joinpath(f"track_{seed}.gpx"), POINTS, seed=seed)
+    yield folders
+    shutil.rmtree(folder)
+
+
+@pytest.mark.parametrize("count", [10, 100, 1000])
+def test_update_records(benchmark, gsettings, gpx_folders, db_file, count):
+    # Full scan, every file is parsed again and written to the database
+    def update_records():
+        WorkerUpdateRecords(str(gpx_folders[count]), callback=lambda: None, rescan=False).run()
+
+    benchmark.pedantic(update_records, rounds=3 if count < 1000 else 1)
+    assert len(SQLiteHelper().get_gpx_records()) == count
+
+
+def test_rescan_records(benchmark, gsettings, gpx_folders, db_file):
+    # Nothing changed, only the fingerprints are compared
+    WorkerUpdateRecords(str(gpx_folders[1000]), callback=lambda: None, rescan=False).run()
+    benchmark(WorkerUpdateRecords(str(gpx_folders[1000]), callback=lambda: None).run)
@@ -0,0 +1,91 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from benchmarks.generators import get_track, write_gpx, write_hgt_files
+from pygpxviewer import config
+from pygpxviewer.helpers.demhelper import DemHelper
+
+# Number of track points of the synthetic gpx files, comma separated
+SIZES = [int(size) for size in os.environ.get("PYGPXVIEWER_BENCHMARK_SIZES", "1000,100000,1000000").split(",")]
+
+
+def get_rounds(size: int) -> int:
+    """Get the number of rounds of a benchmark, fewer for the largest files.
+
+    :param size: Number of track points
+    :type size: int
+    :returns: Number of rounds
+    :rtype: int
+    """
+    return max(1, min(10, 1_000_000 // (size * 10)))
+
+
+@pytest.fixture(scope="session")
+def gpx_files(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("gpx")
+    yield {size: write_gpx(folder.joinpath(f"track_{size}.gpx"), size, segments=2) for size in SIZES}
+
+
+@pytest.fixture(scope="session")
+def hgt_path(tmp_path_factory):
+    # Tiles of the largest track cover the smaller ones, all starting at the same location
+    dem_path = tmp_path_factory.mktemp("dem")
+    write_hgt_files(dem_path, *get_track(max(SIZES))[:2])
+    yield dem_path
+
+
+@pytest.fixture
+def dem_path(hgt_path, monkeypatch):
+    monkeypatch.setattr(config, "dem_path", hgt_path)
+    yield hgt_path
+    DemHelper.clear_cache()
+
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch):
+    from pygpxviewer.helpers.sqlitehelper import SQLiteHelper
+
+    db_file = tmp_path.joinpath("db.sqlite")
+    monkeypatch.setattr(SQLiteHelper, "_db_file", db_file)
+    yield db_file
+    SQLiteHelper.close()
+
+
+@pytest.fixture(scope="session")
+def gsettings(tmp_path_factory):
+    # Settings of the workers, compiled from the sources with their default values
+    compiler = shutil.which("glib-compile-schemas")
+    if not compiler:
+        pytest.skip("glib-compile-schemas not found")
+
+    schema_path = tmp_path_factory.mktemp("schemas")
+    shutil.copy(Path(__file__).parents[1].joinpath("data", "com.github.pygpxviewer.gschema.xml"), schema_path)
+    subprocess.run([compiler, str(schema_path)], check=True)
+    os.environ["GSETTINGS_SCHEMA_DIR"] = str(schema_path)
+    os.environ["GSETTINGS_BACKEND"] = "memory"
+    yield schema_path
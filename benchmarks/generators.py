@@ -0,0 +1,133 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""Synthetic gpx and hgt files for the benchmarks."""
+from pathlib import Path
+
+import numpy as np
+
+from pygpxviewer.helpers.demhelper import DemHelper
+
+# Step between two track points in degrees, about 10 m
+_STEP = 0.0001
+
+# Samples per side of a 3 arc-second hgt tile
+HGT_SIZE = 1201
+
+
+def get_track(points: int, seed: int = 0, latitude: float = 45.5,
+              longitude: float = 6.5) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Get a random walk track.
+
+    :param points: Number of track points
+    :type points: int
+    :param seed: Random seed
+    :type seed: int
+    :param latitude: Latitude of the first point in degrees
+    :type latitude: float
+    :param longitude: Longitude of the first point in degrees
+    :type longitude: float
+    :returns: Latitudes, longitudes and elevations
+    :rtype: tuple[np.ndarray, np.ndarray, np.ndarray]
+    """
+    rng = np.random.default_rng(seed)
+    headings = np.cumsum(rng.normal(0, 0.3, points))
+    latitudes = latitude + np.cumsum(np.cos(headings)) * _STEP
+    longitudes = longitude + np.cumsum(np.sin(headings)) * _STEP
+    elevations = 1500 + np.cumsum(rng.normal(0, 1, points))
+    return latitudes, longitudes, elevations
+
+
+def write_gpx(path: Path, points: int, segments: int = 1, seed: int = 0) -> Path:
+    """Write a gpx 1.1 file with a random walk track.
+
+    :param path: Path of the gpx file
+    :type path: Path
+    :param points: Number of track points
+    :type points: int
+    :param segments: Number of track segments
+    :type segments: int
+    :param seed: Random seed
+    :type seed: int
+    :returns: Path of the gpx file
+    :rtype: Path
+    """
+    latitudes, longitudes, elevations = get_track(points, seed)
+    times = np.datetime64("2022-01-01T00:00:00") + np.arange(points) * np.timedelta64(5, "s")
+    trkpts = [
+        f'<trkpt lat="{latitude:.7f}" lon="{longitude:.7f}"><ele>{elevation:.1f}</ele><time>{time}Z</time></trkpt>'
+        for latitude, longitude, elevation, time in zip(
+            latitudes.tolist(), longitudes.tolist(), elevations.tolist(), times.astype(str).tolist())
+    ]
+
+    bounds = np.linspace(0, points, segments + 1).astype(int)
+    trksegs = "".join(
+        "<trkseg>" + "\n".join(trkpts[start:end]) + "</trkseg>\n"
+        for start, end in zip(bounds, bounds[1:])
+    )
+    path.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="benchmarks">\n'
+        f"<metadata><name>Track {seed}</name><desc>Synthetic track of {points} points</desc>"
+        "<keywords>0</keywords></metadata>\n"
+        f"<trk><name>Track {seed}</name>\n{trksegs}</trk>\n</gpx>\n",
+        encoding="utf-8")
+    return path
+
+
+def write_hgt(path: Path, seed: int = 0, size: int = HGT_SIZE) -> Path:
+    """Write a hgt file with a smooth random terrain.
+
+    :param path: Path of the hgt file
+    :type path: Path
+    :param seed: Random seed
+    :type seed: int
+    :param size: Samples per side
+    :type size: int
+    :returns: Path of the hgt file
+    :rtype: Path
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 2 * np.pi, size)
+    frequencies, phases = rng.uniform(1, 8, (2, 4)), rng.uniform(0, 2 * np.pi, (2, 4))
+    rows = sum(np.sin(frequency * x + phase) for frequency, phase in zip(frequencies[0], phases[0]))
+    columns = sum(np.cos(frequency * x + phase) for frequency, phase in zip(frequencies[1], phases[1]))
+    samples = 1500 + 200 * np.add.outer(rows, columns) + rng.normal(0, 5, (size, size))
+    samples.astype(">i2").tofile(path)
+    return path
+
+
+def write_hgt_files(dem_path: Path, latitudes: np.ndarray, longitudes: np.ndarray) -> set[str]:
+    """Write the hgt files covering a track.
+
+    :param dem_path: Folder of the hgt files
+    :type dem_path: Path
+    :param latitudes: Latitudes in degrees
+    :type latitudes: np.ndarray
+    :param longitudes: Longitudes in degrees
+    :type longitudes: np.ndarray
+    :returns: Hgt file names
+    :rtype: set[str]
+    """
+    hgt_file_names = DemHelper(dem_path).get_hgt_file_names(latitudes, longitudes)
+    for seed, hgt_file_name in enumerate(sorted(hgt_file_names)):
+        write_hgt(dem_path.joinpath(hgt_file_name), seed)
+    return hgt_file_names
@@ -21,6 +21,7 @@
 #  SOFTWARE.
 import os
 import subprocess
+from pathlib import Path
 
 import click
 
@@ -77,6 +78,23 @@ def tests():
     call_with_output(cmd, echo_stdout=True)
 
 
+@cli.command()
+@click.option('-k', '--keyword', default=None, help="Only run the benchmarks matching the keyword")
+@click.option('-s', '--sizes', default="1000,100000,1000000", help="Track points of the synthetic gpx files")
+@click.option('--compare/--no-compare', default=True, help="Compare with the last saved run")
+@click.option('--fail', default="mean:10%", help="Fail on regressions above this threshold")
+def benchmarks(keyword, sizes, compare, fail):
+    click.echo("Run benchmarks...")
+    os.environ["PYGPXVIEWER_BENCHMARK_SIZES"] = sizes
+    cmd = ["pytest", "benchmarks", "-o", "python_files=bench_*.py", "--benchmark-autosave",
+           "--benchmark-storage=file://.benchmarks"]
+    if keyword:
+        cmd.extend(["-k", keyword])
+    if compare and list(Path(".benchmarks").glob("*/*.json")):
+        cmd.extend(["--benchmark-compare", f"--benchmark-compare-fail={fail}"])
+    call_with_output(cmd, echo_stdout=True, timeout=None)
+
+
 @cli.command()
 def locales():
     click.echo("Update .pot file...")
@@ -20,10 +20,15 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
+import sys
+import time
 from gettext import gettext as _
+from typing import Optional
 
-from gi.repository import Adw, Gio, GLib
+from gi.repository import Adw, Gdk, Gio, GLib
 
+from pygpxviewer.logger import Logger
+from pygpxviewer.profiler import Profiler
 from pygpxviewer.window import Window
 
 
@@ -32,7 +37,19 @@ class Application(Adw.Application):
 
     __gtype_name__ = "Application"
 
-    def __init__(self, application_id: str, version: str):
+    # Modules imported on first use, listed by --profile-startup if imported before the first frame
+    _DEFERRED_MODULES = ["gpxpy", "lxml", "matplotlib", "numpy", "requests"]
+
+    def __init__(self, application_id: str, version: str, start_time: Optional[float] = None):
+        """Init method.
+
+        :param application_id: Application id
+        :type application_id: str
+        :param version: Application version
+        :type version: str
+        :param start_time: time.perf_counter value at the start of the process
+        :type start_time: Optional[float]
+        """
         super().__init__(
             application_id=application_id,
             flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE)
@@ -42,6 +59,10 @@ class Application(Adw.Application):
 
         self._version = version
         self._app_window = None
+        self._profile_dump = None
+        self._profile_startup = False
+        self._start_time = start_time if start_time is not None else time.perf_counter()
+        self._after_paint_id = None
 
         self.add_main_option(
             long_name="version",
@@ -51,17 +72,63 @@ class Application(Adw.Application):
             description=_("Show the current version of pygpxviewer"),
             arg_description=None,
         )
+        self.add_main_option(
+            long_name="profile-dump",
+            short_name=0,
+            flags=GLib.OptionFlags.NONE,
+            arg=GLib.OptionArg.STRING,
+            description=_("Write the profiler timings to a json file on exit"),
+            arg_description=_("FILE"),
+        )
+        self.add_main_option(
+            long_name="profile-startup",
+            short_name=0,
+            flags=GLib.OptionFlags.NONE,
+            arg=GLib.OptionArg.NONE,
+            description=_("Show the import and first frame timings"),
+            arg_description=None,
+        )
 
     def do_startup(self):
         """Start the application."""
         Adw.Application.do_startup(self)
+        # Logging must not block the main loop and the workers
+        Logger.set_async(True)
+
+    def do_shutdown(self):
+        """Shutdown the application."""
+        if self._profile_dump:
+            Profiler.dump(self._profile_dump)
+        Logger.set_async(False)
+        Adw.Application.do_shutdown(self)
 
     def do_activate(self):
         """Activate the application."""
         if not self._app_window:
-            self._app_window = Window(application=self)
+            with Profiler.span("startup.window"):
+                self._app_window = Window(application=self)
             self._app_window.set_default_icon_name(self.props.application_id)
-        self._app_window.present()
+            self._app_window.present()
+
+            frame_clock = self._app_window.get_frame_clock()
+            self._after_paint_id = frame_clock.connect("after-paint", self._on_first_frame)
+        else:
+            self._app_window.present()
+
+    def _on_first_frame(self, frame_clock: Gdk.FrameClock) -> None:
+        frame_clock.disconnect(self._after_paint_id)
+        Profiler.record("startup.first_frame", time.perf_counter() - self._start_time)
+        if self._profile_startup:
+            self._print_startup_profile()
+
+    def _print_startup_profile(self) -> None:
+        print(_("Startup timings:"))
+        for name, summary in Profiler.get_summaries().items():
+            if name.startswith("startup.") or name == "worker.get_records":
+                print(f"    {name:<24}{summary['total'] * 1000:>10.1f} ms")
+
+        modules = [module for module in self._DEFERRED_MODULES if module in sys.modules]
+        print(_("Deferred modules imported before the first frame: ") + (", ".join(modules) or "-"))
 
     def do_command_line(self, command_line):
         """Command line handler."""
@@ -70,5 +137,9 @@ class Application(Adw.Application):
         if "version" in options:
             print(_(f"pygpxviewer {self._version}"))
             return 0
+        if "profile-dump" in options:
+            self._profile_dump = options["profile-dump"]
+        if "profile-startup" in options:
+            self._profile_startup = True
         self.activate()
         return 0
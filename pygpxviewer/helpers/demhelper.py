@@ -0,0 +1,205 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import math
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from pygpxviewer import config
+
+# Void samples in hgt files
+HGT_VOID = -32768
+# Samples per row of the 3 and 1 arc-second hgt files
+HGT_SIZES = (1201, 3601)
+
+
+class DemHelper:
+    """Helper to sample elevations from hgt files.
+
+    Hgt files are memory-mapped as big-endian int16 views and shared by all
+    the instances of the helper. The least recently used tiles are evicted
+    when more than max_tiles tiles are opened.
+    """
+
+    _tiles: OrderedDict[Path, np.ndarray] = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, dem_path: Optional[Path] = None, max_tiles: int = 16):
+        """Init method.
+
+        :param dem_path: Folder of the hgt files, the cache folder by default
+        :type dem_path: Optional[Path]
+        :param max_tiles: Maximum number of memory-mapped tiles
+        :type max_tiles: int
+        """
+        self._dem_path = Path(dem_path or config.dem_path)
+        self._max_tiles = max_tiles
+
+    @staticmethod
+    def get_hgt_file_name(latitude: float, longitude: float) -> str:
+        """Get the name of the hgt file of a location.
+
+        :param latitude: Latitude in degrees
+        :type latitude: float
+        :param longitude: Longitude in degrees
+        :type longitude: float
+        :returns: Hgt file name
+        :rtype: str
+        """
+        north_south = 'N' if latitude >= 0 else 'S'
+        east_west = 'E' if longitude >= 0 else 'W'
+        return '%s%s%s%s.hgt' % (north_south, str(int(abs(math.floor(latitude)))).zfill(2),
+                                 east_west, str(int(abs(math.floor(longitude)))).zfill(3))
+
+    def get_hgt_file_names(self, latitudes: np.ndarray, longitudes: np.ndarray) -> set[str]:
+        """Get the names of the hgt files covering many locations.
+
+        :param latitudes: Latitudes in degrees
+        :type latitudes: np.ndarray
+        :param longitudes: Longitudes in degrees
+        :type longitudes: np.ndarray
+        :returns: Hgt file names
+        :rtype: set[str]
+        """
+        tiles = np.unique(np.column_stack((np.floor(latitudes), np.floor(longitudes))), axis=0)
+        return {self.get_hgt_file_name(latitude, longitude) for latitude, longitude in tiles}
+
+    def get_hgt_file_names_in_bounds(self, bounds: tuple[float, float, float, float]) -> set[str]:
+        """Get the names of the hgt files intersecting boundaries.
+
+        :param bounds: Boundaries as (min_lat, min_lng, max_lat, max_lng)
+        :type bounds: tuple[float, float, float, float]
+        :returns: Hgt file names
+        :rtype: set[str]
+        """
+        min_latitude, min_longitude, max_latitude, max_longitude = bounds
+        return {
+            self.get_hgt_file_name(latitude, longitude)
+            for latitude in range(math.floor(min_latitude), math.floor(max_latitude) + 1)
+            for longitude in range(math.floor(min_longitude), math.floor(max_longitude) + 1)
+        }
+
+    def get_elevations(self, latitudes: np.ndarray, longitudes: np.ndarray,
+                       interpolate: bool = False) -> np.ndarray:
+        """Get the elevations of many locations.
+
+        Locations are grouped by tile so that each tile is read once.
+
+        :param latitudes: Latitudes in degrees
+        :type latitudes: np.ndarray
+        :param longitudes: Longitudes in degrees
+        :type longitudes: np.ndarray
+        :param interpolate: Use a bilinear interpolation instead of the nearest sample
+        :type interpolate: bool
+        :returns: Elevations in m, NaN if the tile or the sample is missing
+        :rtype: np.ndarray
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        elevations = np.full(latitudes.shape, np.nan)
+
+        tile_latitudes = np.floor(latitudes)
+        tile_longitudes = np.floor(longitudes)
+        tiles, inverse = np.unique(np.column_stack((tile_latitudes, tile_longitudes)), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        for index, (tile_latitude, tile_longitude) in enumerate(tiles):
+            tile = self.get_tile(self.get_hgt_file_name(tile_latitude, tile_longitude))
+            if tile is None:
+                continue
+
+            mask = inverse == index
+            size = tile.shape[0] - 1
+            rows = (tile_latitude + 1 - latitudes[mask]) * size
+            columns = (longitudes[mask] - tile_longitude) * size
+            elevations[mask] = self._sample(tile, rows, columns, interpolate)
+
+        return elevations
+
+    def get_tile(self, hgt_file_name: str) -> Optional[np.ndarray]:
+        """Get the samples of a hgt file.
+
+        :param hgt_file_name: Hgt file name
+        :type hgt_file_name: str
+        :returns: Square big-endian int16 array, None if the file is missing or invalid
+        :rtype: Optional[np.ndarray]
+        """
+        hgt_file_path = self._dem_path.joinpath(hgt_file_name)
+        with self._lock:
+            tile = self._tiles.get(hgt_file_path)
+            if tile is not None:
+                self._tiles.move_to_end(hgt_file_path)
+                return tile
+
+            try:
+                tile = np.memmap(hgt_file_path, dtype=">i2", mode="r")
+            except (FileNotFoundError, ValueError):
+                return None
+
+            # Truncated files left by an interrupted copy are ignored
+            size = next((size for size in HGT_SIZES if tile.size == size * size), None)
+            if size is None:
+                return None
+            tile = tile.reshape(size, size)
+
+            self._tiles[hgt_file_path] = tile
+            while len(self._tiles) > self._max_tiles:
+                self._tiles.popitem(last=False)
+            return tile
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Close all the memory-mapped tiles."""
+        with cls._lock:
+            cls._tiles.clear()
+
+    @staticmethod
+    def _sample(tile: np.ndarray, rows: np.ndarray, columns: np.ndarray, interpolate: bool) -> np.ndarray:
+        size = tile.shape[0] - 1
+        nearest = tile[np.clip(np.rint(rows), 0, size).astype(np.intp),
+                       np.clip(np.rint(columns), 0, size).astype(np.intp)].astype(np.float64)
+        nearest[nearest == HGT_VOID] = np.nan
+        if not interpolate:
+            return nearest
+
+        rows = np.clip(rows, 0, size)
+        columns = np.clip(columns, 0, size)
+        row_indexes = np.minimum(np.floor(rows).astype(np.intp), size - 1)
+        column_indexes = np.minimum(np.floor(columns).astype(np.intp), size - 1)
+        row_ratios = rows - row_indexes
+        column_ratios = columns - column_indexes
+
+        corners = np.stack((tile[row_indexes, column_indexes], tile[row_indexes, column_indexes + 1],
+                            tile[row_indexes + 1, column_indexes], tile[row_indexes + 1, column_indexes + 1]))
+        corners = corners.astype(np.float64)
+        corners[corners == HGT_VOID] = np.nan
+
+        top = corners[0] * (1 - column_ratios) + corners[1] * column_ratios
+        bottom = corners[2] * (1 - column_ratios) + corners[3] * column_ratios
+        elevations = top * (1 - row_ratios) + bottom * row_ratios
+
+        # Fall back to the nearest sample next to voids
+        return np.where(np.isnan(elevations), nearest, elevations)
@@ -19,23 +19,58 @@
 #  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
+
+import hashlib
+import shutil
+import threading
+import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from gettext import gettext as _
 from pathlib import Path
+from typing import Callable, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from pygpxviewer import config
+from pygpxviewer import config, utils
 from pygpxviewer.logger import Logger
+from pygpxviewer.profiler import Profiler
 
 logger = Logger()
 
 
 class DownloadHelper:
-    """Helper to download files from the web."""
+    """Helper to download files from the web.
+
+    Zip folders are downloaded concurrently by a bounded pool of threads,
+    each one with its own pooled HTTP session. Bodies are streamed in
+    chunks to a temporary file per download, which is kept on failure so
+    that the next attempt resumes it with a Range request.
+    """
+
+    _CHUNK_SIZE = 1 << 16
+    _TIMEOUT = (10, 60)
+
+    def __init__(self, urls: list[dict], workers: int = 4,
+                 progress_callback: Optional[Callable[[int, int], None]] = None):
+        """Init method.
 
-    def __init__(self, urls):
+        :param urls: List of dict with the folder name, the size and the link of zip folders
+        :type urls: list[dict]
+        :param workers: Maximum number of concurrent downloads
+        :type workers: int
+        :param progress_callback: Called with the downloaded and the total bytes
+        :type progress_callback: Optional[Callable[[int, int], None]]
+        """
         self._urls = urls
+        self._size = sum(int(url["size"]) for url in self._urls)
+        self._workers = workers
+        self._progress_callback = progress_callback
+
+        self._downloaded = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
 
     def get_size_in_mb(self) -> float:
         """Get the size in MB of all the zip folders in the url list.
@@ -43,43 +78,95 @@ class DownloadHelper:
         :return: size in MB
         :rtype: float
         """
-        size = [int(url["size"]) for url in self._urls]
-        return round(sum(size) / 1000 / 1000, 1)
+        return round(self._size / 1000 / 1000, 1)
 
     def fetch_urls(self):
         """Download and extract zip files from the web."""
-        zip_path = config.dem_path.joinpath("tmp.zip")
-        for url in self._urls:
-            folder = url["folder"]
-            link = url["link"]
-            size = round(url['size'] / 1000 / 1000, 1)
-            logger.info(_(f"Folder: {folder}, Size: {size} MB"))
-
-            try:
-                r = requests.get(link, allow_redirects=True)
-                r.raise_for_status()
-            except requests.exceptions.HTTPError as e:
-                logger.warning(f"HTTPError occurred: {e}")
-            except requests.exceptions.ConnectionError as e:
-                logger.warning(f"ConnectionError occurred: {e}")
-            except requests.exceptions.Timeout as e:
-                logger.warning(f"Timeout occurred: {e}")
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"RequestException occurred: {e}")
-            else:
-                with open(zip_path, 'wb') as file:
-                    file.write(r.content)
-                    self._extract_zip(zip_path)
-
-        if zip_path.is_file():
+        self._downloaded = 0
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            list(executor.map(self._fetch_url, self._urls))
+
+    def _fetch_url(self, url: dict) -> None:
+        folder = url["folder"]
+        link = url["link"]
+        size = round(url['size'] / 1000 / 1000, 1)
+        logger.info(_("Folder: %s, Size: %s MB"), folder, size)
+
+        zip_path = self._get_zip_path(link, folder)
+        part_path = zip_path.with_name(zip_path.name + ".part")
+        offset = part_path.stat().st_size if part_path.is_file() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        try:
+            with self._get_session().get(link, headers=headers, stream=True, allow_redirects=True,
+                                         timeout=self._TIMEOUT) as r:
+                # The temporary file is already complete
+                if offset and r.status_code == requests.codes.requested_range_not_satisfiable:
+                    self._add_progress(offset)
+                else:
+                    r.raise_for_status()
+                    if r.status_code != requests.codes.partial_content:
+                        offset = 0
+                    self._add_progress(offset)
+
+                    start, downloaded = time.perf_counter(), 0
+                    with open(part_path, "ab" if offset else "wb") as file:
+                        for chunk in r.iter_content(chunk_size=self._CHUNK_SIZE):
+                            file.write(chunk)
+                            downloaded += len(chunk)
+                            self._add_progress(len(chunk))
+                    elapsed = time.perf_counter() - start
+                    if elapsed > 0:
+                        Profiler.record("download.speed", downloaded / elapsed, "B/s")
+        except requests.exceptions.HTTPError as e:
+            logger.warning("HTTPError occurred: %s", e)
+        except requests.exceptions.ConnectionError as e:
+            logger.warning("ConnectionError occurred: %s", e)
+        except requests.exceptions.Timeout as e:
+            logger.warning("Timeout occurred: %s", e)
+        except requests.exceptions.RequestException as e:
+            logger.warning("RequestException occurred: %s", e)
+        else:
+            part_path.replace(zip_path)
+            with Profiler.span("download.extract"):
+                self._extract_zip(zip_path)
             zip_path.unlink()
 
+    def _get_session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self._workers, pool_maxsize=self._workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+        return session
+
+    def _add_progress(self, size: int) -> None:
+        if not size:
+            return
+        with self._lock:
+            self._downloaded += size
+            downloaded = self._downloaded
+        if self._progress_callback:
+            self._progress_callback(downloaded, self._size)
+
+    @staticmethod
+    def _get_zip_path(link: str, folder: str) -> Path:
+        # Folder names are not unique across the DEM regions
+        link_hash = hashlib.sha1(link.encode("utf-8")).hexdigest()[:8]
+        return config.dem_path.joinpath(f"{link_hash}-{Path(folder).name}")
+
     @staticmethod
-    def _extract_zip(zip_path):
-        with zipfile.ZipFile(zip_path) as z:
-            filenames = [filename for filename in z.namelist() if Path(filename).suffix == ".hgt"]
-            for filename in filenames:
-                file_path = config.dem_path.joinpath(filename.split("/")[-1])
-                with open(file_path, "wb") as f:
-                    f.write(z.read(filename))
-            logger.info(_(f"Files: {filenames}"))
+    def _extract_zip(zip_path: Path) -> None:
+        try:
+            with zipfile.ZipFile(zip_path) as z:
+                filenames = [filename for filename in z.namelist() if Path(filename).suffix == ".hgt"]
+                for filename in filenames:
+                    file_path = config.dem_path.joinpath(filename.split("/")[-1])
+                    # An interrupted extraction must not leave a truncated tile
+                    with z.open(filename) as src, utils.atomic_write(file_path) as dst:
+                        shutil.copyfileobj(src, dst, DownloadHelper._CHUNK_SIZE)
+                logger.info(_("Files: %s"), filenames)
+        except zipfile.BadZipFile as e:
+            logger.warning("BadZipFile occurred: %s", e)
@@ -0,0 +1,132 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+import gpxpy.gpx
+
+from pygpxviewer.helpers.gpxtrack import GpxStats, GpxTrack
+
+
+class GpxCacheEntry(NamedTuple):
+    """Parsed content of a gpx file as read from disk."""
+
+    fingerprint: tuple[int, int]
+    gpx: gpxpy.gpx.GPX
+    track: Optional[GpxTrack]
+    stats: Optional[GpxStats]
+    size: int
+
+
+class GpxCache:
+    """Process-wide cache of parsed gpx files.
+
+    Entries are keyed on the file path and only returned while the file
+    modification time and size are unchanged. Cached objects are shared by
+    all the helpers and must not be modified. The least recently used
+    entries are evicted when the estimated memory of the entries exceeds
+    max_size.
+    """
+
+    # Estimated memory of the gpxpy objects compared to the file size
+    _GPX_SIZE_FACTOR = 5
+
+    _entries: OrderedDict[str, GpxCacheEntry] = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, max_size: int = 256 * 1024 * 1024):
+        """Init method.
+
+        :param max_size: Memory budget of the cache in bytes
+        :type max_size: int
+        """
+        self._max_size = max_size
+
+    def get(self, path: str, fingerprint: tuple[int, int]) -> Optional[GpxCacheEntry]:
+        """Get the parsed content of a gpx file.
+
+        :param path: Path of the gpx file
+        :type path: str
+        :param fingerprint: Current modification time and size of the file
+        :type fingerprint: tuple[int, int]
+        :returns: Cache entry, None if missing or outdated
+        :rtype: Optional[GpxCacheEntry]
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.fingerprint != tuple(fingerprint):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, path: str, fingerprint: tuple[int, int], gpx: gpxpy.gpx.GPX,
+            track: Optional[GpxTrack] = None, stats: Optional[GpxStats] = None) -> None:
+        """Add or replace the parsed content of a gpx file.
+
+        :param path: Path of the gpx file
+        :type path: str
+        :param fingerprint: Modification time and size of the file when it was read or written
+        :type fingerprint: tuple[int, int]
+        :param gpx: Gpx object matching the file content
+        :type gpx: gpxpy.gpx.GPX
+        :param track: Columnar track of the gpx object
+        :type track: Optional[GpxTrack]
+        :param stats: Statistics of the track
+        :type stats: Optional[GpxStats]
+        """
+        size = fingerprint[1] * self._GPX_SIZE_FACTOR
+        if track is not None:
+            size += sum(array.nbytes for array in (
+                track.latitudes, track.longitudes, track.elevations, track.times, track.distances_2d,
+                track.distances))
+        if size > self._max_size:
+            return
+
+        key = os.path.abspath(path)
+        with self._lock:
+            self._entries[key] = GpxCacheEntry((fingerprint[0], fingerprint[1]), gpx, track, stats, size)
+            self._entries.move_to_end(key)
+            total_size = sum(entry.size for entry in self._entries.values())
+            while total_size > self._max_size:
+                _, entry = self._entries.popitem(last=False)
+                total_size -= entry.size
+
+    def discard(self, path: str) -> None:
+        """Remove the parsed content of a gpx file.
+
+        :param path: Path of the gpx file
+        :type path: str
+        """
+        with self._lock:
+            self._entries.pop(os.path.abspath(path), None)
+
+    @classmethod
+    def clear(cls) -> None:
+        """Remove all the entries."""
+        with cls._lock:
+            cls._entries.clear()
@@ -19,30 +19,68 @@
 #  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
+import copy
 import math
 import os
-from typing import Optional
+import re
+import shutil
+from typing import Callable, Optional
+from xml.sax.saxutils import escape
 
 import gpxpy
 import gpxpy.gpx
-from gmalthgtparser import HgtParser
+import numpy as np
 from gpxpy import geo
-from lxml import etree
 
 from pygpxviewer import config, utils
-from pygpxviewer.helpers.downloadhelper import DownloadHelper
+from pygpxviewer.helpers.demhelper import DemHelper
+from pygpxviewer.helpers.gpxcache import GpxCache
+from pygpxviewer.helpers.gpxtrack import GpxStats, GpxTrack
 from pygpxviewer.helpers.sqlitehelper import SQLiteHelper
+from pygpxviewer.logger import Logger
+from pygpxviewer.profiler import Profiler
+
+logger = Logger()
+
+
+# Byte patterns of the gpx 1.1 header used to patch the keywords in place
+_XML_ENCODING = re.compile(rb"<\?xml[^>]*encoding\s*=\s*[\"']([^\"']+)[\"']")
+_GPX_START_TAG = re.compile(rb"<gpx\b[^>]*>")
+_GPX_VERSION_1_1 = re.compile(rb"\bversion\s*=\s*[\"']1\.1[\"']")
+_GPX_FIRST_CHILD = re.compile(rb"<(metadata|wpt|rte|trk|extensions|/gpx)\b[^>]*>")
+_GPX_KEYWORDS = re.compile(rb"<keywords\s*/>|<keywords\s*>.*?</keywords\s*>", re.DOTALL)
+_GPX_AFTER_KEYWORDS = re.compile(rb"<bounds\b|<extensions\b|</metadata\s*>")
 
 
 class GpxHelper:
-    """Helper to handle gpx file content."""
+    """Helper to handle gpx file content.
+
+    Parsed files are shared through a process-wide GpxCache, the gpx
+    object is parsed again before being modified.
+    """
 
-    def __init__(self, gpx_file):
+    def __init__(self, gpx_file: str, use_cache: bool = True):
+        """Init method.
+
+        :param gpx_file: Path of the gpx file
+        :type gpx_file: str
+        :param use_cache: Read and fill the parsed gpx files cache
+        :type use_cache: bool
+        """
         super().__init__()
 
         self._gpx: Optional[gpxpy.gpx.GPX] = None
         self._gpx_file = gpx_file
-        self._update = False
+        self._track: Optional[GpxTrack] = None
+        self._stats: Optional[GpxStats] = None
+
+        self._cache = GpxCache() if use_cache else None
+        # Fingerprint of the file matching the gpx object, None once modified
+        self._fingerprint: Optional[tuple[int, int]] = None
+        # The gpx object is shared through the cache
+        self._shared = False
+        # Name, description and keywords kept once the gpx object is released
+        self._metadata: Optional[tuple] = None
 
     @property
     def gpx(self) -> gpxpy.gpx.GPX:
@@ -51,9 +89,8 @@ class GpxHelper:
         :returns: Gpx object
         :rtype: gpxpy.gpx.GPX
         """
-        if self._gpx is None or self._update:
-            self._gpx = gpxpy.parse(open(self._gpx_file, 'r'))
-            self._update = False
+        if self._gpx is None:
+            return self._load_gpx()
         return self._gpx
 
     @gpx.setter
@@ -64,6 +101,44 @@ class GpxHelper:
         :type value: gpxpy.gpx.GPX
         """
         self._gpx = value
+        self._fingerprint = None
+        self._shared = False
+        self._metadata = None
+        self._invalidate()
+
+    @property
+    def track(self) -> GpxTrack:
+        """Get the columnar representation of the track points.
+
+        The track is built once and cached until the gpx object is changed.
+
+        :returns: Columnar track
+        :rtype: GpxTrack
+        """
+        if self._track is None:
+            # Loading the gpx object may get the track from the cache
+            gpx = self.gpx
+            if self._track is None:
+                with Profiler.span("gpx.track"):
+                    self._track = GpxTrack.from_gpx(gpx)
+                self._cache_gpx()
+        return self._track
+
+    @property
+    def stats(self) -> GpxStats:
+        """Get the statistics of the track points.
+
+        Statistics are computed once and cached until the track is changed.
+
+        :returns: Track statistics
+        :rtype: GpxStats
+        """
+        track = self.track
+        if self._stats is None:
+            with Profiler.span("gpx.stats"):
+                self._stats = track.get_stats()
+            self._cache_gpx()
+        return self._stats
 
     def get_gpx_details(self) -> tuple:
         """Get main properties of a gpx file.
@@ -79,62 +154,70 @@ class GpxHelper:
         :returns: Main gpx properties
         :rtype: tuple
         """
+        stats = self.stats
         return (
             str(self._gpx_file),
             self.get_gpx_mode(),
-            self.gpx.get_points_no(),
-            self.gpx.length_3d() / 1000,
-            self.gpx.get_uphill_downhill()[0],
-            self.gpx.get_uphill_downhill()[1]
+            stats.points,
+            stats.length_3d / 1000,
+            stats.up_hill,
+            stats.down_hill
         )
 
-    def get_gpx_locations(self) -> list[list[float]]:
-        """Get all the locations of a gpx file.
+    def get_gpx_metadata(self) -> tuple:
+        """Get searchable metadata of a gpx file.
+
+        Metadata are the name, the description and the keywords of the gpx
+        file, the first track name and description are used as fallbacks.
 
-        :returns: List of all the locations
-        :rtype: list[list[float]
+        :returns: Name, description and keywords
+        :rtype: tuple
         """
-        return [[point_data[0].latitude, point_data[0].longitude] for point_data in self.gpx.get_points_data()]
+        if self._gpx is None and self._metadata is not None:
+            return self._metadata
 
-    def get_gpx_distances_and_elevations(self) -> tuple:
-        """Get the distance and elevation values for all the locations in a gpx file.
+        tracks = self.gpx.tracks
+        name = self.gpx.name or next((track.name for track in tracks if track.name), None)
+        description = self.gpx.description or next(
+            (track.description for track in tracks if track.description), None)
+        return name, description, self.gpx.keywords
+
+    def get_gpx_record(self, fingerprint: tuple) -> tuple:
+        """Get a full database record of a gpx file.
 
-        :returns: Distance and elevation values
+        :param fingerprint: File fingerprint as (mtime, size, hash)
+        :type fingerprint: tuple
+        :returns: Gpx details followed by the fingerprint, the metadata and the bounds
         :rtype: tuple
         """
-        distances = []
-        elevations = []
-        for point_data in self.gpx.get_points_data():
-            distances.append(point_data[1] / 1000)
-            elevations.append(point_data[0].elevation)
-        return distances, elevations
+        bounds = self.stats.bounds or (None, None, None, None)
+        return self.get_gpx_details() + tuple(fingerprint) + self.get_gpx_metadata() + bounds
+
+    def get_gpx_locations(self) -> np.ndarray:
+        """Get all the locations of a gpx file.
 
-    def get_gpx_lat_lng_from_distance(self, length: float, distance: float) -> Optional[tuple[float, float]]:
-        """Get the closest location based on the distance from the first point.
+        :returns: Latitude and longitude of all the locations
+        :rtype: np.ndarray
+        """
+        return np.column_stack((self.track.latitudes, self.track.longitudes))
 
-        Delta variable is used for rendering purposes
+    def get_gpx_distances_and_elevations(self) -> tuple[np.ndarray, np.ndarray]:
+        """Get the distance and elevation values for all the locations in a gpx file.
+
+        :returns: Distance values in km and elevation values in m
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+        return self.track.distances / 1000, self.track.elevations
+
+    def get_gpx_lat_lng_from_distance(self, distance: float) -> Optional[tuple[float, float]]:
+        """Get the location based on the distance from the first point.
 
-        :param length: Length of the gpx file in km
-        :type length: float
         :param distance: Distance from the first point in km
         :type distance: float
         :returns: Location latitude and longitude
-        :rtype: tuple[float, float]
+        :rtype: Optional[tuple[float, float]]
         """
-        delta = 1.00
-        if length <= 500:
-            delta = 0.05
-        elif length <= 800:
-            delta = 0.10
-        elif length <= 1000:
-            delta = 0.25
-        elif length <= 10000:
-            delta = 0.50
-
-        for point_data in self.gpx.get_points_data():
-            if abs(point_data[1] / 1000 - distance) <= delta:
-                return point_data[0].latitude, point_data[0].longitude
-        return None
+        return self.track.get_location(distance * 1000)
 
     def get_gpx_distance_between_locations(self, min_latitude: float, min_longitude: float, max_latitude: float,
                                            max_longitude: float) -> Optional[float]:
@@ -155,7 +238,19 @@ class GpxHelper:
         end_location = geo.Location(max_latitude, max_longitude)
         return start_location.distance_3d(end_location)
 
-    def set_gpx_details(self, clean_headers, clean_attributes, elevation, simplify):
+    def release_gpx(self) -> None:
+        """Drop the gpx object, keeping its track, statistics and metadata.
+
+        The gpx object is parsed again if it is needed later, to modify the
+        file for instance.
+        """
+        self.stats
+        self._metadata = self.get_gpx_metadata()
+        self._gpx = None
+        self._shared = False
+
+    def set_gpx_details(self, clean_headers, clean_attributes, elevation, simplify, elevation_interpolation=False,
+                        simplify_tolerance=5.0, simplify_max_points=0, *, download_hgt_files=True):
         """Set many attributes to a gpx file.
 
         :param clean_attributes: Remove specific unused nodes
@@ -166,7 +261,17 @@ class GpxHelper:
         :type simplify: bool
         :param elevation: Add missing elevation data
         :type elevation: bool
+        :param elevation_interpolation: Interpolate elevation data between samples
+        :type elevation_interpolation: bool
+        :param simplify_tolerance: Maximum deviation of the simplified track in m
+        :type simplify_tolerance: float
+        :param simplify_max_points: Maximum number of points of the simplified track, 0 for no limit
+        :type simplify_max_points: int
+        :param download_hgt_files: Download the missing hgt files, otherwise their elevations are left unchanged
+        :type download_hgt_files: bool
         """
+        self._set_modified()
+
         if clean_attributes:
             self._clean_attributes()
 
@@ -174,17 +279,18 @@ class GpxHelper:
             self._clean_headers()
 
         if simplify:
-            self.gpx.simplify(5)
+            self._simplify(simplify_tolerance, simplify_max_points)
 
         if elevation:
-            self._set_gpx_elevations()
+            self._set_gpx_elevations(elevation_interpolation, download_hgt_files)
+            self._invalidate()
 
         self._set_attributes()
         self._save_gpx()
 
     def get_gpx_mode(self) -> int:
         """Get mode attributes of a gpx file."""
-        mode = self.gpx.keywords
+        mode = self.get_gpx_metadata()[2]
         if mode not in ["0", "1"]:
             mode = "2"
 
@@ -196,45 +302,182 @@ class GpxHelper:
         :param mode: Traveling mode
         :type mode: str
         """
-        self.gpx.keywords = str(mode)
+        keywords = str(mode)
+        # Unmodified files are patched in place instead of being serialized again
+        if (self._gpx is None or self._fingerprint) and self._patch_gpx_keywords(keywords):
+            return
+
+        self._set_modified()
+        self.gpx.keywords = keywords
         self._save_gpx()
 
+    def _simplify(self, tolerance: float, max_points: int) -> None:
+        size = len(self.track)
+        kept = np.zeros(size, dtype=bool)
+        kept[self.track.get_simplified_indices(tolerance, max_points)] = True
+
+        # Segments are walked in the same order as GpxTrack.from_gpx
+        start = 0
+        for track in self.gpx.tracks:
+            for segment in track.segments:
+                if segment.points:
+                    end = start + len(segment.points)
+                    segment.points = [
+                        point for point, keep in zip(segment.points, kept[start:end]) if keep
+                    ]
+                    start = end
+
+        logger.info("%s simplified from %d to %d points", self._gpx_file, size, kept.sum())
+        self._invalidate()
+
+    def _invalidate(self) -> None:
+        self._track = None
+        self._stats = None
+
+    def _load_gpx(self, use_cache: bool = True) -> gpxpy.gpx.GPX:
+        # Without cache, the gpx object is loaded to be modified
+        fingerprint = utils.get_file_fingerprint(self._gpx_file) if self._cache and use_cache else None
+        entry = self._cache.get(self._gpx_file, fingerprint) if self._cache and fingerprint else None
+        if entry:
+            gpx = entry.gpx
+            self._track, self._stats = entry.track, entry.stats
+            self._shared = True
+        else:
+            with Profiler.span("gpx.parse"), open(self._gpx_file, 'r') as f:
+                gpx = gpxpy.parse(f)
+            self._invalidate()
+            self._shared = False
+
+        self._gpx = gpx
+        self._metadata = None
+        self._fingerprint = fingerprint
+        self._cache_gpx()
+        return gpx
+
+    def _cache_gpx(self) -> None:
+        if self._cache and self._fingerprint and self._gpx is not None:
+            self._cache.put(self._gpx_file, self._fingerprint, self._gpx, self._track, self._stats)
+            self._shared = True
+
+    def _set_modified(self) -> None:
+        # Shared objects are left untouched, modifications are done on a private copy
+        if self._gpx is None or self._shared:
+            self._load_gpx(use_cache=False)
+        self._fingerprint = None
+
+    @Profiler.span("gpx.save")
     def _save_gpx(self):
         gpx_to_xml = self.gpx.to_xml()
-        with open(self._gpx_file, 'w') as f:
-            f.write(gpx_to_xml)
-
-    def _clean_attributes(self) -> None:
-        parser = etree.XMLParser(remove_blank_text=True)
+        with utils.atomic_write(self._gpx_file) as f:
+            f.write(gpx_to_xml.encode("utf-8"))
 
-        tree = etree.parse(self._gpx_file, parser)
-        xslt = etree.fromstring(utils.get_resource("/xslt/stylesheet.xslt", decode=True))
+        # The saved object now matches the file, no need to parse it again
+        self._fingerprint = utils.get_file_fingerprint(self._gpx_file)
+        self._cache_gpx()
 
-        tree = tree.xslt(xslt)
-        root = tree.getroot()
+    def _patch_gpx_keywords(self, keywords: str, max_header_size: int = 1 << 20) -> bool:
+        """Replace the metadata keywords of a gpx 1.1 file without parsing it.
 
-        # Single occurrence
-        for node_name in [".//type", ".//number", ".//cmt"]:
-            node = root.find(node_name, namespaces=root.nsmap)
-            if node is not None:
-                node.getparent().remove(node)
+        Only the header of the file is read to find the keywords, the rest
+        of the file is copied as is.
 
-        # Multiple occurrences
-        for node_name in [".//extensions", ".//number", ".//desc", ".//name", ".//wpt", ".//time"]:
-            nodes = [node for node in root.iterfind(node_name, namespaces=root.nsmap)]
-            if nodes is not None:
-                for node in nodes:
-                    node.getparent().remove(node)
+        :param keywords: New keywords
+        :type keywords: str
+        :param max_header_size: Maximum size of the header in bytes
+        :type max_header_size: int
+        :returns: False if the header is unexpected and the file left untouched
+        :rtype: bool
+        """
+        previous_fingerprint = utils.get_file_fingerprint(self._gpx_file)
+        with open(self._gpx_file, "rb") as f:
+            header = b""
+            while len(header) < max_header_size:
+                chunk = f.read(1 << 16)
+                header += chunk
+                first_child = _GPX_FIRST_CHILD.search(header)
+                if not chunk or (first_child and (first_child.group(1) != b"metadata" or b"</metadata" in header)):
+                    break
+
+            encoding = _XML_ENCODING.search(header)
+            if encoding and encoding.group(1).lower() not in [b"utf-8", b"us-ascii", b"ascii"]:
+                return False
+            start_tag = _GPX_START_TAG.search(header)
+            if not start_tag or not _GPX_VERSION_1_1.search(start_tag.group(0)):
+                return False
+            first_child = _GPX_FIRST_CHILD.search(header, start_tag.end())
+            if not first_child or first_child.group(0).endswith(b"/>"):
+                return False
+
+            element = b"<keywords>" + escape(keywords).encode("utf-8") + b"</keywords>"
+            if first_child.group(1) == b"metadata":
+                end = header.find(b"</metadata", first_child.end())
+                if end < 0:
+                    return False
+                metadata = header[first_child.end():end]
+                if b"<!--" in metadata or b"<![CDATA[" in metadata:
+                    return False
+                match = _GPX_KEYWORDS.search(metadata)
+                if match:
+                    start, end = first_child.end() + match.start(), first_child.end() + match.end()
+                else:
+                    after_keywords = _GPX_AFTER_KEYWORDS.search(metadata + b"</metadata>")
+                    if not after_keywords:
+                        return False
+                    start = end = first_child.end() + after_keywords.start()
+            else:
+                # Metadata must be the first child element
+                start = end = start_tag.end()
+                element = b"<metadata>" + element + b"</metadata>"
+
+            with utils.atomic_write(self._gpx_file) as tmp:
+                tmp.write(header[:start] + element + header[end:])
+                shutil.copyfileobj(f, tmp, 1 << 16)
+
+        if self._metadata is not None:
+            self._metadata = self._metadata[:2] + (keywords,)
+        if self._gpx is None and self._cache:
+            entry = self._cache.get(self._gpx_file, previous_fingerprint)
+            if entry:
+                self._gpx, self._track, self._stats = entry.gpx, entry.track, entry.stats
+        if self._gpx is not None:
+            # Shallow copy, the tracks are shared with the unpatched object
+            self._gpx = copy.copy(self._gpx)
+            self._gpx.keywords = keywords
+            self._fingerprint = utils.get_file_fingerprint(self._gpx_file)
+            self._cache_gpx()
+        return True
 
-        tree.write(self._gpx_file, pretty_print=True)
-        self._update = True
+    def _clean_attributes(self) -> None:
+        gpx = self.gpx
+        gpx.waypoints = []
+        gpx.name = gpx.description = gpx.time = None
+        gpx.metadata_extensions = []
+        gpx.extensions = []
+
+        # Namespaces were only used by the removed extensions
+        gpx.nsmap = {prefix: uri for prefix, uri in gpx.nsmap.items() if prefix in ["defaultns", "xsi"]}
+
+        segments = [segment for track in gpx.tracks for segment in track.segments] + gpx.routes
+        for path in gpx.tracks + gpx.routes:
+            path.name = path.description = path.comment = path.type = path.number = None
+        for segment in segments:
+            segment.extensions = []
+            for point in segment.points:
+                point.time = point.name = point.description = None
+                point.extensions = []
+        for track in gpx.tracks:
+            track.extensions = []
 
     def _set_attributes(self) -> None:
-        _, _, _, length, up_hill, down_hill = self.get_gpx_details()
+        stats = self.stats
+        length = stats.length_3d / 1000
 
         self.gpx.name = os.path.basename(self._gpx_file)
-        self.gpx.description = f"Length={round(length)}km, UpHill={round(up_hill)}m, DownHill={round(down_hill)}m"
-        self.gpx.bounds = self.gpx.get_bounds()
+        self.gpx.description = \
+            f"Length={round(length)}km, UpHill={round(stats.up_hill)}m, DownHill={round(stats.down_hill)}m"
+        if stats.bounds:
+            min_latitude, min_longitude, max_latitude, max_longitude = stats.bounds
+            self.gpx.bounds = gpxpy.gpx.GPXBounds(min_latitude, max_latitude, min_longitude, max_longitude)
 
     def _clean_headers(self) -> None:
         self.gpx.schema_locations = [
@@ -245,34 +488,28 @@ class GpxHelper:
         self.gpx.version = "1.1"
         self.gpx.creator = "pygpxviewer"
 
-    def _set_gpx_elevations(self):
-        hgt_files = set()
-        for point_data in self.gpx.get_points_data():
-            hgt_files.add(self._get_hgt_file_name(point_data[0].latitude, point_data[0].longitude))
-        self._fetch_hgt_files(hgt_files)
-
-        for point_data in self.gpx.get_points_data():
-            elevation = self._get_elevation(point_data[0].latitude, point_data[0].longitude)
-            if elevation is not None:
-                point_data[0].elevation = elevation
-
-    def _get_hgt_file_name(self, latitude: float, longitude: float) -> str:
-        if latitude >= 0:
-            north_south = 'N'
-        else:
-            north_south = 'S'
-
-        if longitude >= 0:
-            east_west = 'E'
-        else:
-            east_west = 'W'
-
-        file_name = '%s%s%s%s.hgt' % (north_south, str(int(abs(math.floor(latitude)))).zfill(2),
-                                      east_west, str(int(abs(math.floor(longitude)))).zfill(3))
-
-        return file_name
-
-    def _fetch_hgt_files(self, hgt_files):
+    @Profiler.span("gpx.elevation")
+    def _set_gpx_elevations(self, interpolate: bool = False, download_hgt_files: bool = True) -> None:
+        dem_helper = DemHelper()
+        track = self.track
+        if download_hgt_files:
+            self.fetch_hgt_files(dem_helper.get_hgt_file_names(track.latitudes, track.longitudes))
+
+        elevations = dem_helper.get_elevations(track.latitudes, track.longitudes, interpolate)
+        points = (point for track in self.gpx.tracks for segment in track.segments for point in segment.points)
+        for point, elevation in zip(points, elevations.tolist()):
+            if not math.isnan(elevation):
+                point.elevation = elevation
+
+    @staticmethod
+    def fetch_hgt_files(hgt_files: set[str], progress_callback: Optional[Callable[[int, int], None]] = None) -> None:
+        """Download the missing hgt files.
+
+        :param hgt_files: Hgt file names
+        :type hgt_files: set[str]
+        :param progress_callback: Called from the download threads with the downloaded and the total bytes
+        :type progress_callback: Optional[Callable[[int, int], None]]
+        """
         missing_hgt_files = []
         for hgt_file in hgt_files:
             if not config.dem_path.joinpath(hgt_file).is_file():
@@ -288,15 +525,8 @@ class GpxHelper:
                     {"folder": record[0], "size": int(record[1]), "link": record[2]}
                 )
 
-            download_helper = DownloadHelper(urls)
-            download_helper.fetch_urls()
-
-    def _get_elevation(self, latitude: float, longitude: float) -> Optional[int]:
-        hgt_file_name = self._get_hgt_file_name(latitude, longitude)
-        hgt_file_path = config.dem_path.joinpath(hgt_file_name)
+            # requests is only imported when hgt files are missing
+            from pygpxviewer.helpers.downloadhelper import DownloadHelper
 
-        if hgt_file_path.is_file():
-            with HgtParser(hgt_file_path) as parser:
-                _, _, elevation = parser.get_elevation((latitude, longitude))
-                return elevation
-        return None
+            download_helper = DownloadHelper(urls, progress_callback=progress_callback)
+            download_helper.fetch_urls()
@@ -0,0 +1,459 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import gpxpy.gpx
+
+# Same earth radius as gpxpy
+EARTH_RADIUS = 6378.137 * 1000
+
+
+class GpxStats(NamedTuple):
+    """Statistics of the track points of a gpx file.
+
+    Distances are in m, elevations in m and bounds are given as
+    (min_latitude, min_longitude, max_latitude, max_longitude).
+    Lengths are haversine distances, they slightly differ from the gpxpy
+    ones which approximate short distances on a flat plane.
+    """
+
+    points: int
+    length_2d: float
+    length_3d: float
+    up_hill: float
+    down_hill: float
+    min_elevation: Optional[float]
+    max_elevation: Optional[float]
+    bounds: Optional[tuple[float, float, float, float]]
+    distances: np.ndarray
+
+
+def haversine_distances(latitudes_1: np.ndarray, longitudes_1: np.ndarray,
+                        latitudes_2: np.ndarray, longitudes_2: np.ndarray) -> np.ndarray:
+    """Get the haversine distances between two arrays of locations.
+
+    :param latitudes_1: Latitudes of the first locations in degrees
+    :type latitudes_1: np.ndarray
+    :param longitudes_1: Longitudes of the first locations in degrees
+    :type longitudes_1: np.ndarray
+    :param latitudes_2: Latitudes of the second locations in degrees
+    :type latitudes_2: np.ndarray
+    :param longitudes_2: Longitudes of the second locations in degrees
+    :type longitudes_2: np.ndarray
+    :returns: Distances in m
+    :rtype: np.ndarray
+    """
+    latitudes_1 = np.radians(latitudes_1)
+    latitudes_2 = np.radians(latitudes_2)
+    delta_latitudes = latitudes_2 - latitudes_1
+    delta_longitudes = np.radians(longitudes_2) - np.radians(longitudes_1)
+
+    a = np.sin(delta_latitudes / 2) ** 2 + np.cos(latitudes_1) * np.cos(latitudes_2) * np.sin(delta_longitudes / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def get_uphill_downhill(elevations: np.ndarray) -> tuple[float, float]:
+    """Get the total ascent and descent of a segment.
+
+    Missing elevations are ignored and the elevations are smoothed the
+    same way as gpxpy.geo.calculate_uphill_downhill.
+
+    :param elevations: Elevations in m, NaN if missing
+    :type elevations: np.ndarray
+    :returns: Ascent and descent in m
+    :rtype: tuple[float, float]
+    """
+    elevations = elevations[~np.isnan(elevations)]
+    if elevations.size < 2:
+        return 0.0, 0.0
+
+    smoothed_elevations = elevations.copy()
+    smoothed_elevations[1:-1] = elevations[:-2] * .3 + elevations[1:-1] * .4 + elevations[2:] * .3
+
+    deltas = np.diff(smoothed_elevations)
+    return float(deltas[deltas > 0].sum()), float(-deltas[deltas < 0].sum())
+
+
+def get_min_max_indices(x: np.ndarray, y: np.ndarray, x_min: float, x_max: float, buckets: int) -> np.ndarray:
+    """Decimate a curve to a number of buckets, keeping its extrema.
+
+    The visible range is split in buckets of the same width, the lowest
+    and highest points of each bucket are kept so that the drawn curve
+    looks the same at this resolution. The points surrounding the range
+    are kept to draw the curve up to the edges.
+
+    :param x: Sorted x coordinates
+    :type x: np.ndarray
+    :param y: Y coordinates, NaN for missing values
+    :type y: np.ndarray
+    :param x_min: Lower bound of the visible range
+    :type x_min: float
+    :param x_max: Upper bound of the visible range
+    :type x_max: float
+    :param buckets: Number of buckets, usually the width in pixels
+    :type buckets: int
+    :returns: Sorted point indices
+    :rtype: np.ndarray
+    """
+    start = max(int(np.searchsorted(x, x_min, "left")) - 1, 0)
+    end = min(int(np.searchsorted(x, x_max, "right")) + 1, x.size)
+    if end - start <= 2 * buckets:
+        return np.arange(start, end)
+
+    x_min, x_max = max(x_min, x[start]), min(x_max, x[end - 1])
+    if x_max <= x_min:
+        return np.array([start, end - 1])
+
+    xs, ys = x[start:end], y[start:end]
+    ids = np.clip(((xs - x_min) / (x_max - x_min) * buckets).astype(np.int64), -1, buckets)
+    offsets = np.flatnonzero(np.diff(ids, prepend=ids[0] - 1))
+    ids = np.repeat(np.arange(offsets.size), np.diff(np.append(offsets, xs.size)))
+
+    # Missing values are kept only when a whole bucket is missing
+    lows = np.where(np.isnan(ys), np.inf, ys)
+    highs = np.where(np.isnan(ys), -np.inf, ys)
+    extrema = []
+    for values, reduce in ((lows, np.minimum), (highs, np.maximum)):
+        matches = np.flatnonzero(values == reduce.reduceat(values, offsets)[ids])
+        _, first = np.unique(ids[matches], return_index=True)
+        extrema.append(matches[first])
+
+    return np.unique(np.concatenate(extrema + [[0, xs.size - 1]])) + start
+
+
+def get_mercator_coordinates(latitudes: np.ndarray, longitudes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Project locations on the web mercator map at zoom level 0.
+
+    :param latitudes: Latitudes in degrees
+    :type latitudes: np.ndarray
+    :param longitudes: Longitudes in degrees
+    :type longitudes: np.ndarray
+    :returns: Coordinates x and y in [0, 1], y growing southwards
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    radians = np.radians(np.clip(latitudes, -85.0511, 85.0511))
+    x = (longitudes + 180) / 360
+    y = (1 - np.arcsinh(np.tan(radians)) / np.pi) / 2
+    return x, y
+
+
+def get_local_coordinates(latitudes: np.ndarray, longitudes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Project locations on a plane tangent to the mean latitude.
+
+    The equirectangular projection is accurate enough over the extent of a
+    track to compare distances in meters.
+
+    :param latitudes: Latitudes in degrees
+    :type latitudes: np.ndarray
+    :param longitudes: Longitudes in degrees
+    :type longitudes: np.ndarray
+    :returns: Coordinates x and y in m
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    if not latitudes.size:
+        return np.zeros(0), np.zeros(0)
+    scale = np.cos(np.radians(latitudes.mean()))
+    x = np.radians(longitudes) * scale * EARTH_RADIUS
+    y = np.radians(latitudes) * EARTH_RADIUS
+    return x, y
+
+
+def get_douglas_peucker_significances(x: np.ndarray, y: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    """Get the largest Douglas-Peucker tolerance keeping each point.
+
+    Simplifying with a tolerance keeps the points whose significance is
+    greater than or equal to it. Significances never exceed the one of the
+    point which split their range, so that the points kept for a tolerance
+    are a subset of the points kept for any smaller tolerance. First and
+    last points of the segments are always kept.
+
+    All the ranges of a recursion depth are processed at once.
+
+    :param x: Projected x coordinates
+    :type x: np.ndarray
+    :param y: Projected y coordinates
+    :type y: np.ndarray
+    :param segments: Index of the first point of each segment
+    :type segments: np.ndarray
+    :returns: Significances, same unit as the coordinates
+    :rtype: np.ndarray
+    """
+    significances = np.zeros(x.size)
+    if not x.size:
+        return significances
+
+    starts = np.asarray(segments, dtype=np.int64)
+    ends = np.append(starts[1:] - 1, x.size - 1)
+    significances[starts] = np.inf
+    significances[ends] = np.inf
+    parents = np.full(starts.size, np.inf)
+
+    while True:
+        mask = ends - starts > 1
+        starts, ends, parents = starts[mask], ends[mask], parents[mask]
+        if not starts.size:
+            break
+
+        # Flatten the inner points of all the ranges
+        lengths = ends - starts - 1
+        offsets = np.cumsum(lengths) - lengths
+        ranges = np.repeat(np.arange(starts.size), lengths)
+        indices = np.arange(lengths.sum()) - offsets[ranges] + starts[ranges] + 1
+
+        # Distance from each inner point to the chord of its range
+        start_x, start_y = x[starts][ranges], y[starts][ranges]
+        delta_x, delta_y = x[ends][ranges] - start_x, y[ends][ranges] - start_y
+        squared_lengths = delta_x ** 2 + delta_y ** 2
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratios = ((x[indices] - start_x) * delta_x + (y[indices] - start_y) * delta_y) / squared_lengths
+        ratios = np.clip(np.nan_to_num(ratios), 0, 1)
+        distances = np.hypot(x[indices] - start_x - ratios * delta_x, y[indices] - start_y - ratios * delta_y)
+
+        # Split each range on its farthest point
+        max_distances = np.maximum.reduceat(distances, offsets)
+        farthest = np.flatnonzero(distances == max_distances[ranges])
+        _, first = np.unique(ranges[farthest], return_index=True)
+        splits = indices[farthest[first]]
+
+        split_significances = np.minimum(max_distances, parents)
+        significances[splits] = split_significances
+
+        starts, ends = np.concatenate((starts, splits)), np.concatenate((splits, ends))
+        parents = np.concatenate((split_significances, split_significances))
+
+    return significances
+
+
+class GpxTrack:
+    """Columnar representation of the track points of a gpx file.
+
+    Points of all the tracks and segments are stored in contiguous float64
+    arrays, missing elevations and times are NaN. Cumulative distances are
+    computed once, they don't increase between two segments.
+    """
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, elevations: np.ndarray, times: np.ndarray,
+                 segments: Optional[np.ndarray] = None):
+        """Init method.
+
+        :param latitudes: Latitudes in degrees
+        :type latitudes: np.ndarray
+        :param longitudes: Longitudes in degrees
+        :type longitudes: np.ndarray
+        :param elevations: Elevations in m
+        :type elevations: np.ndarray
+        :param times: POSIX timestamps in s
+        :type times: np.ndarray
+        :param segments: Index of the first point of each segment
+        :type segments: Optional[np.ndarray]
+        """
+        self.latitudes = np.ascontiguousarray(latitudes, dtype=np.float64)
+        self.longitudes = np.ascontiguousarray(longitudes, dtype=np.float64)
+        self.elevations = np.ascontiguousarray(elevations, dtype=np.float64)
+        self.times = np.ascontiguousarray(times, dtype=np.float64)
+        self.segments = np.asarray(segments if segments is not None else [0], dtype=np.int64)
+
+        self.distances_2d, self.distances = self._get_distances()
+        self._significances: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_gpx(cls, gpx: "gpxpy.gpx.GPX") -> "GpxTrack":
+        """Build the columnar track from a parsed gpx file.
+
+        :param gpx: Gpx object
+        :type gpx: gpxpy.gpx.GPX
+        :returns: Columnar track
+        :rtype: GpxTrack
+        """
+        points: list["gpxpy.gpx.GPXTrackPoint"] = []
+        segments: list[int] = []
+        for track in gpx.tracks:
+            for segment in track.segments:
+                if segment.points:
+                    segments.append(len(points))
+                    points.extend(segment.points)
+
+        size = len(points)
+        nan = float("nan")
+        latitudes = np.fromiter((point.latitude for point in points), np.float64, size)
+        longitudes = np.fromiter((point.longitude for point in points), np.float64, size)
+        elevations = np.fromiter(
+            (nan if point.elevation is None else point.elevation for point in points), np.float64, size)
+        times = np.fromiter(
+            (nan if point.time is None else point.time.timestamp() for point in points), np.float64, size)
+
+        return cls(latitudes, longitudes, elevations, times, np.array(segments or [0]))
+
+    def __len__(self) -> int:
+        """Get the number of points."""
+        return self.latitudes.size
+
+    @property
+    def length_3d(self) -> float:
+        """Get the 3D length of the track.
+
+        :returns: Length in m
+        :rtype: float
+        """
+        return float(self.distances[-1]) if len(self) else 0.0
+
+    def has_elevations(self) -> bool:
+        """Check if at least one point has an elevation.
+
+        :returns: True if the track has elevations
+        :rtype: bool
+        """
+        return bool(len(self)) and not np.isnan(self.elevations).all()
+
+    def get_location(self, distance: float) -> Optional[tuple[float, float]]:
+        """Get the location at a distance from the first point.
+
+        The location is interpolated between the two closest points.
+
+        :param distance: Distance from the first point in m
+        :type distance: float
+        :returns: Location latitude and longitude
+        :rtype: Optional[tuple[float, float]]
+        """
+        if not len(self):
+            return None
+
+        index = int(np.searchsorted(self.distances, distance, side="right"))
+        if index == 0:
+            return float(self.latitudes[0]), float(self.longitudes[0])
+        if index == len(self):
+            return float(self.latitudes[-1]), float(self.longitudes[-1])
+
+        previous_distance, next_distance = self.distances[index - 1], self.distances[index]
+        ratio = 0.0
+        if next_distance > previous_distance:
+            ratio = (distance - previous_distance) / (next_distance - previous_distance)
+        latitude = self.latitudes[index - 1] + ratio * (self.latitudes[index] - self.latitudes[index - 1])
+        longitude = self.longitudes[index - 1] + ratio * (self.longitudes[index] - self.longitudes[index - 1])
+        return float(latitude), float(longitude)
+
+    def get_significances(self) -> np.ndarray:
+        """Get the Douglas-Peucker significances of the points.
+
+        Significances are computed on the web mercator plane at zoom level 0
+        and cached.
+
+        :returns: Significances, see get_douglas_peucker_significances
+        :rtype: np.ndarray
+        """
+        significances = self._significances
+        if significances is None:
+            x, y = get_mercator_coordinates(self.latitudes, self.longitudes)
+            significances = self._significances = get_douglas_peucker_significances(x, y, self.segments)
+        return significances
+
+    def get_lod_pyramid(self, max_zoom_level: int, tolerance: float = 0.5) -> list[np.ndarray]:
+        """Get the points to draw the track at each zoom level.
+
+        The track is simplified with the Douglas-Peucker algorithm so that
+        it doesn't deviate from the full track by more than the tolerance
+        once drawn on a web mercator map.
+
+        :param max_zoom_level: Highest zoom level of the pyramid
+        :type max_zoom_level: int
+        :param tolerance: Maximum deviation in pixels
+        :type tolerance: float
+        :returns: Sorted point indices for each zoom level from 0
+        :rtype: list[np.ndarray]
+        """
+        significances = self.get_significances()
+        return [
+            np.flatnonzero(significances >= tolerance / (256 * 2 ** zoom_level))
+            for zoom_level in range(max_zoom_level + 1)
+        ]
+
+    def get_simplified_indices(self, tolerance: float, max_points: int = 0) -> np.ndarray:
+        """Get the points kept by a Douglas-Peucker simplification.
+
+        Points deviating from the simplified track by more than the
+        tolerance are kept. With a budget, only the most significant points
+        are kept, first and last points of the segments are always kept.
+
+        :param tolerance: Maximum deviation in m
+        :type tolerance: float
+        :param max_points: Maximum number of points, 0 for no limit
+        :type max_points: int
+        :returns: Sorted point indices
+        :rtype: np.ndarray
+        """
+        x, y = get_local_coordinates(self.latitudes, self.longitudes)
+        significances = get_douglas_peucker_significances(x, y, self.segments)
+        indices = np.flatnonzero(significances > tolerance)
+
+        if 0 < max_points < indices.size:
+            max_points = max(max_points, int(np.isinf(significances).sum()))
+            order = np.argsort(-significances[indices], kind="stable")
+            indices = np.sort(indices[order[:max_points]])
+        return indices
+
+    def get_stats(self) -> GpxStats:
+        """Get the statistics of the track.
+
+        :returns: Track statistics
+        :rtype: GpxStats
+        """
+        if not len(self):
+            return GpxStats(0, 0.0, 0.0, 0.0, 0.0, None, None, None, self.distances)
+
+        up_hill = down_hill = 0.0
+        for elevations in np.split(self.elevations, self.segments[1:]):
+            segment_up_hill, segment_down_hill = get_uphill_downhill(elevations)
+            up_hill += segment_up_hill
+            down_hill += segment_down_hill
+
+        min_elevation = max_elevation = None
+        if self.has_elevations():
+            min_elevation = float(np.nanmin(self.elevations))
+            max_elevation = float(np.nanmax(self.elevations))
+
+        bounds = (float(self.latitudes.min()), float(self.longitudes.min()),
+                  float(self.latitudes.max()), float(self.longitudes.max()))
+
+        return GpxStats(len(self), float(self.distances_2d[-1]), self.length_3d, up_hill, down_hill,
+                        min_elevation, max_elevation, bounds, self.distances)
+
+    def _get_distances(self) -> tuple[np.ndarray, np.ndarray]:
+        if len(self) < 2:
+            return np.zeros(len(self)), np.zeros(len(self))
+
+        deltas_2d = haversine_distances(
+            self.latitudes[:-1], self.longitudes[:-1], self.latitudes[1:], self.longitudes[1:])
+        delta_elevations = np.diff(self.elevations)
+        deltas_3d = np.where(np.isnan(delta_elevations), deltas_2d, np.hypot(deltas_2d, delta_elevations))
+
+        # No distance between the last point of a segment and the first point of the next one
+        segments = self.segments[self.segments > 0] - 1
+        deltas_2d[segments] = 0
+        deltas_3d[segments] = 0
+
+        distances_2d = np.concatenate(([0.0], np.cumsum(deltas_2d)))
+        distances_3d = np.concatenate(([0.0], np.cumsum(deltas_3d)))
+        return distances_2d, distances_3d
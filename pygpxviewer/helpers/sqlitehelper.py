@@ -20,13 +20,54 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 import sqlite3
+import threading
 from contextlib import contextmanager
+from typing import Iterator, Optional
 
 import pygpxviewer.config as config
+from pygpxviewer.profiler import Profiler
 
 
 class SQLiteHelper:
-    """Helper to handle CRUD statements on a sqlite database."""
+    """Helper to handle CRUD statements on a sqlite database.
+
+    Each thread keeps its own long-lived connection to the database, in WAL
+    mode so that the background workers don't block the readers. Statements
+    are committed at the end of each call unless they are run inside an
+    explicit transaction. The latency of each call is recorded by the
+    Profiler.
+    """
+
+    _db_file = config.db_file
+    _local = threading.local()
+
+    _PRAGMAS = [
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA cache_size = -16000",
+        "PRAGMA mmap_size = 268435456",
+        "PRAGMA temp_store = MEMORY"
+    ]
+
+    # Columns added after the first release, created on existing databases
+    _GPX_MIGRATIONS = [
+        ("mtime", "INTEGER"),
+        ("size", "INTEGER"),
+        ("hash", "TEXT"),
+        ("name", "TEXT"),
+        ("description", "TEXT"),
+        ("keywords", "TEXT"),
+        ("min_lat", "REAL"),
+        ("min_lng", "REAL"),
+        ("max_lat", "REAL"),
+        ("max_lng", "REAL")
+    ]
+
+    # Columns of the full-text search index, kept in sync by triggers
+    _GPX_FTS_COLUMNS = ["path", "name", "description", "keywords"]
+
+    # Columns the records can be sorted by, each one is indexed
+    GPX_SORT_COLUMNS = ["path", "mode", "points", "length", "up_hill", "down_hill"]
 
     def __init__(self):
         sql = """
@@ -37,18 +78,46 @@ class SQLiteHelper:
                 points INTEGER,
                 length REAL,
                 up_hill REAL,
-                down_hill REAL
+                down_hill REAL,
+                mtime INTEGER,
+                size INTEGER,
+                hash TEXT,
+                name TEXT,
+                description TEXT,
+                keywords TEXT,
+                min_lat REAL,
+                min_lng REAL,
+                max_lat REAL,
+                max_lng REAL
             );
         """
         with self._db_cur() as cur:
             cur.execute(sql)
+            self._migrate_gpx_table(cur)
+            cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS index_gpx_path ON gpx (path)")
+            # Fingerprints of the files which can't be parsed, skipped until they change
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS gpx_error (
+                    path TEXT PRIMARY KEY,
+                    mtime INTEGER,
+                    size INTEGER
+                )
+            """)
+            # Indexes end with the rowid, which breaks the ties of the pages
+            for column in self.GPX_SORT_COLUMNS[1:]:
+                cur.execute(f"CREATE INDEX IF NOT EXISTS index_gpx_{column} ON gpx ({column})")
+            self._has_fts = self._create_gpx_fts(cur)
+            self._has_poi_rtree = self._create_poi_rtree(cur)
 
+    @Profiler.span("sqlite.clear_gpx_records")
     def clear_gpx_records(self):
-        """Clear all records of the database."""
+        """Clear all records of the database, and the files which can't be parsed."""
         sql = "DELETE from gpx"
         with self._db_cur() as cur:
             cur.execute(sql)
+            cur.execute("DELETE FROM gpx_error")
 
+    @Profiler.span("sqlite.add_gpx_record")
     def add_gpx_record(self, record: tuple) -> None:
         """Add a single record to the database.
 
@@ -62,6 +131,7 @@ class SQLiteHelper:
         with self._db_cur() as cur:
             cur.execute(sql, record)
 
+    @Profiler.span("sqlite.add_gpx_records")
     def add_gpx_records(self, records: list[tuple]) -> None:
         """Add many records to the database.
 
@@ -75,6 +145,150 @@ class SQLiteHelper:
         with self._db_cur() as cur:
             cur.executemany(sql, records)
 
+    @Profiler.span("sqlite.upsert_gpx_records")
+    def upsert_gpx_records(self, records: list[tuple]) -> None:
+        """Add or replace many records with their file fingerprint.
+
+        Each record is a gpx details tuple followed by the file fingerprint, the
+        gpx metadata and the track bounds: (path, mode, points, length, up_hill,
+        down_hill, mtime, size, hash, name, description, keywords, min_lat,
+        min_lng, max_lat, max_lng).
+
+        The files are no longer recorded as files which can't be parsed.
+
+        :param records: List of records
+        :type records: list[tuple]
+        """
+        sql = """
+            INSERT INTO gpx(path,mode,points,length,up_hill,down_hill,mtime,size,hash,name,description,keywords,
+                            min_lat,min_lng,max_lat,max_lng)
+                VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+            ON CONFLICT(path) DO UPDATE SET
+                mode = excluded.mode,
+                points = excluded.points,
+                length = excluded.length,
+                up_hill = excluded.up_hill,
+                down_hill = excluded.down_hill,
+                mtime = excluded.mtime,
+                size = excluded.size,
+                hash = excluded.hash,
+                name = excluded.name,
+                description = excluded.description,
+                keywords = excluded.keywords,
+                min_lat = excluded.min_lat,
+                min_lng = excluded.min_lng,
+                max_lat = excluded.max_lat,
+                max_lng = excluded.max_lng
+        """
+        with self._db_cur() as cur:
+            cur.executemany(sql, records)
+            cur.executemany("DELETE FROM gpx_error WHERE path = ?", [(record[0],) for record in records])
+
+    @Profiler.span("sqlite.delete_gpx_records")
+    def delete_gpx_records(self, paths: list[str]) -> None:
+        """Delete many records based on their path.
+
+        :param paths: List of file system paths
+        :type paths: list[str]
+        """
+        sql = "DELETE FROM gpx WHERE path = ?"
+        with self._db_cur() as cur:
+            cur.executemany(sql, [(path,) for path in paths])
+
+    @Profiler.span("sqlite.upsert_gpx_errors")
+    def upsert_gpx_errors(self, gpx_files: list[tuple[str, tuple]]) -> None:
+        """Add or replace many files which can't be parsed with their file fingerprint.
+
+        :param gpx_files: List of (path, fingerprint) tuples, the fingerprint starting with (mtime, size)
+        :type gpx_files: list[tuple[str, tuple]]
+        """
+        sql = "INSERT OR REPLACE INTO gpx_error(path,mtime,size) VALUES(?,?,?)"
+        with self._db_cur() as cur:
+            cur.executemany(sql, [(path, *fingerprint[:2]) for path, fingerprint in gpx_files])
+
+    @Profiler.span("sqlite.get_gpx_errors")
+    def get_gpx_errors(self) -> dict[str, tuple]:
+        """Get the file fingerprint of all the files which can't be parsed.
+
+        :returns: (mtime, size) fingerprints indexed by path
+        :rtype: dict[str, tuple]
+        """
+        sql = "SELECT path, mtime, size FROM gpx_error"
+        with self._db_cur() as cur:
+            cur.execute(sql)
+            records = cur.fetchall()
+        return {record[0]: record[1:] for record in records}
+
+    @Profiler.span("sqlite.delete_gpx_errors")
+    def delete_gpx_errors(self, paths: list[str]) -> None:
+        """Delete many files which can't be parsed based on their path.
+
+        :param paths: List of file system paths
+        :type paths: list[str]
+        """
+        sql = "DELETE FROM gpx_error WHERE path = ?"
+        with self._db_cur() as cur:
+            cur.executemany(sql, [(path,) for path in paths])
+
+    @Profiler.span("sqlite.get_gpx_bounds")
+    def get_gpx_bounds(self, paths: Optional[list[str]] = None) -> dict[str, Optional[tuple]]:
+        """Get the track bounds of many records based on their path.
+
+        :param paths: List of file system paths, None for all records
+        :type paths: Optional[list[str]]
+        :returns: (min_lat, min_lng, max_lat, max_lng) bounds indexed by path, None if unknown
+        :rtype: dict[str, Optional[tuple]]
+        """
+        sql = "SELECT path, min_lat, min_lng, max_lat, max_lng FROM gpx"
+        if paths is not None:
+            sql += f" WHERE gpx.path IN ({','.join('?' * len(paths))})"
+        with self._db_cur() as cur:
+            cur.execute(sql, paths or [])
+            records = cur.fetchall()
+        return {path: None if None in bounds else tuple(bounds) for path, *bounds in records}
+
+    @Profiler.span("sqlite.get_gpx_fingerprints")
+    def get_gpx_fingerprints(self) -> dict[str, tuple]:
+        """Get the file fingerprint of all records.
+
+        :returns: (mtime, size, hash) fingerprints indexed by path
+        :rtype: dict[str, tuple]
+        """
+        sql = "SELECT path, mtime, size, hash FROM gpx"
+        with self._db_cur() as cur:
+            cur.execute(sql)
+            records = cur.fetchall()
+        return {record[0]: record[1:] for record in records}
+
+    @Profiler.span("sqlite.update_gpx_fingerprint")
+    def update_gpx_fingerprint(self, path: str, fingerprint: tuple) -> None:
+        """Update the file fingerprint of a single record.
+
+        :param path: File system path
+        :type path: str
+        :param fingerprint: (mtime, size, hash) fingerprint
+        :type fingerprint: tuple
+        """
+        sql = "UPDATE gpx SET mtime = ?, size = ?, hash = ? WHERE path = ?"
+        with self._db_cur() as cur:
+            cur.execute(sql, (*fingerprint, path))
+
+    @Profiler.span("sqlite.update_gpx_mode")
+    def update_gpx_mode(self, path: str, mode: int, fingerprint: tuple) -> None:
+        """Update the mode, the keywords and the file fingerprint of a single record.
+
+        :param path: File system path
+        :type path: str
+        :param mode: Traveling mode, also stored as keywords
+        :type mode: int
+        :param fingerprint: (mtime, size, hash) fingerprint
+        :type fingerprint: tuple
+        """
+        sql = "UPDATE gpx SET mode = ?, keywords = ?, mtime = ?, size = ?, hash = ? WHERE path = ?"
+        with self._db_cur() as cur:
+            cur.execute(sql, (mode, str(mode), *fingerprint, path))
+
+    @Profiler.span("sqlite.update_gpx_record")
     def update_gpx_record(self, id: int, record: tuple) -> None:
         """Update a single record based on his id.
 
@@ -83,20 +297,21 @@ class SQLiteHelper:
         :param record: Single record
         :type record: tuple
         """
-        sql = f"""
+        sql = """
             UPDATE gpx
             SET
-                mode = {record[1]},
-                points = {record[2]},
-                length = {record[3]},
-                up_hill = {record[4]},
-                down_hill = {record[5]}
+                mode = ?,
+                points = ?,
+                length = ?,
+                up_hill = ?,
+                down_hill = ?
             WHERE
-                id = '{id}'
+                id = ?
         """
         with self._db_cur() as cur:
-            cur.execute(sql)
+            cur.execute(sql, (*record[1:6], id))
 
+    @Profiler.span("sqlite.get_gpx_records")
     def get_gpx_records(self) -> tuple:
         """Get all records.
 
@@ -104,7 +319,7 @@ class SQLiteHelper:
         :rtype: tuple
         """
         sql = """
-            SELECT * FROM gpx
+            SELECT id, path, mode, points, length, up_hill, down_hill FROM gpx
             ORDER BY
                 gpx.path
         """
@@ -113,26 +328,174 @@ class SQLiteHelper:
             records = cur.fetchall()
         return records
 
-    def search_gpx_records(self, search_entry: str) -> tuple:
+    @Profiler.span("sqlite.get_gpx_records_by_paths")
+    def get_gpx_records_by_paths(self, paths: list[str]) -> tuple:
+        """Get records from their path.
+
+        :param paths: List of file system paths
+        :type paths: list[str]
+        :returns: List of records
+        :rtype: tuple
+        """
+        sql = f"""
+            SELECT id, path, mode, points, length, up_hill, down_hill FROM gpx
+            WHERE
+                gpx.path IN ({",".join("?" * len(paths))})
+            ORDER BY
+                gpx.path
+        """
+        with self._db_cur() as cur:
+            cur.execute(sql, paths)
+            records = cur.fetchall()
+        return records
+
+    @Profiler.span("sqlite.search_gpx_records")
+    def search_gpx_records(self, search_entry: str, limit: int = 1000) -> tuple:
         """Get records with a text filter.
 
+        Every word of the filter is matched, in any order, against the path,
+        the name, the description and the keywords of the records, best
+        matches first.
+
         :param search_entry: Text filter
         :type search_entry: str
+        :param limit: Maximum number of records
+        :type limit: int
+        :returns: List of records
+        :rtype: tuple
+        """
+        fts_query, conditions, params = self._get_search_terms(search_entry)
+        where = " AND ".join(conditions)
+        if fts_query:
+            sql = f"""
+                SELECT gpx.id, gpx.path, gpx.mode, gpx.points, gpx.length, gpx.up_hill, gpx.down_hill FROM gpx_fts
+                INNER JOIN gpx
+                    ON gpx.id = gpx_fts.rowid
+                WHERE
+                    gpx_fts MATCH ? {"AND " + where if where else ""}
+                ORDER BY
+                    gpx_fts.rank, gpx.path
+                LIMIT ?
+            """
+            params = (fts_query, *params, limit)
+        else:
+            sql = f"""
+                SELECT id, path, mode, points, length, up_hill, down_hill FROM gpx
+                {"WHERE " + where if where else ""}
+                ORDER BY
+                    gpx.path
+                LIMIT ?
+            """
+            params = (*params, limit)
+
+        with self._db_cur() as cur:
+            cur.execute(sql, params)
+            records = cur.fetchall()
+        return records
+
+    @Profiler.span("sqlite.count_gpx_records")
+    def count_gpx_records(self, search_entry: Optional[str] = None) -> int:
+        """Count the records, with an optional text filter.
+
+        :param search_entry: Text filter, see search_gpx_records
+        :type search_entry: Optional[str]
+        :returns: Number of records
+        :rtype: int
+        """
+        where, params = self._get_search_filter(search_entry)
+        sql = f"SELECT COUNT(*) FROM gpx {where}"
+        with self._db_cur() as cur:
+            cur.execute(sql, params)
+            count = cur.fetchone()[0]
+        return count
+
+    @Profiler.span("sqlite.get_gpx_records_page")
+    def get_gpx_records_page(self, order_by: str = "path", descending: bool = False, after: Optional[tuple] = None,
+                             offset: int = 0, limit: int = 256, search_entry: Optional[str] = None) -> tuple:
+        """Get a page of sorted records, with an optional text filter.
+
+        Pages following a known record are found with the index of the sort
+        column (keyset pagination), other pages are skipped with an offset.
+        Records are sorted by id after the sort column.
+
+        :param order_by: Sort column, one of GPX_SORT_COLUMNS
+        :type order_by: str
+        :param descending: Sort in descending order
+        :type descending: bool
+        :param after: Sort column value and id of the record before the page
+        :type after: Optional[tuple]
+        :param offset: Number of records before the page, ignored if after is given
+        :type offset: int
+        :param limit: Maximum number of records
+        :type limit: int
+        :param search_entry: Text filter, see search_gpx_records
+        :type search_entry: Optional[str]
         :returns: List of records
         :rtype: tuple
         """
+        if order_by not in self.GPX_SORT_COLUMNS:
+            raise ValueError(f"Unknown sort column: {order_by}")
+
+        where, params = self._get_search_filter(search_entry)
+        if after is not None:
+            keyset = f"({order_by}, id) {'<' if descending else '>'} (?, ?)"
+            where = f"{where} AND {keyset}" if where else f"WHERE {keyset}"
+            params = (*params, *after)
+            offset = 0
+
+        direction = "DESC" if descending else "ASC"
         sql = f"""
-            SELECT * FROM gpx
-            WHERE
-                gpx.path LIKE '%{search_entry}%'
+            SELECT id, path, mode, points, length, up_hill, down_hill FROM gpx
+            {where}
             ORDER BY
-                gpx.path
+                {order_by} {direction}, id {direction}
+            LIMIT ? OFFSET ?
         """
         with self._db_cur() as cur:
-            cur.execute(sql)
+            cur.execute(sql, (*params, limit, offset))
             records = cur.fetchall()
         return records
 
+    @Profiler.span("sqlite.get_gpx_records_positions")
+    def get_gpx_records_positions(self, ids: list[int], order_by: str = "path", descending: bool = False,
+                                  search_entry: Optional[str] = None) -> list[int]:
+        """Get the positions of records in the sorted records, with an optional text filter.
+
+        :param ids: List of record ids
+        :type ids: list[int]
+        :param order_by: Sort column, one of GPX_SORT_COLUMNS
+        :type order_by: str
+        :param descending: Sort in descending order
+        :type descending: bool
+        :param search_entry: Text filter, see search_gpx_records
+        :type search_entry: Optional[str]
+        :returns: Sorted positions of the records matching the filter
+        :rtype: list[int]
+        """
+        if order_by not in self.GPX_SORT_COLUMNS:
+            raise ValueError(f"Unknown sort column: {order_by}")
+        if not ids:
+            return []
+
+        where, params = self._get_search_filter(search_entry)
+        direction = "DESC" if descending else "ASC"
+        sql = f"""
+            SELECT position FROM (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY {order_by} {direction}, id {direction}) - 1 AS position
+                FROM gpx
+                {where}
+            )
+            WHERE
+                id IN ({",".join("?" * len(ids))})
+            ORDER BY
+                position
+        """
+        with self._db_cur() as cur:
+            cur.execute(sql, (*params, *ids))
+            positions = [record[0] for record in cur.fetchall()]
+        return positions
+
+    @Profiler.span("sqlite.search_dem_record")
     def search_dem_record(self, hgt_files: list[str]) -> tuple:
         """Get hgt file links from name.
 
@@ -153,34 +516,173 @@ class SQLiteHelper:
             records = cur.fetchall()
         return records
 
-    def search_pois_records(self, layer: str, bounds: tuple) -> tuple:
-        """Get POIs from layer type and boundaries.
+    @Profiler.span("sqlite.search_pois_records")
+    def search_pois_records(self, bounds: tuple) -> tuple:
+        """Get POIs of every layer type within boundaries.
 
-        :param layer: Type of the layer
-        :type layer: str
-        :param bounds: Path boundaries
+        :param bounds: Boundaries as (min_lat, min_lng, max_lat, max_lng)
         :type bounds: tuple
         :return: List of records
         :rtype: tuple
         """
-        sql = f"""
-            SELECT * FROM poi
+        if not self._has_poi_rtree:
+            return ()
+
+        sql = """
+            SELECT poi.id, poi.name, poi.type, poi.link, poi.lat, poi.lng FROM poi_rtree
+            INNER JOIN poi
+                ON poi.id = poi_rtree.id
             WHERE
-                poi.type = '{layer}' AND
-                poi.lat >= {bounds[0]} AND
-                poi.lng >= {bounds[1]} AND
-                poi.lat <= {bounds[2]} AND
-                poi.lng <= {bounds[3]}
+                poi_rtree.max_lat >= ? AND
+                poi_rtree.max_lng >= ? AND
+                poi_rtree.min_lat <= ? AND
+                poi_rtree.min_lng <= ?
         """
         with self._db_cur() as cur:
-            cur.execute(sql)
+            cur.execute(sql, tuple(bounds))
             records = cur.fetchall()
         return records
 
+    def _get_search_filter(self, search_entry: Optional[str]) -> tuple[str, tuple]:
+        fts_query, conditions, params = self._get_search_terms(search_entry or "")
+        if fts_query:
+            conditions.insert(0, "gpx.id IN (SELECT rowid FROM gpx_fts WHERE gpx_fts MATCH ?)")
+            params = (fts_query, *params)
+        return ("WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+    def _get_search_terms(self, search_entry: str) -> tuple[Optional[str], list[str], tuple]:
+        """Split a text filter between the full-text search index and LIKE conditions.
+
+        Every word must match, in any order. The trigram index only matches
+        words of 3 characters or more, the other words are matched with a
+        LIKE condition on each searchable column.
+
+        :param search_entry: Text filter
+        :type search_entry: str
+        :returns: Full-text search query, LIKE conditions and their parameters
+        :rtype: tuple[Optional[str], list[str], tuple]
+        """
+        words = search_entry.split()
+        fts_words = [word for word in words if len(word) >= 3] if self._has_fts else []
+        like_words = [word for word in words if not self._has_fts or len(word) < 3]
+
+        fts_query = " ".join('"' + word.replace('"', '""') + '"' for word in fts_words) or None
+        condition = "(" + " OR ".join(f"gpx.{column} LIKE ? ESCAPE '!'" for column in self._GPX_FTS_COLUMNS) + ")"
+        params: tuple = ()
+        for word in like_words:
+            pattern = "%" + word.replace("!", "!!").replace("%", "!%").replace("_", "!_") + "%"
+            params += (pattern,) * len(self._GPX_FTS_COLUMNS)
+        return fts_query, [condition] * len(like_words), params
+
+    def _migrate_gpx_table(self, cur: sqlite3.Cursor) -> None:
+        cur.execute("PRAGMA table_info(gpx)")
+        columns = [row[1] for row in cur.fetchall()]
+        for column, column_type in self._GPX_MIGRATIONS:
+            if column not in columns:
+                cur.execute(f"ALTER TABLE gpx ADD COLUMN {column} {column_type}")
+
+    def _create_gpx_fts(self, cur: sqlite3.Cursor) -> bool:
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'gpx_fts'")
+        if cur.fetchone():
+            return True
+
+        columns = ", ".join(self._GPX_FTS_COLUMNS)
+        old_columns = ", ".join(f"old.{column}" for column in self._GPX_FTS_COLUMNS)
+        new_columns = ", ".join(f"new.{column}" for column in self._GPX_FTS_COLUMNS)
+        try:
+            cur.execute(f"""
+                CREATE VIRTUAL TABLE gpx_fts USING fts5(
+                    {columns}, content='gpx', content_rowid='id', tokenize='trigram'
+                )
+            """)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 or older than 3.34
+            return False
+
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS gpx_fts_insert AFTER INSERT ON gpx BEGIN
+                INSERT INTO gpx_fts(rowid, {columns}) VALUES (new.id, {new_columns});
+            END
+        """)
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS gpx_fts_delete AFTER DELETE ON gpx BEGIN
+                INSERT INTO gpx_fts(gpx_fts, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+            END
+        """)
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS gpx_fts_update AFTER UPDATE ON gpx BEGIN
+                INSERT INTO gpx_fts(gpx_fts, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+                INSERT INTO gpx_fts(rowid, {columns}) VALUES (new.id, {new_columns});
+            END
+        """)
+        cur.execute("INSERT INTO gpx_fts(gpx_fts) VALUES ('rebuild')")
+        return True
+
+    def _create_poi_rtree(self, cur: sqlite3.Cursor) -> bool:
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('poi', 'poi_rtree')")
+        tables = [row[0] for row in cur.fetchall()]
+        if "poi_rtree" in tables:
+            return True
+        if "poi" not in tables:
+            return False
+
+        # Databases built before the spatial index was shipped
+        try:
+            cur.execute("CREATE VIRTUAL TABLE poi_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)")
+        except sqlite3.OperationalError:
+            # SQLite built without R*Tree
+            return False
+        cur.execute("INSERT INTO poi_rtree SELECT id, lat, lat, lng, lng FROM poi")
+        return True
+
     @contextmanager
-    def _db_cur(self):
-        conn = sqlite3.connect(config.db_file)
-        cur = conn.cursor()
-        yield cur
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run many statements in a single transaction.
+
+        Nested transactions are merged into the outer one.
+
+        :returns: Connection of the current thread
+        :rtype: Iterator[sqlite3.Connection]
+        """
+        conn = self._get_connection()
+        if conn.in_transaction:
+            yield conn
+            return
+
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
         conn.commit()
-        conn.close()
+
+    @classmethod
+    def close(cls) -> None:
+        """Close the connections of the current thread."""
+        connections = getattr(cls._local, "connections", {})
+        for conn in connections.values():
+            conn.close()
+        connections.clear()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        conn = connections.get(self._db_file)
+        if conn is None:
+            conn = sqlite3.connect(self._db_file, isolation_level=None)
+            for pragma in self._PRAGMAS:
+                conn.execute(pragma)
+            connections[self._db_file] = conn
+        return conn
+
+    @contextmanager
+    def _db_cur(self):
+        with self.transaction() as conn:
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
@@ -20,8 +20,13 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
-import inspect
+import atexit
 import os
+import queue
+import sys
+import threading
+import traceback
+from typing import Any, Optional
 
 from gi.repository import GLib, GObject
 
@@ -35,16 +40,96 @@ class Logger(GObject.GObject):
       the application.
     * Warning is for logging non-fatal errors during execution.
     * Debug is for developer use as a way to get more runtime info.
+
+    Messages less severe than the level threshold are dropped before any
+    work is done. Arguments are formatted with the % operator only when
+    the message is written, in a background thread when the async queue
+    is enabled.
     """
 
     _DOMAIN = "com.github.pygpxviewer"
 
-    def _log(self, message, level):
-        stack = inspect.stack()
+    # Like GLib, debug and info messages are only written when enabled
+    _level = GLib.LogLevelFlags.LEVEL_DEBUG if {"all", _DOMAIN} & set(
+        os.environ.get("G_MESSAGES_DEBUG", "").split()) else GLib.LogLevelFlags.LEVEL_MESSAGE
+
+    _queue: Optional["queue.SimpleQueue[Optional[tuple]]"] = None
+    _thread: Optional[threading.Thread] = None
+    _lock = threading.Lock()
 
-        filename = os.path.basename(stack[2][1])
-        line = stack[2][2]
-        function = stack[2][3]
+    @classmethod
+    def set_level(cls, level: GLib.LogLevelFlags) -> None:
+        """Set the least severe level of the written messages.
+
+        :param level: Level threshold
+        :type level: GLib.LogLevelFlags
+        """
+        cls._level = level
+
+    @classmethod
+    def is_enabled_for(cls, level: GLib.LogLevelFlags) -> bool:
+        """Check if the messages of a level are written.
+
+        :param level: Message level
+        :type level: GLib.LogLevelFlags
+        :returns: True if the messages are written
+        :rtype: bool
+        """
+        # GLib levels are bit flags, the most severe having the lowest value
+        return level <= cls._level
+
+    @classmethod
+    def set_async(cls, enable: bool) -> None:
+        """Write the messages from a background thread.
+
+        Disabling the async queue writes the pending messages first.
+
+        :param enable: True to queue the messages
+        :type enable: bool
+        """
+        with cls._lock:
+            if enable and cls._thread is None:
+                cls._queue = queue.SimpleQueue()
+                cls._thread = threading.Thread(target=cls._consume, args=(cls._queue,), daemon=True)
+                cls._thread.start()
+            elif not enable and cls._thread is not None and cls._queue is not None:
+                cls._queue.put(None)
+                cls._thread.join()
+                cls._queue = None
+                cls._thread = None
+
+    @classmethod
+    def _consume(cls, records: "queue.SimpleQueue[Optional[tuple]]") -> None:
+        while True:
+            record = records.get()
+            if record is None:
+                break
+            try:
+                cls._write(*record)
+            except Exception:
+                # Like logging.Handler.handleError, a bad message must not
+                # stop the consumer and lose all the following ones
+                print("--- Logging error ---", file=sys.stderr)
+                traceback.print_exc(file=sys.stderr)
+
+    def _log(self, level, message, args):
+        if not self.is_enabled_for(level):
+            return
+
+        frame = sys._getframe(2)
+        record = (level, message, args, frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
+
+        records = self._queue
+        if records is not None:
+            records.put(record)
+        else:
+            self._write(*record)
+
+    @classmethod
+    def _write(cls, level, message, args, filename, line, function):
+        if args:
+            message = message % args
+        filename = os.path.basename(filename)
 
         if level in [GLib.LogLevelFlags.LEVEL_DEBUG,
                      GLib.LogLevelFlags.LEVEL_INFO,
@@ -64,36 +149,40 @@ class Logger(GObject.GObject):
             "CODE_FUNC": variant_func
         })
 
-        GLib.log_variant(self._DOMAIN, level, variant_dict)
+        GLib.log_variant(cls._DOMAIN, level, variant_dict)
 
-    def message(self, message: str) -> None:
+    def message(self, message: str, *args: Any) -> None:
         """Output standard message.
 
-        :param message: Standard message
+        :param message: Standard message, formatted with args
         :type message: str
         """
-        self._log(message, GLib.LogLevelFlags.LEVEL_MESSAGE)
+        self._log(GLib.LogLevelFlags.LEVEL_MESSAGE, message, args)
 
-    def warning(self, message: str) -> None:
+    def warning(self, message: str, *args: Any) -> None:
         """Output warning message.
 
-        :param message: Warning message
+        :param message: Warning message, formatted with args
         :type message: str
         """
-        self._log(message, GLib.LogLevelFlags.LEVEL_WARNING)
+        self._log(GLib.LogLevelFlags.LEVEL_WARNING, message, args)
 
-    def info(self, message: str) -> None:
+    def info(self, message: str, *args: Any) -> None:
         """Output informational message.
 
-        :param message: Informational message
+        :param message: Informational message, formatted with args
         :type message: str
         """
-        self._log(message, GLib.LogLevelFlags.LEVEL_INFO)
+        self._log(GLib.LogLevelFlags.LEVEL_INFO, message, args)
 
-    def debug(self, message: str) -> None:
+    def debug(self, message: str, *args: Any) -> None:
         """Output debug message.
 
-        :pa ram message: Debug message
+        :param message: Debug message, formatted with args
         :type message: str
         """
-        self._log(message, GLib.LogLevelFlags.LEVEL_DEBUG)
+        self._log(GLib.LogLevelFlags.LEVEL_DEBUG, message, args)
+
+
+# Pending messages are written before exiting
+atexit.register(Logger.set_async, False)
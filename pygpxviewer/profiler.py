@@ -0,0 +1,156 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, Union
+
+
+class Histogram:
+    """Rolling window of the last samples of a metric.
+
+    The count and the total are kept since the creation, the percentiles
+    are computed on the window only.
+    """
+
+    def __init__(self, unit: str, window: int = 1024):
+        """Init method.
+
+        :param unit: Unit of the samples
+        :type unit: str
+        :param window: Maximum number of samples kept
+        :type window: int
+        """
+        self.unit = unit
+        self.count = 0
+        self.total = 0.0
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def add(self, value: float) -> None:
+        """Add a sample.
+
+        :param value: Sample value
+        :type value: float
+        """
+        self.count += 1
+        self.total += value
+        self._samples.append(value)
+
+    def get_summary(self) -> dict:
+        """Get the statistics of the samples.
+
+        :returns: Unit, count and total since the creation, mean, min,
+            percentiles and max of the window
+        :rtype: dict
+        """
+        samples = sorted(self._samples)
+        summary = {"unit": self.unit, "count": self.count, "total": self.total}
+        if samples:
+            summary.update({
+                "mean": sum(samples) / len(samples),
+                "min": samples[0],
+                "p50": self._get_percentile(samples, 50),
+                "p95": self._get_percentile(samples, 95),
+                "p99": self._get_percentile(samples, 99),
+                "max": samples[-1]
+            })
+        return summary
+
+    @staticmethod
+    def _get_percentile(samples: list[float], percentile: float) -> float:
+        # Nearest rank on sorted samples
+        return samples[max(math.ceil(len(samples) * percentile / 100) - 1, 0)]
+
+
+class Profiler:
+    """Process-wide store of the timings of the hot paths.
+
+    Spans measure the duration of a block of code, other metrics such as
+    a throughput are recorded as is. Each metric is kept in a rolling
+    histogram. Work done in the worker processes of GpxPool is recorded
+    in the store of these processes.
+    """
+
+    _histograms: dict[str, Histogram] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def record(cls, name: str, value: float, unit: str = "s") -> None:
+        """Add a sample to a metric.
+
+        :param name: Metric name, dotted by component
+        :type name: str
+        :param value: Sample value
+        :type value: float
+        :param unit: Unit of the samples
+        :type unit: str
+        """
+        with cls._lock:
+            histogram = cls._histograms.get(name)
+            if histogram is None:
+                histogram = cls._histograms[name] = Histogram(unit)
+            histogram.add(value)
+
+    @classmethod
+    @contextmanager
+    def span(cls, name: str) -> Iterator[None]:
+        """Measure the duration of a block of code, also usable as a decorator.
+
+        :param name: Metric name, dotted by component
+        :type name: str
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.record(name, time.perf_counter() - start)
+
+    @classmethod
+    def get_summaries(cls) -> dict[str, dict]:
+        """Get the statistics of all the metrics.
+
+        :returns: Summaries by metric name, see Histogram.get_summary
+        :rtype: dict[str, dict]
+        """
+        with cls._lock:
+            return {name: cls._histograms[name].get_summary() for name in sorted(cls._histograms)}
+
+    @classmethod
+    def dump(cls, path: Union[str, os.PathLike]) -> None:
+        """Write the statistics of all the metrics to a json file.
+
+        :param path: Path of the json file
+        :type path: Union[str, os.PathLike]
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(cls.get_summaries(), f, indent=4)
+
+    @classmethod
+    def clear(cls) -> None:
+        """Remove all the metrics."""
+        with cls._lock:
+            cls._histograms.clear()
@@ -0,0 +1,168 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import groupby
+from typing import Any, Callable, Generator, Optional
+
+import gpxpy.gpx
+
+from pygpxviewer import utils
+from pygpxviewer.helpers.gpxhelper import GpxHelper
+from pygpxviewer.logger import Logger
+
+logger = Logger()
+
+
+def _get_gpx_records(gpx_files: list[tuple[str, tuple]]) -> list[tuple]:
+    """Parse a chunk of gpx files.
+
+    Executed in a worker process, files which can't be parsed are skipped.
+
+    :param gpx_files: List of (path, fingerprint) tuples
+    :type gpx_files: list[tuple[str, tuple]]
+    :returns: List of full gpx records, see GpxHelper.get_gpx_record
+    :rtype: list[tuple]
+    """
+    records = []
+    for path, fingerprint in gpx_files:
+        try:
+            gpx_helper = GpxHelper(path, use_cache=False)
+            records.append(gpx_helper.get_gpx_record(fingerprint))
+        except (gpxpy.gpx.GPXException, OSError) as e:
+            logger.warning("Unable to parse %s: %s", path, e)
+    return records
+
+
+def _set_gpx_records(gpx_files: list[str], options: tuple) -> list[tuple]:
+    """Apply the gpx settings to a chunk of gpx files.
+
+    Executed in a worker process, files which can't be updated are skipped.
+    Hgt files are never downloaded here, the missing ones must be fetched
+    beforehand by the parent process.
+
+    :param gpx_files: List of paths
+    :type gpx_files: list[str]
+    :param options: Arguments of GpxHelper.set_gpx_details
+    :type options: tuple
+    :returns: List of full gpx records, see GpxHelper.get_gpx_record
+    :rtype: list[tuple]
+    """
+    records = []
+    for path in gpx_files:
+        try:
+            gpx_helper = GpxHelper(path, use_cache=False)
+            gpx_helper.set_gpx_details(*options, download_hgt_files=False)
+            records.append(gpx_helper.get_gpx_record(utils.get_file_fingerprint(path) + (None,)))
+        except Exception as e:
+            # A failing file must not lose the records of the rest of the chunk
+            logger.warning("Unable to update %s: %s", path, e)
+    return records
+
+
+class GpxPool:
+    """Process pool to parse or update many gpx files in parallel.
+
+    gpxpy is pure python, parsing in processes instead of threads
+    bypasses the GIL so that the throughput scales with the cores.
+    """
+
+    def __init__(self, workers: int = 0, chunk_size: int = 16):
+        """Init method.
+
+        :param workers: Number of worker processes, 0 to use all the cores
+        :type workers: int
+        :param chunk_size: Number of gpx files sent at once to a worker process
+        :type chunk_size: int
+        """
+        self._workers = workers if workers > 0 else os.cpu_count() or 1
+        self._chunk_size = chunk_size
+
+    def map(self, gpx_files: list[tuple[str, tuple]]
+            ) -> Generator[tuple[list[tuple[str, tuple]], Optional[list[tuple]]], None, None]:
+        """Parse gpx files and yield chunks of records as soon as they are ready.
+
+        Each chunk of gpx files is yielded with its records, None if the worker
+        process crashed. Files of the chunk without a record can't be parsed.
+        Closing the iterator cancels the chunks which are not started yet.
+
+        :param gpx_files: List of (path, fingerprint) tuples
+        :type gpx_files: list[tuple[str, tuple]]
+        :returns: (gpx files, records) chunks in completion order
+        :rtype: Generator[tuple[list[tuple[str, tuple]], Optional[list[tuple]]], None, None]
+        """
+        chunks = [gpx_files[i:i + self._chunk_size] for i in range(0, len(gpx_files), self._chunk_size)]
+        yield from self._map(_get_gpx_records, chunks)
+
+    def set_gpx_details(self, gpx_files: list[tuple[str, tuple]], options: tuple,
+                        chunk_size: int = 4) -> Generator[tuple[list[str], Optional[list[tuple]]], None, None]:
+        """Apply the gpx settings to gpx files and yield chunks of records as soon as they are ready.
+
+        Files needing the same hgt files are sent together to a worker
+        process so that each tile is opened once per group. Each chunk of
+        paths is yielded with its records, None if the worker process
+        crashed. Closing the iterator cancels the chunks which are not
+        started yet.
+
+        :param gpx_files: List of (path, hgt file names) tuples
+        :type gpx_files: list[tuple[str, tuple]]
+        :param options: Arguments of GpxHelper.set_gpx_details
+        :type options: tuple
+        :param chunk_size: Maximum number of gpx files sent at once to a worker process
+        :type chunk_size: int
+        :returns: (paths, records) chunks in completion order
+        :rtype: Generator[tuple[list[str], Optional[list[tuple]]], None, None]
+        """
+        chunks: list[list[str]] = []
+        gpx_files = sorted(gpx_files, key=lambda gpx_file: gpx_file[1])
+        for _, group in groupby(gpx_files, key=lambda gpx_file: gpx_file[1]):
+            paths = [path for path, _ in group]
+            chunks.extend(paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size))
+        yield from self._map(_set_gpx_records, chunks, options)
+
+    def _map(self, function: Callable[..., list[tuple]], chunks: list[list],
+             *args: Any) -> Generator[tuple[list, Optional[list[tuple]]], None, None]:
+        # Starting processes is not worth it for a few files
+        if self._workers == 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                yield chunk, function(chunk, *args)
+            return
+
+        # Don't fork the GTK process, spawned workers only import the helpers,
+        # the launcher script initializes GTK in main only
+        context = multiprocessing.get_context("spawn")
+        executor = ProcessPoolExecutor(max_workers=min(self._workers, len(chunks)), mp_context=context)
+        try:
+            futures = {executor.submit(function, chunk, *args): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try:
+                    records = future.result()
+                except Exception as e:
+                    # A crashed worker process only loses its chunk
+                    logger.warning("Unable to process %d gpx files: %s", len(futures[future]), e)
+                    records = None
+                yield futures[future], records
+        finally:
+            # Pending chunks are dropped if the caller stops iterating
+            executor.shutdown(cancel_futures=True)
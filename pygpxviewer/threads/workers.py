@@ -20,58 +20,381 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 import pathlib
+import sqlite3
 import threading
-from typing import Callable, Tuple
+import time
+from typing import TYPE_CHECKING, Callable, Optional
 
-from gi.repository import Gio, GObject, Gtk
+from gi.repository import Gio, GObject
 
-from pygpxviewer.helpers.gpxhelper import GpxHelper
+from pygpxviewer import utils
 from pygpxviewer.helpers.sqlitehelper import SQLiteHelper
+from pygpxviewer.logger import Logger
+from pygpxviewer.profiler import Profiler
+
+logger = Logger()
+
+# gpxpy, numpy and requests are imported by the threads on first use, not at startup
+if TYPE_CHECKING:
+    from pygpxviewer.helpers.gpxhelper import GpxHelper
 
 
 class WorkerUpdateRecords(threading.Thread):
-    """Thread to parse many gpx files and update database."""
+    """Thread to parse many gpx files and update database.
+
+    In rescan mode, only new or changed files are parsed and the records
+    of vanished files are deleted. Files which can't be parsed are skipped
+    until they change. Otherwise, all records are cleared and every file
+    is parsed again.
+
+    Files are parsed by a process pool and the records are written by
+    this thread, the single database writer, in batches. Each committed
+    batch is sent to the progress callback so that the view is filled
+    while the scan is running.
+    """
+
+    _BATCH_SIZE = 500
+    _BATCH_DELAY = 0.25
 
-    def __init__(self, folder_path: str, callback: Callable[[], None]):
+    def __init__(self, folder_path: str, callback: Callable[[], None], rescan: bool = True,
+                 progress_callback: Optional[Callable[[list[tuple], int, int], None]] = None):
         threading.Thread.__init__(self)
         self.folder_path = folder_path
         self.callback = callback
+        self.rescan = rescan
+        self.progress_callback = progress_callback
 
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """Stop parsing files, records already parsed are kept."""
+        self._cancelled.set()
+
+    @Profiler.span("worker.update_records")
     def run(self):
         """Get gpx file content and update database for many gpx files."""
+        from pygpxviewer.threads.pool import GpxPool
+
         sqlite_helper = SQLiteHelper()
-        sqlite_helper.clear_gpx_records()
+        if not self.rescan:
+            sqlite_helper.clear_gpx_records()
 
-        records = []
+        settings = Gio.Settings.new("com.github.pygpxviewer.gpx")
+        rescan_hash = settings.get_boolean("rescan-hash")
+        workers = settings.get_int("workers")
+
+        fingerprints = sqlite_helper.get_gpx_fingerprints()
+        errors = sqlite_helper.get_gpx_errors()
+
+        paths = set()
+        gpx_files = []
+        touched_files = []
         for gpx_file in pathlib.Path(self.folder_path).glob("**/*.gpx"):
-            gpx_helper = GpxHelper(gpx_file)
-            records.append(gpx_helper.get_gpx_details())
+            if self._cancelled.is_set():
+                break
+
+            path = str(gpx_file)
+            paths.add(path)
+
+            mtime, size = utils.get_file_fingerprint(gpx_file)
+            if errors.get(path) == (mtime, size):
+                continue
+            known_fingerprint = fingerprints.get(path)
+            if known_fingerprint and known_fingerprint[:2] == (mtime, size):
+                continue
+
+            file_hash = utils.get_file_hash(gpx_file) if rescan_hash else None
+            if known_fingerprint and file_hash is not None and known_fingerprint[2] == file_hash:
+                touched_files.append((path, (mtime, size, file_hash)))
+                continue
+
+            gpx_files.append((path, (mtime, size, file_hash)))
+        else:
+            sqlite_helper.delete_gpx_records([path for path in fingerprints if path not in paths])
+            sqlite_helper.delete_gpx_errors([path for path in errors if path not in paths])
+
+        with sqlite_helper.transaction():
+            for path, fingerprint in touched_files:
+                sqlite_helper.update_gpx_fingerprint(path, fingerprint)
+
+        done = 0
+        total = len(gpx_files)
+        records = []
+        failed_files = []
+        flushed_at = time.monotonic()
+
+        chunks = GpxPool(workers).map(gpx_files)
+        for chunk, chunk_records in chunks:
+            # Progress counts the files, parsed or not
+            done += len(chunk)
+            if chunk_records is not None:
+                records.extend(chunk_records)
+                parsed_paths = {record[0] for record in chunk_records}
+                failed_files.extend(gpx_file for gpx_file in chunk if gpx_file[0] not in parsed_paths)
+            if len(records) >= self._BATCH_SIZE or time.monotonic() - flushed_at >= self._BATCH_DELAY:
+                self._flush_records(sqlite_helper, records, done, total)
+                records = []
+                flushed_at = time.monotonic()
+            if self._cancelled.is_set():
+                chunks.close()
+                break
+        self._flush_records(sqlite_helper, records, done, total)
+        sqlite_helper.upsert_gpx_errors(failed_files)
 
-        sqlite_helper.add_gpx_records(records)
         GObject.idle_add(self.callback)
 
+    @Profiler.span("worker.flush_records")
+    def _flush_records(self, sqlite_helper: SQLiteHelper, records: list[tuple], done: int, total: int) -> None:
+        if not done:
+            return
+        view_records: tuple = ()
+        if records:
+            sqlite_helper.upsert_gpx_records(records)
+            if self.progress_callback:
+                view_records = sqlite_helper.get_gpx_records_by_paths([record[0] for record in records])
+        # The progress is also sent for the files which can't be parsed
+        if self.progress_callback:
+            GObject.idle_add(self.progress_callback, view_records, done, total)
+
 
-class WorkerUpdateRecord(threading.Thread):
-    """Thread to update a gpx file and update database."""
+class WorkerSetRecords(threading.Thread):
+    """Thread to apply the gpx settings to many gpx files and update database.
 
-    def __init__(self, selected_item: Gtk.ListItem, callback: Callable[[Gtk.ListItem, Tuple], None]):
+    Tracks without known bounds are parsed again to find their hgt files.
+    Missing hgt files of all the tracks are then downloaded by this thread,
+    and the tracks are updated by a process pool, grouped by the hgt files
+    they need. Records are written in a single transaction at the end, the
+    tracks already updated are kept on cancellation.
+    """
+
+    def __init__(self, paths: Optional[list[str]], callback: Callable[[Optional[list[tuple]]], None],
+                 progress_callback: Optional[Callable[[str, int, int], None]] = None,
+                 download_progress_callback: Optional[Callable[[int, int], None]] = None):
+        """Init method.
+
+        :param paths: Paths of the gpx files, None for all the records
+        :type paths: Optional[list[str]]
+        :param callback: Called with the updated records, None if all the records were updated
+        :type callback: Callable[[Optional[list[tuple]]], None]
+        :param progress_callback: Called with the last updated path, the number of updated and total files
+        :type progress_callback: Optional[Callable[[str, int, int], None]]
+        :param download_progress_callback: Called with the downloaded and the total bytes of the hgt files
+        :type download_progress_callback: Optional[Callable[[int, int], None]]
+        """
         threading.Thread.__init__(self)
-        self.selected_item = selected_item
+        self.paths = paths
         self.callback = callback
+        self.progress_callback = progress_callback
+        self.download_progress_callback = download_progress_callback
+
+        self._downloaded_mb = -1
+
+        self._cancelled = threading.Event()
 
+    def cancel(self) -> None:
+        """Stop updating files, files already updated are kept."""
+        self._cancelled.set()
+
+    @Profiler.span("worker.set_records")
     def run(self):
-        """Set gpx file content and update database for a single gpx file."""
+        """Apply the gpx settings and update database for many gpx files.
+
+        The records of the files already updated are saved and the callback
+        is called even if the update stops on an error.
+        """
         sqlite_helper = SQLiteHelper()
-        gpx_helper = GpxHelper(self.selected_item.path)
+        records: list[tuple] = []
+        try:
+            self._set_records(sqlite_helper, records)
+        except Exception as e:
+            logger.warning("Unable to update the gpx files: %s", e)
+
+        view_records = None
+        try:
+            with sqlite_helper.transaction():
+                sqlite_helper.upsert_gpx_records(records)
+            if self.paths is not None:
+                view_records = sqlite_helper.get_gpx_records_by_paths([record[0] for record in records])
+        except sqlite3.Error as e:
+            logger.warning("Unable to save the gpx records: %s", e)
+        finally:
+            # None refreshes the whole view
+            GObject.idle_add(self.callback, view_records)
+
+    def _set_records(self, sqlite_helper: SQLiteHelper, records: list[tuple]) -> None:
+        from pygpxviewer.helpers.demhelper import DemHelper
+        from pygpxviewer.helpers.gpxhelper import GpxHelper
+        from pygpxviewer.threads.pool import GpxPool
+
+        dem_helper = DemHelper()
 
         settings = Gio.Settings.new("com.github.pygpxviewer.gpx")
         clean_headers = settings.get_boolean("clean-headers")
         clean_attributes = settings.get_boolean("clean-attributes")
         elevation = settings.get_boolean("elevation")
         simplify = settings.get_boolean("simplify")
+        elevation_interpolation = settings.get_boolean("elevation-interpolation")
+        simplify_tolerance = settings.get_double("simplify-tolerance")
+        simplify_max_points = settings.get_int("simplify-max-points")
+        options = (clean_headers, clean_attributes, elevation, simplify, elevation_interpolation,
+                   simplify_tolerance, simplify_max_points)
+        workers = settings.get_int("workers")
+
+        gpx_bounds = sqlite_helper.get_gpx_bounds(self.paths)
+        if elevation:
+            # Records stored before the bounds were added to the database are parsed again
+            unknown_paths = [path for path, bounds in gpx_bounds.items() if bounds is None]
+            if unknown_paths:
+                self._update_bounds(sqlite_helper, unknown_paths, workers)
+                gpx_bounds.update(sqlite_helper.get_gpx_bounds(unknown_paths))
+
+        gpx_files = []
+        for path, bounds in gpx_bounds.items():
+            hgt_files = dem_helper.get_hgt_file_names_in_bounds(bounds) if elevation and bounds else set()
+            gpx_files.append((path, tuple(sorted(hgt_files))))
+        if elevation:
+            # All the tiles are downloaded here, the worker processes never download them concurrently
+            GpxHelper.fetch_hgt_files(set().union(*(hgt_files for _, hgt_files in gpx_files)),
+                                      self._on_download_progress)
+
+        done = 0
+        total = len(gpx_files)
 
-        gpx_helper.set_gpx_details(clean_headers, clean_attributes, elevation, simplify)
-        record = gpx_helper.get_gpx_details()
+        chunks = GpxPool(workers).set_gpx_details(gpx_files, options)
+        try:
+            for chunk, chunk_records in chunks:
+                records.extend(chunk_records or [])
+                # Progress counts the files, updated or not
+                done += len(chunk)
+                if self.progress_callback:
+                    GObject.idle_add(self.progress_callback, chunk[-1], done, total)
+                if self._cancelled.is_set():
+                    break
+        finally:
+            chunks.close()
 
-        sqlite_helper.update_gpx_record(self.selected_item.id, record)
-        GObject.idle_add(self.callback, self.selected_item, record)
+    def _on_download_progress(self, downloaded: int, total: int) -> None:
+        # Called for every downloaded chunk, the progress is sent once per MB
+        downloaded_mb = downloaded // 1000000
+        if self.download_progress_callback and (downloaded_mb != self._downloaded_mb or downloaded == total):
+            self._downloaded_mb = downloaded_mb
+            GObject.idle_add(self.download_progress_callback, downloaded, total)
+
+    def _update_bounds(self, sqlite_helper: SQLiteHelper, paths: list[str], workers: int) -> None:
+        from pygpxviewer.threads.pool import GpxPool
+
+        gpx_files = [
+            (path, utils.get_file_fingerprint(path) + (None,)) for path in paths if pathlib.Path(path).is_file()
+        ]
+        chunks = GpxPool(workers).map(gpx_files)
+        try:
+            for _, chunk_records in chunks:
+                sqlite_helper.upsert_gpx_records(chunk_records or [])
+                if self._cancelled.is_set():
+                    break
+        finally:
+            chunks.close()
+
+
+class WorkerUpdateMode(threading.Thread):
+    """Thread to set the mode of a gpx file and update database."""
+
+    # Changes of the same file must not be written concurrently
+    _lock = threading.Lock()
+
+    def __init__(self, path: str, mode: int, callback: Optional[Callable[[list[tuple]], None]] = None):
+        """Init method.
+
+        :param path: Path of the gpx file
+        :type path: str
+        :param mode: Traveling mode
+        :type mode: int
+        :param callback: Called with the updated record
+        :type callback: Optional[Callable[[list[tuple]], None]]
+        """
+        threading.Thread.__init__(self)
+        self.path = path
+        self.mode = mode
+        self.callback = callback
+
+    @Profiler.span("worker.update_mode")
+    def run(self):
+        """Patch the keywords of the gpx file and update its record."""
+        from pygpxviewer.helpers.gpxhelper import GpxHelper
+
+        with self._lock:
+            gpx_helper = GpxHelper(self.path)
+            gpx_helper.set_gpx_mode(self.mode)
+
+            fingerprint = utils.get_file_fingerprint(self.path) + (None,)
+            sqlite_helper = SQLiteHelper()
+            sqlite_helper.update_gpx_mode(self.path, self.mode, fingerprint)
+            records = sqlite_helper.get_gpx_records_by_paths([self.path])
+
+        if self.callback:
+            GObject.idle_add(self.callback, records)
+
+
+class WorkerLoadGpx(threading.Thread):
+    """Thread to parse a gpx file and prepare its track for display."""
+
+    def __init__(self, path: str, callback: Callable[["GpxHelper"], None],
+                 error_callback: Optional[Callable[[str], None]] = None):
+        """Init method.
+
+        :param path: Path of the gpx file
+        :type path: str
+        :param callback: Called with the helper of the parsed gpx file
+        :type callback: Callable[[GpxHelper], None]
+        :param error_callback: Called with the error message if the file can't be parsed
+        :type error_callback: Optional[Callable[[str], None]]
+        """
+        threading.Thread.__init__(self)
+        self.path = path
+        self.callback = callback
+        self.error_callback = error_callback
+
+    @Profiler.span("worker.load_gpx")
+    def run(self):
+        """Parse the gpx file, compute its statistics and its path simplification."""
+        import gpxpy.gpx
+
+        from pygpxviewer.helpers.gpxhelper import GpxHelper
+
+        try:
+            gpx_helper = GpxHelper(self.path)
+            # Lazy properties, computed here instead of on the main thread
+            gpx_helper.stats
+            gpx_helper.track.get_significances()
+            # The view only reads the track, the gpx objects are not kept alive by the window
+            gpx_helper.release_gpx()
+        except (gpxpy.gpx.GPXException, OSError) as e:
+            logger.warning("Unable to load %s: %s", self.path, e)
+            if self.error_callback:
+                GObject.idle_add(self.error_callback, str(e))
+            return
+        GObject.idle_add(self.callback, gpx_helper)
+
+
+class WorkerGetRecords(threading.Thread):
+    """Thread to read the first page of records without blocking the view.
+
+    The first read also warms up the database: connection, page cache and
+    memory map.
+    """
+
+    def __init__(self, callback: Callable[[int, list[tuple]], None], order_by: str = "path",
+                 descending: bool = False, limit: int = 256):
+        threading.Thread.__init__(self)
+        self.callback = callback
+        self.order_by = order_by
+        self.descending = descending
+        self.limit = limit
+
+    @Profiler.span("worker.get_records")
+    def run(self):
+        """Count the records, get the first page and send them to the callback."""
+        sqlite_helper = SQLiteHelper()
+        count = sqlite_helper.count_gpx_records()
+        records = sqlite_helper.get_gpx_records_page(self.order_by, self.descending, limit=self.limit)
+        GObject.idle_add(self.callback, count, records)
@@ -19,9 +19,14 @@
 #  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
-from typing import Union
+import hashlib
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator, Union
 
-from gi.repository import Gio, GLib, Gtk
+from gi.repository import Gio, GLib
 
 
 def get_resource(path: str, decode: bool = False) -> Union[str, GLib.Bytes]:
@@ -46,4 +51,61 @@ def is_dark_theme_enable() -> bool:
     :returns: True if dark theme is enabled
     :rtype: bool
     """
+    # Gtk is imported here, the process pool workers import this module
+    from gi.repository import Gtk
+
     return Gtk.Settings.get_default().props.gtk_application_prefer_dark_theme
+
+
+def get_file_fingerprint(path: Union[str, os.PathLike]) -> tuple[int, int]:
+    """Get the modification time and the size of a file with a single stat call.
+
+    :param path: Path of the file
+    :type path: Union[str, os.PathLike]
+    :returns: Modification time in ns and size in bytes
+    :rtype: tuple[int, int]
+    """
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_file_hash(path: Union[str, os.PathLike]) -> str:
+    """Get the hash of a file content.
+
+    :param path: Path of the file
+    :type path: Union[str, os.PathLike]
+    :returns: Hexadecimal blake2b digest
+    :rtype: str
+    """
+    file_hash = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+@contextmanager
+def atomic_write(path: Union[str, os.PathLike]) -> Iterator[IO[bytes]]:
+    """Write a file atomically.
+
+    Content is written to a temporary file in the same folder which
+    replaces the file once closed, the file is left untouched on error.
+
+    :param path: Path of the file
+    :type path: Union[str, os.PathLike]
+    :returns: Temporary file opened in binary mode
+    :rtype: Iterator[IO[bytes]]
+    """
+    folder, name = os.path.split(os.path.abspath(path))
+    f = tempfile.NamedTemporaryFile(dir=folder, prefix=f".{name}.", suffix=".tmp", delete=False)
+    try:
+        with f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, f.name)
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
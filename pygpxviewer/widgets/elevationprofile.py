@@ -23,21 +23,24 @@
 from gettext import gettext as _
 
 import matplotlib.pyplot as plt
-from gi.repository import GObject, Gtk
-from matplotlib.backend_bases import MouseEvent
+import numpy as np
+from gi.repository import Gdk, GLib, GObject, Gtk
+from matplotlib.axes import Axes
+from matplotlib.backend_bases import DrawEvent, LocationEvent, MouseEvent, ResizeEvent
 from matplotlib.backends.backend_gtk4 import NavigationToolbar2GTK4
 from matplotlib.backends.backend_gtk4agg import FigureCanvasGTK4Agg
 from matplotlib.figure import Figure
 
 from pygpxviewer import utils
+from pygpxviewer.helpers.gpxtrack import get_min_max_indices
 
 
 class ElevationProfile(Gtk.Box):
     """Display a matplotlib chart to analyse elevation profile.
 
     FigureCanvasGTK4Agg:
-        * Elevation profile
-        * Handle mouse move event
+        * Elevation profile, decimated to the width of the axes
+        * Handle mouse move event, only the cursor is redrawn
     NavigationToolbar2GTK4:
         * Zoom to a specific area
         * Save elevation profile as a png file
@@ -52,44 +55,124 @@ class ElevationProfile(Gtk.Box):
         super().__init__(orientation=Gtk.Orientation.VERTICAL)
 
         self._gpx_helper = window.gpx_helper
+        self._hover_distance = None
+        self._tick_callback_id = None
+
+        self._distances, self._elevations = self._gpx_helper.get_gpx_distances_and_elevations()
+        self._min_elevation = None
+        self._ax = None
+        self._line = None
+        self._fill = None
+        self._cursor = None
+        self._background = None
+        self._width = None
 
         if utils.is_dark_theme_enable():
             plt.style.use('dark_background')
 
         canvas = FigureCanvasGTK4Agg(self._get_figure())
         toolbar = NavigationToolbar2GTK4(canvas, self)
+        canvas.mpl_connect('draw_event', self._on_draw_event)
+        canvas.mpl_connect('resize_event', self._on_resize_event)
+        canvas.mpl_connect('axes_leave_event', self._on_axes_leave_event)
 
         self.append(canvas)
         self.append(toolbar)
 
     def _get_figure(self) -> Figure:
-        length = self._gpx_helper.gpx.length_3d() / 1000
-        min_elev, max_elev = self._gpx_helper.gpx.get_elevation_extremes()
-        distances, elevations = self._gpx_helper.get_gpx_distances_and_elevations()
+        stats = self._gpx_helper.stats
+        length = stats.length_3d / 1000
+        min_elev, max_elev = stats.min_elevation, stats.max_elevation
 
         min_elev = round(min_elev)
         max_elev = round(max_elev)
-        mean_elev = round(sum(elevations) / len(elevations))
+        mean_elev = round(np.nanmean(self._elevations))
+        self._min_elevation = min_elev
 
         figure = Figure(tight_layout=True)
         figure.canvas.mpl_connect('motion_notify_event', self._on_motion_notify_event)
 
-        ax = figure.add_subplot()
-        ax.plot(distances, elevations)
+        ax = self._ax = figure.add_subplot()
+        self._line, = ax.plot([], [])
         ax.plot([0, length], [max_elev, max_elev], '--r', label=_('max: ') + str(max_elev) + ' m')
         ax.plot([0, length], [mean_elev, mean_elev], '--y', label=_('ave: ') + str(mean_elev) + ' m')
         ax.plot([0, length], [min_elev, min_elev], '--g', label=_('min: ') + str(min_elev) + ' m')
-        ax.fill_between(distances, elevations, min_elev, alpha=0.1)
+        self._cursor = ax.axvline(0, color=self._line.get_color(), linewidth=1, animated=True, visible=False)
         ax.set_xlabel(_("Length (km)"))
         ax.set_ylabel(_("Elevation (m)"))
         ax.grid()
         ax.legend()
 
+        self._set_line_data()
+        ax.relim()
+        ax.autoscale_view()
+        # Zoom, pan and home of the toolbar all change the x limits
+        ax.callbacks.connect('xlim_changed', self._on_xlim_changed)
+
         return figure
 
+    def _set_line_data(self) -> None:
+        x_min, x_max = self._ax.get_xlim() if self._width else (-np.inf, np.inf)
+        indices = get_min_max_indices(self._distances, self._elevations, x_min, x_max, self._width or 2048)
+        distances, elevations = self._distances[indices], self._elevations[indices]
+
+        self._line.set_data(distances, elevations)
+        if self._fill:
+            self._fill.remove()
+        self._fill = self._ax.fill_between(distances, elevations, self._min_elevation,
+                                           color=self._line.get_color(), alpha=0.1)
+
+    def _on_xlim_changed(self, ax: Axes) -> None:
+        self._set_line_data()
+
+    def _on_resize_event(self, event: ResizeEvent) -> None:
+        width = max(round(self._ax.bbox.width), 1)
+        if width != self._width:
+            self._width = width
+            self._set_line_data()
+
+    def _on_draw_event(self, event: DrawEvent) -> None:
+        # Save the background without the cursor to restore it on motion
+        canvas = self._ax.figure.canvas
+        self._background = canvas.copy_from_bbox(self._ax.bbox)
+        # The canvas is being painted, the cursor only has to be added to the buffer
+        self._draw_cursor(queue_draw=False)
+
+    def _on_axes_leave_event(self, event: LocationEvent) -> None:
+        self._hover_distance = None
+        self._draw_cursor()
+
+    def _draw_cursor(self, queue_draw: bool = True) -> None:
+        if self._background is None:
+            return
+
+        canvas = self._ax.figure.canvas
+        canvas.restore_region(self._background)
+        if self._hover_distance is not None:
+            self._cursor.set_xdata([self._hover_distance, self._hover_distance])
+            self._cursor.set_visible(True)
+            self._ax.draw_artist(self._cursor)
+        else:
+            self._cursor.set_visible(False)
+        # GTK4 canvases don't support blitting, the whole Agg buffer is painted
+        # again without rendering the figure, so only the cursor is redrawn
+        if queue_draw:
+            canvas.queue_draw()
+
     def _on_motion_notify_event(self, event: MouseEvent) -> None:
         if event.inaxes:
-            length = self._gpx_helper.gpx.length_3d() / 1000
-            result = self._gpx_helper.get_gpx_lat_lng_from_distance(length, event.xdata)
-            if result:
-                self.emit("on-mouse-move-event", result[0], result[1])
+            # Emit at most once per frame, with the last known position
+            self._hover_distance = event.xdata
+            if self._tick_callback_id is None:
+                self._tick_callback_id = self.add_tick_callback(self._on_tick)
+
+    def _on_tick(self, widget: Gtk.Widget, frame_clock: Gdk.FrameClock) -> bool:
+        self._tick_callback_id = None
+        if self._hover_distance is None:
+            return GLib.SOURCE_REMOVE
+
+        self._draw_cursor()
+        result = self._gpx_helper.get_gpx_lat_lng_from_distance(self._hover_distance)
+        if result:
+            self.emit("on-mouse-move-event", result[0], result[1])
+        return GLib.SOURCE_REMOVE
@@ -20,57 +20,12 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 from gettext import gettext as _
-from typing import Optional, Tuple
-
-from gi.repository import Gio, GObject, Gtk, Pango
-
-from pygpxviewer.helpers.gpxhelper import GpxHelper
-from pygpxviewer.helpers.sqlitehelper import SQLiteHelper
-from pygpxviewer.threads.workers import WorkerUpdateRecord
-from pygpxviewer.widgets.gpxdetailedview import GpxDetailedView
-
-
-class GpxItem(GObject.GObject):
-    """GpxItem is the item used to fill to Gio.ListStore."""
-
-    __gtype_name__ = "GpxItem"
-
-    id = GObject.Property(type=int)
-    path = GObject.Property(type=str)
-    mode = GObject.Property(type=int)
-    points = GObject.Property(type=int)
-    length = GObject.Property(type=float)
-    up_hill = GObject.Property(type=float)
-    down_hill = GObject.Property(type=float)
-
-    def __init__(self, id: int, path: str, mode: int, points: int,
-                 length: float, up_hill: float, down_hill: float) -> None:
-        """Init method.
-
-        :param id: SQLite database id
-        :type id: int
-        :param path: File system path
-        :type path: str
-        :param mode: Traveling mode
-        :type mode: int
-        :param points: Number of track points
-        :type points: int
-        :param length: Total distance in km
-        :type length: float
-        :param up_hill: Total ascent in m
-        :type up_hill: float
-        :param down_hill: Total descent in m
-        :type down_hill: float
-        """
-        super().__init__()
+from typing import Optional
 
-        self.id = id
-        self.path = path
-        self.mode = mode
-        self.points = points
-        self.length = length
-        self.up_hill = up_hill
-        self.down_hill = down_hill
+from gi.repository import GObject, Gtk, Pango
+
+from pygpxviewer.threads.workers import WorkerGetRecords, WorkerUpdateMode
+from pygpxviewer.widgets.gpxlistmodel import GpxItem, GpxListModel
 
 
 @Gtk.Template(resource_path="/com/github/pygpxviewer/ui/GpxColumnView.ui")
@@ -82,8 +37,7 @@ class GpxColumnView(Gtk.ColumnView):
 
     __gtype_name__ = "GpxColumnView"
 
-    _single_selection = Gtk.Template.Child()
-    _sort_list_model = Gtk.Template.Child()
+    _multi_selection = Gtk.Template.Child()
     _path_view_column = Gtk.Template.Child()
 
     _factory_path = Gtk.Template.Child()
@@ -97,12 +51,16 @@ class GpxColumnView(Gtk.ColumnView):
         super().__init__()
 
         self._window = window
-        self._sqlitehelper = SQLiteHelper()
 
-        self._list_store = Gio.ListStore()
-        self._sort_list_model.set_model(self._list_store)
+        self._gpx_list_model = GpxListModel()
+        self._multi_selection.set_model(self._gpx_list_model)
+
+        self._search_entry: Optional[str] = None
+        self._generation = 0
 
         self.sort_by_column(self._path_view_column, Gtk.SortType.ASCENDING)
+        # Sorting is done by SQLite, the column sorters only make the headers clickable
+        self.get_sorter().connect("changed", self._on_sorter_changed)
         self._setup_column_view()
 
     def refresh(self, search_entry: Optional[str] = None) -> None:
@@ -111,15 +69,71 @@ class GpxColumnView(Gtk.ColumnView):
         :param search_entry: Text pattern to search
         :type search_entry: Optional[str]
         """
-        self._list_store.remove_all()
-        if search_entry:
-            records = self._sqlitehelper.search_gpx_records(search_entry)
-        else:
-            records = self._sqlitehelper.get_gpx_records()
-        for record in records:
-            id, path, mode, points, length, up_hill, down_hill = record
-            gpx_item = GpxItem(id, path, mode, points, length, up_hill, down_hill)
-            self._list_store.append(gpx_item)
+        self._generation += 1
+        self._search_entry = search_entry
+        self._gpx_list_model.set_query(search_entry, *self._get_sort())
+
+    def preload(self) -> None:
+        """Fill the view with the first records, read in the background.
+
+        Records are dropped if the view is cleared or refreshed in the meantime.
+        """
+        generation = self._generation
+        WorkerGetRecords(
+            lambda count, records: self._on_preload_ended(count, records, generation),
+            *self._get_sort(), limit=GpxListModel.PAGE_SIZE).start()
+
+    def _on_preload_ended(self, count: int, records: list[tuple], generation: int) -> None:
+        if generation == self._generation:
+            self._gpx_list_model.reload(count, records)
+
+    def clear(self) -> None:
+        """Remove all the records from the view."""
+        self._generation += 1
+        self._gpx_list_model.clear()
+
+    def add_records(self, records: list[tuple]) -> None:
+        """Show the records added to the database.
+
+        The records are already in the database, they are inserted in the
+        view at their position, keeping the selection and the scroll position.
+
+        :param records: List of records
+        :type records: list[tuple]
+        """
+        self._generation += 1
+        self._gpx_list_model.add_records(records)
+
+    def update_records(self, records: list[tuple]) -> None:
+        """Update the records already in the view.
+
+        :param records: List of records
+        :type records: list[tuple]
+        """
+        self._gpx_list_model.update_records(records)
+
+    def get_selected_paths(self) -> list[str]:
+        """Get the paths of the selected records.
+
+        :returns: List of file system paths
+        :rtype: list[str]
+        """
+        selection = self._multi_selection.get_selection()
+        return [
+            self._multi_selection.get_item(selection.get_nth(i)).path
+            for i in range(selection.get_size())
+        ]
+
+    def _get_sort(self) -> tuple[str, bool]:
+        sorter = self.get_sorter()
+        column = sorter.get_primary_sort_column()
+        if column is None:
+            return "path", False
+        return column.get_id(), sorter.get_primary_sort_order() == Gtk.SortType.DESCENDING
+
+    def _on_sorter_changed(self, sorter: Gtk.ColumnViewSorter, change: Gtk.SorterChange) -> None:
+        self._generation += 1
+        self._gpx_list_model.set_query(self._search_entry, *self._get_sort())
 
     def _setup_column_view(self):
         self._factory_path.connect("bind", self._factory_bind_label, "path")
@@ -194,19 +208,18 @@ class GpxColumnView(Gtk.ColumnView):
     def _on_dropdown_mode_changed(self, dropdown: Gtk.DropDown, gparamstring: GObject.ParamSpec,
                                   list_item: Gtk.ListItem) -> None:
         selected_item = list_item.get_item()
+        # Binding an item selects its mode, the file is already up to date
+        if selected_item is None or selected_item.mode == dropdown.get_selected():
+            return
         selected_item.mode = dropdown.get_selected()
 
-        gpx_helper = GpxHelper(selected_item.path)
-        gpx_helper.set_gpx_mode(selected_item.mode)
-
-        record = (
-            selected_item.path, selected_item.mode, selected_item.points, selected_item.length,
-            selected_item.up_hill, selected_item.down_hill)
-
-        sqlite_helper = SQLiteHelper()
-        sqlite_helper.update_gpx_record(selected_item.id, record)
+        # The row moves if the records are sorted by mode
+        worker_update_mode = WorkerUpdateMode(selected_item.path, selected_item.mode, self.update_records)
+        worker_update_mode.start()
 
     def _on_button_view_clicked(self, button: Gtk.Button, list_item: Gtk.ListItem) -> None:
+        from pygpxviewer.widgets.gpxdetailedview import GpxDetailedView
+
         selected_item = list_item.get_item()
         app_detailed_view = GpxDetailedView(selected_item.path)
         app_detailed_view.props.transient_for = self._window
@@ -217,24 +230,9 @@ class GpxColumnView(Gtk.ColumnView):
 
     def _on_button_refresh_clicked(self, button: Gtk.Button, list_item: Gtk.ListItem) -> None:
         selected_item = list_item.get_item()
-
-        self._window.set_sensitive(False)
-        self._window.spinner.start()
-
-        thread = WorkerUpdateRecord(selected_item, self._on_update_record_ended)
-        thread.start()
-
-    def _on_update_record_ended(self, selected_item: Gtk.ListItem, record: Tuple) -> None:
-        selected_item.mode = record[1]
-        selected_item.points = record[2]
-        selected_item.length = record[3]
-        selected_item.up_hill = record[4]
-        selected_item.down_hill = record[5]
-
-        self._window.spinner.stop()
-        self._window.set_sensitive(True)
+        self._window.set_records([selected_item.path])
 
     # def _get_selected_item(self, list_item: Gtk.ListItem) -> Gtk.ListItem:
     #     position = list_item.get_position()
-    #     self._single_selection.set_selected(position)
-    #     return self._single_selection.get_selected_item()
+    #     self._multi_selection.select_item(position, True)
+    #     return self._multi_selection.get_item(position)
@@ -22,22 +22,34 @@
 
 import json
 import os
+from gettext import gettext as _
+from typing import TYPE_CHECKING
 
 from gi.repository import Adw, Gio, GLib, GObject, Gtk
 
 import pygpxviewer.config as config
-from pygpxviewer.helpers.gpxhelper import GpxHelper
-from pygpxviewer.widgets.elevationprofile import ElevationProfile
-from pygpxviewer.widgets.shumatemap import ShumateMap
+from pygpxviewer.helpers.sqlitehelper import SQLiteHelper
+from pygpxviewer.threads.workers import WorkerLoadGpx
+
+# The map and matplotlib are imported when the first track is displayed
+if TYPE_CHECKING:
+    from pygpxviewer.helpers.gpxhelper import GpxHelper
 
 
 @Gtk.Template(resource_path="/com/github/pygpxviewer/ui/GpxDetailedView.ui")
 class GpxDetailedView(Adw.Window):
-    """Display an interactive map and a chart to analyse a gpx file."""
+    """Display an interactive map and a chart to analyse a gpx file.
+
+    The window is shown with the statistics stored in the database while
+    the gpx file is parsed by a worker thread. The map is attached once
+    the file is parsed and the chart the first time it is toggled.
+    """
 
     __gtype_name__ = "GpxDetailedView"
 
     _menu_button = Gtk.Template.Child()
+    _toggle_button = Gtk.Template.Child()
+    _spinner = Gtk.Template.Child()
     _box_container = Gtk.Template.Child()
     _points_label = Gtk.Template.Child()
     _length_label = Gtk.Template.Child()
@@ -48,7 +60,7 @@ class GpxDetailedView(Adw.Window):
         super().__init__()
 
         self._path = path
-        self._gpx_helper = GpxHelper(self._path)
+        self._gpx_helper = None
         self._settings = Gio.Settings.new("com.github.pygpxviewer.app.window.detailed")
 
         self.set_title(os.path.basename(self._path))
@@ -56,11 +68,15 @@ class GpxDetailedView(Adw.Window):
         self._shumate_map = None
         self._elevation_profile = None
         self._size_allocated = None
+        self._closed = False
 
         self._setup_actions()
         self._setup_view()
         self._setup_layers_menu()
 
+        self.connect("close-request", self._on_close_request)
+        WorkerLoadGpx(self._path, self._on_gpx_loaded, self._on_gpx_load_failed).start()
+
     @GObject.Property(type=Gio.Settings, flags=GObject.ParamFlags.READABLE)
     def settings(self):
         """Get Window settings property.
@@ -97,19 +113,61 @@ class GpxDetailedView(Adw.Window):
         self._settings.bind("is-maximized", self, "maximized", Gio.SettingsBindFlags.DEFAULT)
         self._settings.bind("is-fullscreen", self, "fullscreened", Gio.SettingsBindFlags.DEFAULT)
 
-        _, mode, points, length, up_hill, down_hill = self._gpx_helper.get_gpx_details()
+        records = SQLiteHelper().get_gpx_records_by_paths([self._path])
+        if records:
+            self._set_details(records[0][1:])
+
+    def _set_details(self, details: tuple) -> None:
+        _, mode, points, length, up_hill, down_hill = details
         self._points_label.set_text(str(points))
         self._length_label.set_text(str(round(length)))
         self._up_hill_label.set_text(str(round(up_hill)))
         self._down_hill_label.set_text(str(round(down_hill)))
 
+    def _on_gpx_loaded(self, gpx_helper: "GpxHelper") -> None:
+        from pygpxviewer.widgets.shumatemap import ShumateMap
+
+        # The window was closed while the file was parsed
+        if self._closed:
+            return
+
+        self._gpx_helper = gpx_helper
+        self._set_details(gpx_helper.get_gpx_details())
+
+        self._box_container.remove(self._spinner)
         self._shumate_map = ShumateMap(self)
         self._box_container.append(self._shumate_map)
 
-        if self._gpx_helper.gpx.has_elevations():
+        if self._toggle_button.get_active():
+            self._show_elevation_profile()
+
+    def _on_gpx_load_failed(self, message: str) -> None:
+        if self._closed:
+            return
+
+        status_page = Adw.StatusPage()
+        status_page.set_icon_name("dialog-error-symbolic")
+        status_page.set_title(_("Unable to open the gpx file"))
+        status_page.set_description(GLib.markup_escape_text(message))
+        status_page.set_vexpand(True)
+
+        self._box_container.remove(self._spinner)
+        self._box_container.append(status_page)
+
+    def _on_close_request(self, window: Adw.Window) -> bool:
+        self._closed = True
+        return False
+
+    def _show_elevation_profile(self) -> None:
+        if not self._gpx_helper or not self._gpx_helper.track.has_elevations():
+            return
+
+        if not self._elevation_profile:
+            from pygpxviewer.widgets.elevationprofile import ElevationProfile
+
             self._elevation_profile = ElevationProfile(self)
             self._elevation_profile.connect("on-mouse-move-event", self._shumate_map.on_mouse_move_event)
-            self._box_container.append(self._elevation_profile)
+        self._box_container.append(self._elevation_profile)
 
     def _setup_layers_menu(self):
         menu_model = Gio.Menu()
@@ -126,9 +184,8 @@ class GpxDetailedView(Adw.Window):
     @Gtk.Template.Callback()
     def _on_toggle_button_toggled(self, toggle_button: Gtk.ToggleButton) -> None:
         if toggle_button.get_active():
-            if self._gpx_helper.gpx.has_elevations():
-                self._box_container.append(self._elevation_profile)
-        else:
+            self._show_elevation_profile()
+        elif self._elevation_profile and self._elevation_profile.get_parent():
             self._box_container.remove(self._elevation_profile)
 
     def _get_map_sources(self):
@@ -156,13 +213,17 @@ class GpxDetailedView(Adw.Window):
         :rtype: None
         """
         Adw.Window.do_size_allocate(self, width, height, baseline)
-        if not self._size_allocated:
+        # The map is attached once the gpx file is parsed, after the first allocation
+        if self._shumate_map and not self._size_allocated:
             self._size_allocated = True
             self._shumate_map.set_center_and_zoom()
 
     def _on_layer_action(
             self, action: Gio.SimpleAction,
             data: GLib.Variant) -> None:
+        if not self._shumate_map:
+            return
+
         layer_provider, layer_url = self._get_map_source_from_url(data.get_string())
         self._shumate_map.settings.set_string("layer-provider", layer_provider)
         self._shumate_map.settings.set_string("layer-url", layer_url)
@@ -0,0 +1,315 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+from collections import OrderedDict
+from typing import Optional
+
+from gi.repository import Gio, GLib, GObject
+
+from pygpxviewer.helpers.sqlitehelper import SQLiteHelper
+
+
+class GpxItem(GObject.GObject):
+    """GpxItem is the item of the GpxListModel."""
+
+    __gtype_name__ = "GpxItem"
+
+    id = GObject.Property(type=int)
+    path = GObject.Property(type=str)
+    mode = GObject.Property(type=int)
+    points = GObject.Property(type=int)
+    length = GObject.Property(type=float)
+    up_hill = GObject.Property(type=float)
+    down_hill = GObject.Property(type=float)
+
+    def __init__(self, id: int, path: str, mode: int, points: int,
+                 length: float, up_hill: float, down_hill: float) -> None:
+        """Init method.
+
+        :param id: SQLite database id
+        :type id: int
+        :param path: File system path
+        :type path: str
+        :param mode: Traveling mode
+        :type mode: int
+        :param points: Number of track points
+        :type points: int
+        :param length: Total distance in km
+        :type length: float
+        :param up_hill: Total ascent in m
+        :type up_hill: float
+        :param down_hill: Total descent in m
+        :type down_hill: float
+        """
+        super().__init__()
+
+        self.id = id
+        self.path = path
+        self.mode = mode
+        self.points = points
+        self.length = length
+        self.up_hill = up_hill
+        self.down_hill = down_hill
+
+    def update(self, record: tuple) -> None:
+        """Update the item with a record of the same id.
+
+        :param record: Record
+        :type record: tuple
+        """
+        _, _, self.mode, self.points, self.length, self.up_hill, self.down_hill = record
+
+
+class GpxListModel(GObject.GObject, Gio.ListModel):
+    """GpxListModel is a list of the gpx records, read from SQLite on demand.
+
+    Only the pages of rows displayed by the view are read and turned into
+    GpxItem, the last ones are kept in a small cache. The records are
+    filtered and sorted by SQLite, pages following a cached one are found
+    with the index of the sort column. Records added to the database are
+    inserted at their position without reading the rows before them again.
+    """
+
+    __gtype_name__ = "GpxListModel"
+
+    PAGE_SIZE = 256
+    MAX_PAGES = 16
+
+    def __init__(self):
+        super().__init__()
+
+        self._sqlitehelper = SQLiteHelper()
+
+        self._search_entry: Optional[str] = None
+        self._order_by = "path"
+        self._descending = False
+
+        self._n_items = 0
+        self._pages: OrderedDict[int, list[GpxItem]] = OrderedDict()
+        # Sort column value and id of the last record of each page read
+        self._page_keys: dict[int, tuple] = {}
+        # Positions of the added records not announced to the view yet
+        self._hidden_positions: list[int] = []
+        self._reload_source = 0
+
+    def do_get_item_type(self) -> GObject.GType:
+        """Get the type of the items, see Gio.ListModel."""
+        return GpxItem.__gtype__
+
+    def do_get_n_items(self) -> int:
+        """Get the number of records matching the text filter, see Gio.ListModel."""
+        return self._n_items
+
+    def do_get_item(self, position: int) -> Optional[GpxItem]:
+        """Get the item at a position, reading its page if needed, see Gio.ListModel."""
+        if position >= self._n_items:
+            return None
+
+        for hidden_position in self._hidden_positions:
+            if hidden_position > position:
+                break
+            position += 1
+
+        page_index, index = divmod(position, self.PAGE_SIZE)
+        page = self._get_page(page_index)
+        if index < len(page):
+            return page[index]
+
+        # The records were removed since they were counted, an item is still
+        # needed for every position until the model is reloaded
+        if not self._reload_source:
+            self._reload_source = GLib.idle_add(self._on_reload_idle)
+        return GpxItem(0, "", 2, 0, 0.0, 0.0, 0.0)
+
+    def set_query(self, search_entry: Optional[str] = None, order_by: Optional[str] = None,
+                  descending: Optional[bool] = None) -> None:
+        """Filter and sort the records, then reload the model.
+
+        :param search_entry: Text filter, see SQLiteHelper.search_gpx_records
+        :type search_entry: Optional[str]
+        :param order_by: Sort column, one of SQLiteHelper.GPX_SORT_COLUMNS, None to keep the current one
+        :type order_by: Optional[str]
+        :param descending: Sort in descending order, None to keep the current one
+        :type descending: Optional[bool]
+        """
+        self._search_entry = search_entry or None
+        if order_by is not None:
+            self._order_by = order_by
+        if descending is not None:
+            self._descending = descending
+        self.reload()
+
+    def reload(self, n_items: Optional[int] = None, first_page: Optional[list[tuple]] = None) -> None:
+        """Drop the cached pages and count the records again.
+
+        :param n_items: Number of records if already known
+        :type n_items: Optional[int]
+        :param first_page: First page of records if already known
+        :type first_page: Optional[list[tuple]]
+        """
+        removed = self._n_items
+        self._cancel_reload()
+        self._pages.clear()
+        self._page_keys.clear()
+        if n_items is None:
+            n_items = self._sqlitehelper.count_gpx_records(self._search_entry)
+        self._n_items = n_items
+        if first_page is not None:
+            self._set_page(0, first_page)
+        self.items_changed(0, removed, self._n_items)
+
+    def clear(self) -> None:
+        """Remove all the records from the model until the next reload."""
+        removed = self._n_items
+        self._cancel_reload()
+        self._n_items = 0
+        self._pages.clear()
+        self._page_keys.clear()
+        self.items_changed(0, removed, 0)
+
+    def add_records(self, records: list[tuple]) -> None:
+        """Insert the records added to the database since the last count.
+
+        Only the cached pages from the first inserted record are dropped. The
+        model is reloaded if other records were added or removed meanwhile.
+
+        :param records: List of records
+        :type records: list[tuple]
+        """
+        positions = self._sqlitehelper.get_gpx_records_positions(
+            [record[0] for record in records], self._order_by, self._descending, self._search_entry)
+        n_items = self._sqlitehelper.count_gpx_records(self._search_entry)
+        if n_items != self._n_items + len(positions):
+            self.reload(n_items)
+            return
+        if not positions:
+            return
+
+        first_page_index = positions[0] // self.PAGE_SIZE
+        for page_index in [page_index for page_index in self._pages if page_index >= first_page_index]:
+            del self._pages[page_index]
+        for page_index in [page_index for page_index in self._page_keys if page_index >= first_page_index]:
+            del self._page_keys[page_index]
+
+        # Each run of consecutive records is announced in ascending order, the
+        # following ones are hidden until then so that the view reads the rows
+        # matching the items it was told about
+        hidden_positions = positions
+        while hidden_positions:
+            position = hidden_positions[0]
+            count = 1
+            while count < len(hidden_positions) and hidden_positions[count] == position + count:
+                count += 1
+            hidden_positions = hidden_positions[count:]
+            self._hidden_positions = hidden_positions
+            self._n_items = n_items - len(hidden_positions)
+            self.items_changed(position, 0, count)
+
+    def update_records(self, records: list[tuple]) -> None:
+        """Update the cached items of the records, moving them if the sort column changed.
+
+        The cached pages are read again, only the rows between the first and
+        the last one which moved are replaced in the view. Items not read yet
+        get the new values from SQLite when displayed. The model is reloaded
+        if the number of records matching the filter changed.
+
+        :param records: List of records
+        :type records: list[tuple]
+        """
+        n_items = self._sqlitehelper.count_gpx_records(self._search_entry)
+        if n_items != self._n_items:
+            self.reload(n_items)
+            return
+
+        records_by_id = {record[0]: record for record in records}
+        updated_positions = []
+        moved_positions = []
+        for page_index, page in list(self._pages.items()):
+            page_records = self._sqlitehelper.get_gpx_records_page(
+                self._order_by, self._descending, offset=page_index * self.PAGE_SIZE, limit=self.PAGE_SIZE,
+                search_entry=self._search_entry)
+            new_page = []
+            for index, record in enumerate(page_records):
+                position = page_index * self.PAGE_SIZE + index
+                item = page[index] if index < len(page) else None
+                if item is not None and item.id == record[0]:
+                    if record[0] in records_by_id:
+                        item.update(record)
+                        updated_positions.append(position)
+                else:
+                    item = GpxItem(*record)
+                    moved_positions.append(position)
+                new_page.append(item)
+            self._pages[page_index] = new_page
+            if page_records:
+                column = SQLiteHelper.GPX_SORT_COLUMNS.index(self._order_by) + 1
+                self._page_keys[page_index] = (page_records[-1][column], page_records[-1][0])
+
+        if moved_positions:
+            # Keys of the pages not read again may point to a moved record
+            for page_index in [page_index for page_index in self._page_keys if page_index not in self._pages]:
+                del self._page_keys[page_index]
+            first, last = min(moved_positions), max(moved_positions)
+            self.items_changed(first, last - first + 1, last - first + 1)
+            updated_positions = [position for position in updated_positions if not first <= position <= last]
+        for position in updated_positions:
+            self.items_changed(position, 1, 1)
+
+    def _on_reload_idle(self) -> bool:
+        self._reload_source = 0
+        self.reload()
+        return GLib.SOURCE_REMOVE
+
+    def _cancel_reload(self) -> None:
+        if self._reload_source:
+            GLib.source_remove(self._reload_source)
+            self._reload_source = 0
+
+    def _get_page(self, page_index: int) -> list[GpxItem]:
+        page = self._pages.get(page_index)
+        if page is not None:
+            self._pages.move_to_end(page_index)
+            return page
+
+        expected = min(self.PAGE_SIZE, self._n_items - page_index * self.PAGE_SIZE)
+        after = self._page_keys.get(page_index - 1)
+        records = None
+        if after is not None and after[0] is not None:
+            records = self._sqlitehelper.get_gpx_records_page(
+                self._order_by, self._descending, after=after, limit=self.PAGE_SIZE,
+                search_entry=self._search_entry)
+        # NULL values are not reachable with the keyset, skip the rows instead
+        if records is None or len(records) < expected:
+            records = self._sqlitehelper.get_gpx_records_page(
+                self._order_by, self._descending, offset=page_index * self.PAGE_SIZE, limit=self.PAGE_SIZE,
+                search_entry=self._search_entry)
+        return self._set_page(page_index, records)
+
+    def _set_page(self, page_index: int, records: list[tuple]) -> list[GpxItem]:
+        page = [GpxItem(*record) for record in records]
+        self._pages[page_index] = page
+        if len(self._pages) > self.MAX_PAGES:
+            self._pages.popitem(last=False)
+
+        if records:
+            column = SQLiteHelper.GPX_SORT_COLUMNS.index(self._order_by) + 1
+            self._page_keys[page_index] = (records[-1][column], records[-1][0])
+        return page
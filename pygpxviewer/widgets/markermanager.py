@@ -0,0 +1,173 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+import math
+
+import numpy as np
+from gi.repository import Gtk, Shumate
+
+
+def get_clusters(latitudes: np.ndarray, longitudes: np.ndarray, zoom_level: int, cell_size: int) -> tuple:
+    """Group locations into the cells of a square grid in map pixels.
+
+    :param latitudes: Latitudes in degrees
+    :type latitudes: np.ndarray
+    :param longitudes: Longitudes in degrees
+    :type longitudes: np.ndarray
+    :param zoom_level: Zoom level of the grid
+    :type zoom_level: int
+    :param cell_size: Size of a grid cell in pixels
+    :type cell_size: int
+    :returns: Cell of each location, cells, cell counts and cell mean latitudes and longitudes
+    :rtype: tuple
+    """
+    world_size = 256 * 2 ** zoom_level
+    radians = np.radians(np.clip(latitudes, -85.0511, 85.0511))
+    x = (longitudes + 180) / 360 * world_size
+    y = (1 - np.arcsinh(np.tan(radians)) / math.pi) / 2 * world_size
+
+    # Flatten the (column, row) grid coordinates into a single key
+    columns = world_size // cell_size + 1
+    keys = (x // cell_size).astype(np.int64) * columns + (y // cell_size).astype(np.int64)
+    keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    cells = np.stack(np.divmod(keys, columns), axis=1)
+    mean_latitudes = np.bincount(inverse, weights=latitudes) / counts
+    mean_longitudes = np.bincount(inverse, weights=longitudes) / counts
+    return inverse, cells, counts, mean_latitudes, mean_longitudes
+
+
+class MarkerManager:
+    """Display the POI markers of the visible viewport.
+
+    Marker widgets are recycled from a pool as the map moves and POIs
+    are clustered into grid cells at low zoom levels, so the number of
+    widgets is bound by the viewport size instead of the POI set.
+    """
+
+    # POIs are clustered below this zoom level
+    _CLUSTER_MAX_ZOOM_LEVEL = 13
+    # Size in pixels of a cluster grid cell
+    _CLUSTER_CELL_SIZE = 64
+    # Maximum number of unused markers kept for reuse, per kind of marker
+    _MAX_POOL_SIZE = 256
+
+    def __init__(self, viewport: Shumate.Viewport, css_classes: dict[str, str]):
+        self._layer = Shumate.MarkerLayer().new(viewport)
+        self._css_classes = css_classes
+
+        self._markers: dict[tuple, Shumate.Marker] = {}
+        self._poi_pool: list[Shumate.Marker] = []
+        self._cluster_pool: list[Shumate.Marker] = []
+
+    @property
+    def layer(self) -> Shumate.MarkerLayer:
+        """Get the marker layer holding the POI markers.
+
+        :returns: Marker layer
+        :rtype: Shumate.MarkerLayer
+        """
+        return self._layer
+
+    def update(self, records: list, zoom_level: float) -> None:
+        """Display POIs, replacing the markers of the previous update.
+
+        :param records: POI records as (id, name, type, link, lat, lng)
+        :type records: list
+        :param zoom_level: Zoom level of the viewport
+        :type zoom_level: float
+        """
+        records = [record for record in records if record[2] in self._css_classes]
+        zoom_level = math.floor(zoom_level)
+
+        markers = {}
+        if zoom_level < self._CLUSTER_MAX_ZOOM_LEVEL and len(records) > 1:
+            latitudes = np.fromiter((record[4] for record in records), float, len(records))
+            longitudes = np.fromiter((record[5] for record in records), float, len(records))
+            inverse, cells, counts, mean_latitudes, mean_longitudes = \
+                get_clusters(latitudes, longitudes, zoom_level, self._CLUSTER_CELL_SIZE)
+
+            for record, cell in zip(records, inverse.tolist()):
+                if counts[cell] == 1:
+                    markers[("poi", record[0])] = (record[4], record[5], record[2])
+            for cell, count in enumerate(counts.tolist()):
+                if count > 1:
+                    key = ("cluster", zoom_level, *cells[cell].tolist())
+                    markers[key] = (mean_latitudes[cell], mean_longitudes[cell], count)
+        else:
+            for record in records:
+                markers[("poi", record[0])] = (record[4], record[5], record[2])
+
+        # Recycle the markers leaving the viewport before creating new ones
+        for key in self._markers.keys() - markers.keys():
+            marker = self._markers.pop(key)
+            self._layer.remove_marker(marker)
+            pool = self._poi_pool if key[0] == "poi" else self._cluster_pool
+            if len(pool) < self._MAX_POOL_SIZE:
+                pool.append(marker)
+
+        # Kept clusters may have gained or lost POIs since the last update
+        for key in markers.keys() & self._markers.keys():
+            if key[0] == "cluster":
+                latitude, longitude, count = markers[key]
+                marker = self._markers[key]
+                marker.get_child().set_text(str(count))
+                marker.set_location(latitude, longitude)
+
+        for key in markers.keys() - self._markers.keys():
+            latitude, longitude, value = markers[key]
+            if key[0] == "poi":
+                marker = self._get_poi_marker(self._css_classes[value])
+            else:
+                marker = self._get_cluster_marker(value)
+            marker.set_location(latitude, longitude)
+            self._layer.add_marker(marker)
+            self._markers[key] = marker
+
+    def clear(self) -> None:
+        """Remove all the markers."""
+        self.update([], self._CLUSTER_MAX_ZOOM_LEVEL)
+
+    def _get_poi_marker(self, css_class: str) -> Shumate.Marker:
+        if self._poi_pool:
+            marker = self._poi_pool.pop()
+            marker_image = marker.get_child()
+        else:
+            marker = Shumate.Marker().new()
+            marker_image = Gtk.Image().new_from_icon_name("media-record-symbolic")
+            marker_image.set_pixel_size(10)
+            marker.set_child(marker_image)
+
+        marker_image.set_css_classes([css_class])
+        return marker
+
+    def _get_cluster_marker(self, count: int) -> Shumate.Marker:
+        if self._cluster_pool:
+            marker = self._cluster_pool.pop()
+            marker_label = marker.get_child()
+        else:
+            marker = Shumate.Marker().new()
+            marker_label = Gtk.Label()
+            marker_label.set_css_classes(["marker_cluster"])
+            marker.set_child(marker_label)
+
+        marker_label.set_text(str(count))
+        return marker
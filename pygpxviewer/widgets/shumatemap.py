@@ -20,11 +20,15 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 import math
+from typing import TYPE_CHECKING
 
-from gi.repository import Gio, GObject, Gtk, Shumate
+from gi.repository import Gio, GLib, GObject, Gtk, Shumate
 
 from pygpxviewer.helpers.sqlitehelper import SQLiteHelper
-from pygpxviewer.widgets.elevationprofile import ElevationProfile
+from pygpxviewer.widgets.markermanager import MarkerManager
+
+if TYPE_CHECKING:
+    from pygpxviewer.widgets.elevationprofile import ElevationProfile
 
 
 class ShumateMap(Shumate.SimpleMap):
@@ -37,25 +41,37 @@ class ShumateMap(Shumate.SimpleMap):
         * Compass
     """
 
+    # Delay in ms between the last viewport change and the POIs refresh
+    _POI_REFRESH_DELAY = 150
+
     def __init__(self, window):
         super().__init__()
 
         self._settings = Gio.Settings.new("com.github.pygpxviewer.app.window.detailed.map")
 
         self._gpx_helper = window.gpx_helper
-        self._bounds = self._gpx_helper.gpx.get_bounds()
+        self._bounds = self._gpx_helper.stats.bounds
+        self._sqlitehelper = SQLiteHelper()
 
-        self._refuge_layer = None
-        self._hut_layer = None
-        self._water_layer = None
+        self._marker_manager = None
         self._path_layer = None
         self._marker_layer = None
         self._marker = None
 
+        self._poi_refresh_id = None
+        self._path_pyramid = []
+        self._path_zoom_level = None
+
         self._set_map()
         self._set_marker()
         self._set_layers()
 
+        viewport = self.get_viewport()
+        for property_name in ["latitude", "longitude", "zoom-level"]:
+            viewport.connect(f"notify::{property_name}", self._on_viewport_changed)
+        viewport.connect("notify::zoom-level", self._on_zoom_level_changed)
+        self.connect("unrealize", self._on_unrealize)
+
     @GObject.Property(type=Gio.Settings, flags=GObject.ParamFlags.READABLE)
     def settings(self):
         """Get Window settings property.
@@ -112,10 +128,7 @@ class ShumateMap(Shumate.SimpleMap):
             radians = math.atan(math.sinh(latitude_derivation * 2 * math.pi))
             return math.degrees(radians)
 
-        min_latitude = self._bounds.min_latitude
-        min_longitude = self._bounds.min_longitude
-        max_latitude = self._bounds.max_latitude
-        max_longitude = self._bounds.max_longitude
+        min_latitude, min_longitude, max_latitude, max_longitude = self._bounds
 
         min_latitude_derivation = get_latitude_derivation(min_latitude)
         max_latitude_derivation = get_latitude_derivation(max_latitude)
@@ -151,52 +164,77 @@ class ShumateMap(Shumate.SimpleMap):
         self.set_map_source(map_source)
 
     def _set_layers(self):
-        self._refuge_layer = Shumate.MarkerLayer().new(self.get_viewport())
-        self._hut_layer = Shumate.MarkerLayer().new(self.get_viewport())
-        self._water_layer = Shumate.MarkerLayer().new(self.get_viewport())
         self._path_layer = Shumate.PathLayer().new(self.get_viewport())
         self._marker_layer = Shumate.MarkerLayer().new(self.get_viewport())
 
-        # Refuge, hut & water layer
-        sqlitehelper = SQLiteHelper()
-        layers = [
-            {"type": "refuge", "layer": self._refuge_layer, "css": "marker_refuge"},
-            {"type": "hut", "layer": self._hut_layer, "css": "marker_hut"},
-            {"type": "water", "layer": self._water_layer, "css": "marker_water"}
-        ]
-        for layer in layers:
-            records = sqlitehelper.search_pois_records(
-                layer["type"],
-                (self._bounds.min_latitude, self._bounds.min_longitude,
-                 self._bounds.max_latitude, self._bounds.max_longitude))
-            for record in records:
-                marker = Shumate.Marker().new()
-                marker.set_location(record[4], record[5])
-
-                marker_image = Gtk.Image().new_from_icon_name("media-record-symbolic")
-                marker_image.set_pixel_size(10)
-
-                context = marker_image.get_style_context()
-                Gtk.StyleContext.add_class(context, layer["css"])
-
-                marker.set_child(marker_image)
-                layer["layer"].add_marker(marker)
-
-        # Path layer
-        locations = self._gpx_helper.get_gpx_locations()
-        for location in locations:
-            self._path_layer.add_node(Shumate.Coordinate().new_full(location[0], location[1]))
+        # Refuge, hut & water markers, filled from the viewport in _refresh_pois
+        self._marker_manager = MarkerManager(self.get_viewport(), {
+            "refuge": "marker_refuge",
+            "hut": "marker_hut",
+            "water": "marker_water"
+        })
+
+        # Path layer, nodes are swapped with the zoom level in _set_path_nodes
+        track = self._gpx_helper.track
+        self._path_pyramid = track.get_lod_pyramid(self.get_map_source().get_max_zoom_level())
+        self._set_path_nodes()
 
         # Marker layer
-        self._marker.set_location(locations[0][0], locations[0][1])
+        self._marker.set_location(track.latitudes[0], track.longitudes[0])
         self._marker_layer.add_marker(self._marker)
 
-        # self.add_overlay_layer(self._refuge_layer)
-        # self.add_overlay_layer(self._hut_layer)
-        # self.add_overlay_layer(self._water_layer)
+        self.add_overlay_layer(self._marker_manager.layer)
         self.add_overlay_layer(self._path_layer)
         self.add_overlay_layer(self._marker_layer)
 
+    def _set_path_nodes(self) -> None:
+        zoom_level = min(math.floor(self.get_viewport().get_zoom_level()), len(self._path_pyramid) - 1)
+        if zoom_level == self._path_zoom_level:
+            return
+        self._path_zoom_level = zoom_level
+
+        track = self._gpx_helper.track
+        indices = self._path_pyramid[zoom_level]
+        self._path_layer.remove_all()
+        for latitude, longitude in zip(track.latitudes[indices].tolist(), track.longitudes[indices].tolist()):
+            self._path_layer.add_node(Shumate.Coordinate().new_full(latitude, longitude))
+
+    def _on_zoom_level_changed(self, viewport: Shumate.Viewport, pspec: GObject.ParamSpec) -> None:
+        self._set_path_nodes()
+
+    def _get_viewport_bounds(self):
+        map_widget = self.get_map()
+        width = map_widget.get_width()
+        height = map_widget.get_height()
+        if not width or not height:
+            return None
+
+        viewport = self.get_viewport()
+        max_latitude, min_longitude = viewport.widget_coords_to_location(map_widget, 0, 0)
+        min_latitude, max_longitude = viewport.widget_coords_to_location(map_widget, width, height)
+        return min_latitude, min_longitude, max_latitude, max_longitude
+
+    def _on_viewport_changed(self, viewport: Shumate.Viewport, pspec: GObject.ParamSpec) -> None:
+        if self._poi_refresh_id:
+            GLib.source_remove(self._poi_refresh_id)
+        self._poi_refresh_id = GLib.timeout_add(self._POI_REFRESH_DELAY, self._refresh_pois)
+
+    def _on_unrealize(self, widget: Gtk.Widget) -> None:
+        # A pending refresh must not run on the layers of a destroyed map
+        if self._poi_refresh_id:
+            GLib.source_remove(self._poi_refresh_id)
+            self._poi_refresh_id = None
+
+    def _refresh_pois(self) -> bool:
+        self._poi_refresh_id = None
+
+        bounds = self._get_viewport_bounds()
+        if bounds:
+            records = self._sqlitehelper.search_pois_records(bounds)
+            self._marker_manager.update(records, self.get_viewport().get_zoom_level())
+
+        return GLib.SOURCE_REMOVE
+
     def _set_marker(self):
         self._marker = Shumate.Marker().new()
 
@@ -208,7 +246,7 @@ class ShumateMap(Shumate.SimpleMap):
 
         self._marker.set_child(marker_image)
 
-    def on_mouse_move_event(self, widget: ElevationProfile, latitude: float, longitude: float) -> None:
+    def on_mouse_move_event(self, widget: "ElevationProfile", latitude: float, longitude: float) -> None:
         """Handle the mouse move event on the ElevationProfile widget.
 
         :param widget:
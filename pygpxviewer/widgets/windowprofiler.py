@@ -0,0 +1,98 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+from gettext import gettext as _
+from typing import Optional
+
+from gi.repository import Adw, GLib, Gtk
+
+from pygpxviewer.profiler import Profiler
+
+
+@Gtk.Template(resource_path="/com/github/pygpxviewer/ui/WindowProfiler.ui")
+class WindowProfiler(Adw.Window):
+    """Debug window listing the timings recorded by the Profiler.
+
+    Statistics are refreshed every second while the window is open.
+    """
+
+    __gtype_name__ = "WindowProfiler"
+
+    _grid = Gtk.Template.Child()
+
+    _COLUMNS = ["count", "mean", "p50", "p95", "p99", "max"]
+    _REFRESH_DELAY = 1
+
+    def __init__(self, window):
+        super().__init__(title=_("Profiler"))
+
+        self._window = window
+        self._labels = {}
+
+        self._set_header()
+        self._refresh()
+        self._refresh_source_id = GLib.timeout_add_seconds(self._REFRESH_DELAY, self._refresh)
+        self.connect("close-request", self._on_close_request)
+
+    def _set_header(self):
+        for column, title in enumerate([_("Metric"), _("Count"), _("Mean"), _("p50"), _("p95"), _("p99"), _("Max")]):
+            label = Gtk.Label(label=title, xalign=0 if column == 0 else 1)
+            label.add_css_class("heading")
+            self._grid.attach(label, column, 0, 1, 1)
+
+    def _refresh(self) -> bool:
+        for name, summary in Profiler.get_summaries().items():
+            labels = self._labels.get(name)
+            if labels is None:
+                labels = self._labels[name] = [Gtk.Label(xalign=0 if column == 0 else 1) for column in range(7)]
+                labels[0].set_label(name)
+                row = len(self._labels)
+                for column, label in enumerate(labels):
+                    label.add_css_class("numeric")
+                    self._grid.attach(label, column, row, 1, 1)
+
+            labels[1].set_label(str(summary["count"]))
+            for label, key in zip(labels[2:], self._COLUMNS[1:]):
+                label.set_label(self._format(summary.get(key), summary["unit"]))
+        return GLib.SOURCE_CONTINUE
+
+    @staticmethod
+    def _format(value: Optional[float], unit: str) -> str:
+        if value is None:
+            return "-"
+        if unit == "s":
+            return f"{value * 1000:.2f} ms"
+        if unit == "B/s":
+            return f"{value / 1000 / 1000:.2f} MB/s"
+        return f"{value:.2f} {unit}"
+
+    @Gtk.Template.Callback()
+    def _on_clear_button_clicked(self, button: Gtk.Button) -> None:
+        Profiler.clear()
+        for labels in self._labels.values():
+            for label in labels:
+                self._grid.remove(label)
+        self._labels.clear()
+
+    def _on_close_request(self, window: Adw.Window) -> bool:
+        GLib.source_remove(self._refresh_source_id)
+        return False
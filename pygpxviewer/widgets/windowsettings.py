@@ -39,7 +39,12 @@ class WindowSettings(Adw.Window):
     _clean_headers_switch = Gtk.Template.Child()
     _clean_attributes_switch = Gtk.Template.Child()
     _elevation_switch = Gtk.Template.Child()
+    _elevation_interpolation_switch = Gtk.Template.Child()
     _simplify_switch = Gtk.Template.Child()
+    _simplify_tolerance_spin_button = Gtk.Template.Child()
+    _simplify_max_points_spin_button = Gtk.Template.Child()
+    _rescan_hash_switch = Gtk.Template.Child()
+    _workers_spin_button = Gtk.Template.Child()
     _clear_cache_label = Gtk.Template.Child()
 
     def __init__(self, window):
@@ -65,10 +70,38 @@ class WindowSettings(Adw.Window):
             "elevation", self._elevation_switch, "active",
             Gio.SettingsBindFlags.DEFAULT)
 
+        self._settings.bind(
+            "elevation-interpolation", self._elevation_interpolation_switch, "active",
+            Gio.SettingsBindFlags.DEFAULT)
+
         self._settings.bind(
             "simplify", self._simplify_switch, "active",
             Gio.SettingsBindFlags.DEFAULT)
 
+        self._settings.bind(
+            "simplify-tolerance", self._simplify_tolerance_spin_button, "value",
+            Gio.SettingsBindFlags.DEFAULT)
+
+        self._settings.bind(
+            "simplify-max-points", self._simplify_max_points_spin_button, "value",
+            Gio.SettingsBindFlags.DEFAULT)
+
+        self._settings.bind(
+            "simplify", self._simplify_tolerance_spin_button, "sensitive",
+            Gio.SettingsBindFlags.GET)
+
+        self._settings.bind(
+            "simplify", self._simplify_max_points_spin_button, "sensitive",
+            Gio.SettingsBindFlags.GET)
+
+        self._settings.bind(
+            "rescan-hash", self._rescan_hash_switch, "active",
+            Gio.SettingsBindFlags.DEFAULT)
+
+        self._settings.bind(
+            "workers", self._workers_spin_button, "value",
+            Gio.SettingsBindFlags.DEFAULT)
+
     def _set_cache(self):
         self._size = sum(f.stat().st_size for f in Path(config.dem_path).glob("**/*.hgt") if f.is_file())
         self._size = round(self._size / 1000 / 1000)
@@ -76,7 +109,10 @@ class WindowSettings(Adw.Window):
 
     @Gtk.Template.Callback()
     def _on_clear_cache_button_clicked(self, widget):
+        from pygpxviewer.helpers.demhelper import DemHelper
+
+        DemHelper.clear_cache()
         for path in Path(config.dem_path).glob("**/*.hgt"):
             path.unlink()
-        logger.info(_(f"cache cleared: {self._size} MB"))
+        logger.info(_("cache cleared: %s MB"), self._size)
         self._set_cache()
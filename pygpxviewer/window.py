@@ -25,9 +25,10 @@ from typing import Optional
 
 from gi.repository import Adw, Gio, GLib, GObject, Gtk
 
-from pygpxviewer.threads.workers import WorkerUpdateRecords
+from pygpxviewer.threads.workers import WorkerSetRecords, WorkerUpdateRecords
 from pygpxviewer.widgets.appmenu import AppMenu
 from pygpxviewer.widgets.gpxcolumnview import GpxColumnView
+from pygpxviewer.widgets.windowprofiler import WindowProfiler
 from pygpxviewer.widgets.windowsettings import WindowSettings
 
 
@@ -41,6 +42,9 @@ class Window(Adw.ApplicationWindow):
 
     _headerbar = Gtk.Template.Child()
     _menu_button = Gtk.Template.Child()
+    _open_button = Gtk.Template.Child()
+    _cancel_button = Gtk.Template.Child()
+    _progress_label = Gtk.Template.Child()
     _scrolled_window = Gtk.Template.Child()
     _spinner = Gtk.Template.Child()
 
@@ -54,11 +58,13 @@ class Window(Adw.ApplicationWindow):
 
         self._app_menu = AppMenu()
         self._gpx_column_view = GpxColumnView(self)
+        self._worker_update_records: Optional[WorkerUpdateRecords] = None
+        self._worker_set_records: Optional[WorkerSetRecords] = None
 
         self._set_actions()
         self._setup_view()
 
-        self._gpx_column_view.refresh()
+        self._gpx_column_view.preload()
 
     @GObject.Property(type=Gtk.Spinner, flags=GObject.ParamFlags.READABLE)
     def spinner(self) -> Gtk.Spinner:
@@ -81,7 +87,10 @@ class Window(Adw.ApplicationWindow):
     def _set_actions(self):
         action_entries = [
             ('refresh', self._refresh, ("win.refresh", ["<Ctrl>R"])),
+            ('set_records', self._set_records, ("win.set_records", ["<Ctrl><Shift>R"])),
+            ('set_all_records', self._set_all_records, None),
             ('window_settings', self._window_settings, None),
+            ('profiler', self._profiler, None),
             ("about", self._about, None)
         ]
 
@@ -135,28 +144,115 @@ class Window(Adw.ApplicationWindow):
     def _on_file_chooser_response(self, dialog: Gtk.FileChooserNative, response: Gtk.ResponseType) -> None:
         if response == Gtk.ResponseType.ACCEPT:
             self.folder_path = dialog.get_file().get_path()
-            self._update_records()
+            self._update_records(rescan=False)
+
+    def _update_records(self, rescan: bool = True) -> None:
+        self._set_update_records_running(True)
+        self._progress_label.set_text("")
+        if not rescan:
+            self._gpx_column_view.clear()
 
-    def _update_records(self):
-        self.set_sensitive(False)
-        self._spinner.start()
+        self._worker_update_records = WorkerUpdateRecords(
+            self.folder_path, self._on_update_records_ended, rescan, self._on_update_records_progress)
+        self._worker_update_records.start()
 
-        thread = WorkerUpdateRecords(self.folder_path, self._on_update_records_ended)
-        thread.start()
+    def _on_update_records_progress(self, records: list[tuple], done: int, total: int) -> None:
+        self._progress_label.set_text(f"{done} / {total}")
+        self._gpx_column_view.add_records(records)
 
     def _on_update_records_ended(self):
+        self._worker_update_records = None
         self._gpx_column_view.refresh()
-        self._spinner.stop()
-        self.set_sensitive(True)
+        self._set_update_records_running(False)
+
+    def set_records(self, paths: Optional[list[str]] = None) -> None:
+        """Apply the gpx settings to gpx files in the background.
+
+        :param paths: Paths of the gpx files, None for all the records
+        :type paths: Optional[list[str]]
+        """
+        if self._worker_update_records or self._worker_set_records:
+            return
+
+        self._set_update_records_running(True)
+        self._progress_label.set_text("")
+
+        self._worker_set_records = WorkerSetRecords(paths, self._on_set_records_ended, self._on_set_records_progress,
+                                                    self._on_set_records_download_progress)
+        self._worker_set_records.start()
+
+    def _on_set_records_progress(self, path: str, done: int, total: int) -> None:
+        self._progress_label.set_text(f"{done} / {total}")
+        self._progress_label.set_tooltip_text(path)
+
+    def _on_set_records_download_progress(self, downloaded: int, total: int) -> None:
+        self._progress_label.set_text(f"{downloaded / 1000 / 1000:.1f} / {total / 1000 / 1000:.1f} MB")
+        self._progress_label.set_tooltip_text(_("Downloading the elevation files"))
+
+    def _on_set_records_ended(self, records: Optional[list[tuple]]) -> None:
+        self._worker_set_records = None
+        if records is None:
+            self._gpx_column_view.refresh()
+        else:
+            self._gpx_column_view.update_records(records)
+        self._progress_label.set_tooltip_text(None)
+        self._set_update_records_running(False)
+
+    def _set_update_records_running(self, running: bool) -> None:
+        self.lookup_action("refresh").set_enabled(not running)
+        self.lookup_action("set_records").set_enabled(not running)
+        self.lookup_action("set_all_records").set_enabled(not running)
+        self._open_button.set_sensitive(not running)
+        self._cancel_button.set_visible(running)
+        self._progress_label.set_visible(running)
+        if running:
+            self._spinner.start()
+        else:
+            self._spinner.stop()
+
+    @Gtk.Template.Callback()
+    def _on_cancel_button_clicked(self, button: Gtk.Button) -> None:
+        if self._worker_update_records:
+            self._worker_update_records.cancel()
+        if self._worker_set_records:
+            self._worker_set_records.cancel()
 
     def _refresh(self, action: Gio.SimpleAction, param: Optional[GLib.Variant]) -> None:
         self._update_records()
 
+    def _set_records(self, action: Gio.SimpleAction, param: Optional[GLib.Variant]) -> None:
+        paths = self._gpx_column_view.get_selected_paths()
+        if paths:
+            self.set_records(paths)
+
+    def _set_all_records(self, action: Gio.SimpleAction, param: Optional[GLib.Variant]) -> None:
+        # Every gpx file of the folder is rewritten, ask first
+        dialog = Adw.MessageDialog(
+            transient_for=self,
+            heading=_("Update all tracks?"),
+            body=_("The gpx settings are applied to every file of the folder, the files are overwritten."))
+        dialog.add_response("cancel", _("_Cancel"))
+        dialog.add_response("update", _("_Update"))
+        dialog.set_response_appearance("update", Adw.ResponseAppearance.DESTRUCTIVE)
+        dialog.set_default_response("cancel")
+        dialog.set_close_response("cancel")
+        dialog.connect("response", self._on_set_all_records_response)
+        dialog.present()
+
+    def _on_set_all_records_response(self, dialog: Adw.MessageDialog, response: str) -> None:
+        if response == "update":
+            self.set_records()
+
     def _window_settings(self, action: Gio.SimpleAction, param: Optional[GLib.Variant]) -> None:
         window_settings = WindowSettings(self)
         window_settings.props.transient_for = self
         window_settings.present()
 
+    def _profiler(self, action: Gio.SimpleAction, param: Optional[GLib.Variant]) -> None:
+        window_profiler = WindowProfiler(self)
+        window_profiler.props.transient_for = self
+        window_profiler.present()
+
     def _about(self, action: Gio.SimpleAction, param: Optional[GLib.Variant]) -> None:
         about_window = Adw.AboutWindow(
             application_name="pyGpxViewer",
@@ -89,7 +89,15 @@ CREATE TABLE IF NOT EXISTS poi (
 """
 cur.execute(sql)
 
-sql = "CREATE INDEX index_poi ON poi (type, lat, lng)"
+sql = """
+CREATE VIRTUAL TABLE IF NOT EXISTS poi_rtree USING rtree(
+    id,
+    min_lat,
+    max_lat,
+    min_lng,
+    max_lng
+);
+"""
 cur.execute(sql)
 
 with open("../poi/poi.json") as json_file:
@@ -107,6 +115,12 @@ INSERT INTO poi(name, type, link, lat, lng)
 """
 cur.executemany(sql, records)
 
+sql = """
+INSERT INTO poi_rtree(id, min_lat, max_lat, min_lng, max_lng)
+    SELECT id, lat, lat, lng, lng FROM poi
+"""
+cur.execute(sql)
+
 conn.commit()
 conn.close()
 
@@ -0,0 +1,75 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import numpy as np
+import pytest
+
+from pygpxviewer.helpers.demhelper import HGT_VOID, DemHelper
+
+
+@pytest.fixture
+def dem_helper(tmp_path):
+    # 3 arc-second tile sloping from 100 m (south west) to 500 m (north east), first row is the north edge
+    rows, columns = np.mgrid[0:1201, 0:1201]
+    tile = (100 + (1200 - rows) // 6 + columns // 6).astype(">i2")
+    tile[1200, 1200] = HGT_VOID
+    tile.tofile(tmp_path.joinpath("N45E006.hgt"))
+    yield DemHelper(tmp_path)
+    DemHelper.clear_cache()
+
+
+class TestDemHelper:
+    def test_hgt_file_name(self):
+        assert DemHelper.get_hgt_file_name(45.5, 6.5) == "N45E006.hgt"
+        assert DemHelper.get_hgt_file_name(-0.5, -0.5) == "S01W001.hgt"
+
+    def test_hgt_file_names(self, dem_helper):
+        hgt_file_names = dem_helper.get_hgt_file_names(np.array([45.1, 45.9, 46.1]), np.array([6.1, 6.9, 6.1]))
+        assert hgt_file_names == {"N45E006.hgt", "N46E006.hgt"}
+
+    def test_hgt_file_names_in_bounds(self, dem_helper):
+        hgt_file_names = dem_helper.get_hgt_file_names_in_bounds((45.5, -0.5, 46.5, 0.5))
+        assert hgt_file_names == {"N45W001.hgt", "N45E000.hgt", "N46W001.hgt", "N46E000.hgt"}
+
+    def test_nearest_elevations(self, dem_helper):
+        elevations = dem_helper.get_elevations(np.array([45.999, 45.0, 45.5, 45.0, 46.5]),
+                                               np.array([6.0, 6.0, 6.5, 7.0, 6.0]))
+        assert elevations[:3].tolist() == [299, 100, 300]
+        assert np.isnan(elevations[3])
+        assert np.isnan(elevations[4])
+
+    def test_interpolated_elevations(self, dem_helper):
+        elevations = dem_helper.get_elevations(np.array([45.75, 46 - 1199.4 / 1200]),
+                                               np.array([6.25, 6 + 1199.6 / 1200]), interpolate=True)
+        assert elevations[0] == pytest.approx(300)
+        # Void sample, nearest sample is used
+        assert elevations[1] == 300
+
+    def test_tile_cache(self, tmp_path, dem_helper):
+        assert dem_helper.get_tile("N45E006.hgt") is dem_helper.get_tile("N45E006.hgt")
+        assert dem_helper.get_tile("N00E000.hgt") is None
+
+    def test_invalid_tile(self, tmp_path, dem_helper):
+        # Truncated file
+        np.zeros(1201 * 600, dtype=">i2").tofile(tmp_path.joinpath("N44E006.hgt"))
+        assert dem_helper.get_tile("N44E006.hgt") is None
+        assert np.isnan(dem_helper.get_elevations(np.array([44.5]), np.array([6.5]))).all()
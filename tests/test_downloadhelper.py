@@ -0,0 +1,119 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import io
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("gi")
+
+from pygpxviewer import config  # noqa: E402
+from pygpxviewer.helpers.downloadhelper import DownloadHelper  # noqa: E402
+
+
+def get_zip(hgt_file_name):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as z:
+        z.writestr(f"folder/{hgt_file_name}", bytes(range(256)) * 64)
+        z.writestr("folder/readme.txt", "readme")
+    return buffer.getvalue()
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = self.server.files.get(self.path)
+        range_header = self.headers.get("Range")
+        self.server.ranges.append(range_header)
+        if body is None:
+            self.send_error(404)
+            return
+
+        start = 0
+        if range_header:
+            start = int(range_header.split("=")[1].split("-")[0])
+            if start >= len(body):
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        self.wfile.write(body[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+    server.files = {"/a.zip": get_zip("N45E006.hgt"), "/b.zip": get_zip("N46E006.hgt")}
+    server.ranges = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def dem_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "dem_path", tmp_path)
+    yield tmp_path
+
+
+def get_urls(http_server, names):
+    host, port = http_server.server_address
+    return [{"folder": name, "size": len(http_server.files.get(f"/{name}", b"")),
+             "link": f"http://{host}:{port}/{name}"} for name in names]
+
+
+class TestDownloadHelper:
+    def test_fetch_urls(self, http_server, dem_path):
+        progress = []
+        urls = get_urls(http_server, ["a.zip", "b.zip"])
+        download_helper = DownloadHelper(urls, progress_callback=lambda done, total: progress.append((done, total)))
+        download_helper.fetch_urls()
+
+        assert dem_path.joinpath("N45E006.hgt").read_bytes() == bytes(range(256)) * 64
+        assert dem_path.joinpath("N46E006.hgt").is_file()
+        assert not list(dem_path.glob("*.zip*"))
+        assert max(progress) == (sum(url["size"] for url in urls),) * 2
+
+    def test_resume(self, http_server, dem_path):
+        urls = get_urls(http_server, ["a.zip"])
+        zip_path = DownloadHelper._get_zip_path(urls[0]["link"], urls[0]["folder"])
+        zip_path.with_name(zip_path.name + ".part").write_bytes(http_server.files["/a.zip"][:100])
+
+        DownloadHelper(urls).fetch_urls()
+
+        assert http_server.ranges == ["bytes=100-"]
+        assert dem_path.joinpath("N45E006.hgt").read_bytes() == bytes(range(256)) * 64
+
+    def test_missing_url(self, http_server, dem_path):
+        DownloadHelper(get_urls(http_server, ["c.zip"])).fetch_urls()
+        assert not list(dem_path.iterdir())
@@ -0,0 +1,59 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+import gpxpy.gpx
+import pytest
+
+from pygpxviewer.helpers.gpxcache import GpxCache
+
+
+@pytest.fixture
+def gpx_cache():
+    GpxCache.clear()
+    yield GpxCache(max_size=1000)
+    GpxCache.clear()
+
+
+class TestGpxCache:
+    def test_get(self, gpx_cache):
+        gpx = gpxpy.gpx.GPX()
+        gpx_cache.put("path_01", (10, 100), gpx)
+        entry = gpx_cache.get("path_01", (10, 100))
+        assert entry.gpx is gpx
+        assert entry.track is None
+
+    def test_get_outdated(self, gpx_cache):
+        gpx_cache.put("path_01", (10, 100), gpxpy.gpx.GPX())
+        assert gpx_cache.get("path_01", (20, 100)) is None
+        assert gpx_cache.get("path_01", (10, 100)) is None
+
+    def test_eviction(self, gpx_cache):
+        gpx_cache.put("path_01", (10, 80), gpxpy.gpx.GPX())
+        gpx_cache.put("path_02", (10, 80), gpxpy.gpx.GPX())
+        gpx_cache.get("path_01", (10, 80))
+        gpx_cache.put("path_03", (10, 80), gpxpy.gpx.GPX())
+        assert gpx_cache.get("path_01", (10, 80)) is not None
+        assert gpx_cache.get("path_02", (10, 80)) is None
+        assert gpx_cache.get("path_03", (10, 80)) is not None
+
+    def test_too_large(self, gpx_cache):
+        gpx_cache.put("path_01", (10, 1000), gpxpy.gpx.GPX())
+        assert gpx_cache.get("path_01", (10, 1000)) is None
@@ -0,0 +1,110 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+import gpxpy
+import pytest
+
+pytest.importorskip("gi")
+
+from pygpxviewer import config  # noqa: E402
+from pygpxviewer.helpers.gpxhelper import GpxHelper  # noqa: E402
+
+GPX_TRACK = b'<trk><trkseg><trkpt lat="45.0" lon="6.0"/><trkpt lat="45.1" lon="6.1"/></trkseg></trk>'
+
+
+@pytest.fixture
+def gpx_file(tmp_path):
+    def write(content):
+        path = tmp_path.joinpath("track.gpx")
+        path.write_bytes(content)
+        return path
+    yield write
+
+
+class TestGpxHelperMode:
+    @pytest.mark.parametrize("header", [
+        b'<metadata><name>name</name><keywords>1</keywords></metadata>',
+        b'<metadata><name>name</name><bounds minlat="45" minlon="6" maxlat="46" maxlon="7"/></metadata>',
+        b''
+    ])
+    def test_patch_keywords(self, gpx_file, header):
+        path = gpx_file(
+            b'<?xml version="1.0" encoding="UTF-8"?>\n'
+            b'<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="test">'
+            + header + GPX_TRACK + b'</gpx>')
+        gpx_helper = GpxHelper(str(path), use_cache=False)
+        assert gpx_helper._patch_gpx_keywords("0")
+
+        with open(path) as f:
+            gpx = gpxpy.parse(f)
+        assert gpx.keywords == "0"
+        assert gpx.get_track_points_no() == 2
+
+    def test_patch_keywords_gpx_1_0(self, gpx_file):
+        path = gpx_file(b'<gpx version="1.0" creator="test"><keywords>1</keywords>' + GPX_TRACK + b'</gpx>')
+        gpx_helper = GpxHelper(str(path), use_cache=False)
+        assert not gpx_helper._patch_gpx_keywords("0")
+
+        gpx_helper.set_gpx_mode(0)
+        assert GpxHelper(str(path), use_cache=False).get_gpx_mode() == 0
+
+
+class TestGpxHelperDetails:
+    def test_clean_attributes(self, gpx_file):
+        path = gpx_file(
+            b'<gpx xmlns="http://www.topografix.com/GPX/1/1" xmlns:ext="http://example.com/ext" version="1.1" '
+            b'creator="test"><wpt lat="45.0" lon="6.0"/><trk><name>name</name><number>1</number><trkseg>'
+            b'<trkpt lat="45.0" lon="6.0"><time>2022-01-01T00:00:00Z</time><extensions><ext:hr>100</ext:hr>'
+            b'</extensions></trkpt><trkpt lat="45.1" lon="6.1"/></trkseg></trk></gpx>')
+        gpx_helper = GpxHelper(str(path), use_cache=False)
+        gpx_helper.set_gpx_details(True, True, False, False)
+
+        content = path.read_text()
+        for node in ["<wpt", "<number>", "<time>", "<extensions>", "http://example.com/ext"]:
+            assert node not in content
+        with open(path) as f:
+            gpx = gpxpy.parse(f)
+        assert gpx.get_track_points_no() == 2
+        assert gpx.creator == "pygpxviewer"
+
+    def test_release_gpx(self, gpx_file):
+        path = gpx_file(
+            b'<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="test">'
+            b'<metadata><name>name</name><keywords>1</keywords></metadata>' + GPX_TRACK + b'</gpx>')
+        gpx_helper = GpxHelper(str(path), use_cache=False)
+        gpx_helper.release_gpx()
+
+        assert gpx_helper._gpx is None
+        assert gpx_helper.get_gpx_details()[1:3] == (1, 2)
+        assert gpx_helper.get_gpx_metadata() == ("name", None, "1")
+        assert gpx_helper._gpx is None
+
+    def test_elevations_without_download(self, gpx_file, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "dem_path", tmp_path)
+        monkeypatch.setattr(GpxHelper, "fetch_hgt_files", staticmethod(lambda hgt_files: pytest.fail("downloaded")))
+        path = gpx_file(b'<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="test">'
+                        + GPX_TRACK + b'</gpx>')
+        gpx_helper = GpxHelper(str(path), use_cache=False)
+        gpx_helper.set_gpx_details(False, False, True, False, download_hgt_files=False)
+
+        with open(path) as f:
+            gpx = gpxpy.parse(f)
+        assert [point.elevation for point in gpx.walk(only_points=True)] == [None, None]
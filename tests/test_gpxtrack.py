@@ -0,0 +1,149 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import math
+
+import numpy as np
+import pytest
+
+from pygpxviewer.helpers.gpxtrack import (EARTH_RADIUS, GpxTrack, get_douglas_peucker_significances,
+                                          get_min_max_indices, get_uphill_downhill, haversine_distances)
+
+ONE_DEGREE = 2 * math.pi * EARTH_RADIUS / 360
+
+
+@pytest.fixture
+def gpx_track():
+    latitudes = np.array([45.0, 45.001, 45.002, 45.010, 45.011])
+    longitudes = np.array([6.0, 6.0, 6.0, 6.0, 6.0])
+    elevations = np.array([1000.0, np.nan, 1010.0, 1020.0, 1000.0])
+    times = np.full(5, np.nan)
+    yield GpxTrack(latitudes, longitudes, elevations, times, np.array([0, 3]))
+
+
+class TestGpxTrack:
+    def test_haversine_distances(self):
+        distances = haversine_distances(np.array([45.0]), np.array([6.0]), np.array([46.0]), np.array([6.0]))
+        assert distances[0] == pytest.approx(ONE_DEGREE)
+
+    def test_uphill_downhill(self):
+        up_hill, down_hill = get_uphill_downhill(np.array([100.0, 110.0, np.nan, 120.0, 100.0]))
+        assert up_hill == pytest.approx(11.0)
+        assert down_hill == pytest.approx(11.0)
+
+    def test_distances(self, gpx_track):
+        assert len(gpx_track) == 5
+        assert gpx_track.distances[0] == 0.0
+        assert gpx_track.distances_2d[2] == pytest.approx(0.002 * ONE_DEGREE)
+        # Segments are not linked together
+        assert gpx_track.distances[3] == gpx_track.distances[2]
+        assert gpx_track.length_3d == pytest.approx(gpx_track.distances[2] + math.hypot(0.001 * ONE_DEGREE, 20))
+
+    def test_stats(self, gpx_track):
+        stats = gpx_track.get_stats()
+        assert stats.points == 5
+        assert stats.min_elevation == 1000.0
+        assert stats.max_elevation == 1020.0
+        assert stats.up_hill == pytest.approx(10.0)
+        assert stats.down_hill == pytest.approx(20.0)
+        assert stats.bounds == (45.0, 6.0, 45.011, 6.0)
+
+    def test_empty_stats(self):
+        empty = np.array([])
+        stats = GpxTrack(empty, empty, empty, empty).get_stats()
+        assert stats.points == 0
+        assert stats.bounds is None
+
+    def test_get_location(self, gpx_track):
+        assert gpx_track.get_location(-1.0) == (45.0, 6.0)
+        assert gpx_track.get_location(1e9) == (45.011, 6.0)
+        latitude, longitude = gpx_track.get_location(gpx_track.distances_2d[1] / 2)
+        assert latitude == pytest.approx(45.0005)
+        assert longitude == 6.0
+        # No interpolation between two segments
+        assert gpx_track.get_location(gpx_track.distances[2]) == (45.010, 6.0)
+
+
+class TestGpxTrackLevelOfDetail:
+    def test_significances(self):
+        x = np.array([0.0, 1.0, 2.0, 3.0, 4.0])
+        y = np.array([0.0, 0.1, 0.0, 2.0, 0.0])
+        significances = get_douglas_peucker_significances(x, y, np.array([0]))
+        assert np.isinf(significances[[0, 4]]).all()
+        assert significances[3] == pytest.approx(2.0)
+        assert significances[1] == pytest.approx(0.1)
+        assert significances[2] <= significances[3]
+
+    def test_significances_segments(self):
+        x = np.arange(6, dtype=float)
+        y = np.zeros(6)
+        significances = get_douglas_peucker_significances(x, y, np.array([0, 3]))
+        assert np.isinf(significances[[0, 2, 3, 5]]).all()
+        assert (significances[[1, 4]] == 0).all()
+
+    def test_lod_pyramid(self):
+        size = 1000
+        latitudes = 45 + 0.1 * np.sin(np.linspace(0, 20, size))
+        longitudes = np.linspace(6, 7, size)
+        track = GpxTrack(latitudes, longitudes, np.full(size, np.nan), np.full(size, np.nan))
+        pyramid = track.get_lod_pyramid(18)
+        assert len(pyramid) == 19
+        assert pyramid[0].tolist() == [0, size - 1]
+        for lower, higher in zip(pyramid, pyramid[1:]):
+            assert np.isin(lower, higher).all()
+        assert len(pyramid[18]) > len(pyramid[8])
+
+    def test_simplified_indices(self):
+        size = 1000
+        latitudes = 45 + 0.01 * np.sin(np.linspace(0, 20, size))
+        longitudes = np.linspace(6, 6.1, size)
+        track = GpxTrack(latitudes, longitudes, np.full(size, np.nan), np.full(size, np.nan), np.array([0, 500]))
+        indices = track.get_simplified_indices(5)
+        assert 4 < len(indices) < size
+        assert np.isin([0, 499, 500, size - 1], indices).all()
+        assert np.isin(indices, track.get_simplified_indices(1)).all()
+
+        # The budget keeps the most significant points
+        budget = track.get_simplified_indices(0, 50)
+        assert len(budget) == 50
+        assert np.isin([0, 499, 500, size - 1], budget).all()
+        assert track.get_simplified_indices(0, 2).tolist() == [0, 499, 500, size - 1]
+        assert np.array_equal(track.get_simplified_indices(1000, 50), track.get_simplified_indices(1000))
+
+
+def test_min_max_indices():
+    x = np.linspace(0, 10, 10001)
+    y = np.sin(x * 7)
+    y[5000:5100] = np.nan
+    indices = get_min_max_indices(x, y, 0, 10, 100)
+    assert len(indices) <= 2 * 102
+    assert indices[0] == 0 and indices[-1] == x.size - 1
+    assert np.nanmax(y[indices]) == np.nanmax(y)
+    assert np.nanmin(y[indices]) == np.nanmin(y)
+
+    # Zoom keeps the points surrounding the visible range
+    indices = get_min_max_indices(x, y, 2, 3, 100)
+    assert x[indices[0]] < 2 and x[indices[-1]] > 3
+    assert len(indices) <= 2 * 102
+
+    # Sparse ranges are not decimated
+    assert get_min_max_indices(x, y, 2, 2.0105, 100).tolist() == list(range(1999, 2012))
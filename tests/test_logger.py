@@ -0,0 +1,72 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+import inspect
+
+import pytest
+
+pytest.importorskip("gi")
+
+from gi.repository import GLib  # noqa: E402
+
+from pygpxviewer import logger as logger_module  # noqa: E402
+from pygpxviewer.logger import Logger  # noqa: E402
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    messages = []
+    monkeypatch.setattr(logger_module.GLib, "log_variant",
+                        lambda domain, level, variant: messages.append(variant.unpack()))
+    monkeypatch.setattr(Logger, "_level", GLib.LogLevelFlags.LEVEL_MESSAGE)
+    yield messages
+    Logger.set_async(False)
+
+
+class TestLogger:
+    def test_level_threshold(self, messages):
+        logger = Logger()
+        logger.debug("dropped %s", object())
+        logger.info("dropped")
+        logger.warning("kept %d", 1)
+        line = inspect.currentframe().f_lineno - 1
+        assert [message["MESSAGE"] for message in messages] == [f"(test_logger.py, test_level_threshold, {line}) kept 1"]
+
+        Logger.set_level(GLib.LogLevelFlags.LEVEL_DEBUG)
+        logger.debug("kept %s", "too")
+        assert messages[-1]["CODE_FUNC"] == "test_level_threshold"
+        assert messages[-1]["MESSAGE"].endswith("kept too")
+
+    def test_async(self, messages):
+        logger = Logger()
+        Logger.set_async(True)
+        for index in range(100):
+            logger.message("message %d", index)
+        Logger.set_async(False)
+        assert [message["MESSAGE"] for message in messages] == [f"message {index}" for index in range(100)]
+
+    def test_async_bad_message(self, messages):
+        logger = Logger()
+        Logger.set_async(True)
+        logger.message("bad %d", "format")
+        logger.message("kept")
+        Logger.set_async(False)
+        assert [message["MESSAGE"] for message in messages] == ["kept"]
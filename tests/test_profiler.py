@@ -0,0 +1,72 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Vincent Cottineau
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+import json
+
+import pytest
+
+from pygpxviewer.profiler import Histogram, Profiler
+
+
+@pytest.fixture
+def profiler():
+    Profiler.clear()
+    yield Profiler
+    Profiler.clear()
+
+
+class TestProfiler:
+    def test_histogram(self):
+        histogram = Histogram("s", window=100)
+        for value in range(1, 201):
+            histogram.add(float(value))
+        summary = histogram.get_summary()
+        assert summary["count"] == 200
+        assert summary["total"] == sum(range(1, 201))
+        # Percentiles are computed on the last samples only
+        assert summary["min"] == 101
+        assert summary["p50"] == 150
+        assert summary["p95"] == 195
+        assert summary["max"] == 200
+        assert Histogram("s").get_summary() == {"unit": "s", "count": 0, "total": 0.0}
+
+    def test_span(self, profiler):
+        @profiler.span("test.function")
+        def function():
+            return 42
+
+        assert function() == 42
+        assert function() == 42
+        with pytest.raises(ValueError):
+            with profiler.span("test.block"):
+                raise ValueError()
+
+        summaries = profiler.get_summaries()
+        assert list(summaries) == ["test.block", "test.function"]
+        assert summaries["test.function"]["count"] == 2
+        assert summaries["test.block"]["unit"] == "s"
+
+    def test_dump(self, profiler, tmp_path):
+        profiler.record("download.speed", 1000.0, "B/s")
+        profiler.dump(tmp_path.joinpath("profile.json"))
+        summaries = json.loads(tmp_path.joinpath("profile.json").read_text())
+        assert summaries["download.speed"]["unit"] == "B/s"
+        assert summaries["download.speed"]["mean"] == 1000.0
@@ -19,9 +19,6 @@
 #  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
-import sqlite3
-from contextlib import contextmanager
-
 import pytest
 
 from pygpxviewer.helpers.sqlitehelper import SQLiteHelper
@@ -29,19 +26,13 @@ from pygpxviewer.helpers.sqlitehelper import SQLiteHelper
 
 class SQLiteHelperInMemory(SQLiteHelper):
 
+    _db_file = "tests/test_sqlitehelper.db"
+
     def __init__(self):
         super().__init__()
 
         self.clear_gpx_records()
 
-    @contextmanager
-    def _db_cur(self):
-        conn = sqlite3.connect("tests/test_sqlitehelper.db")
-        cur = conn.cursor()
-        yield cur
-        conn.commit()
-        conn.close()
-
 
 @pytest.fixture
 def sqlite_helper_with_record():
@@ -100,3 +91,163 @@ class TestSQLiteHelper:
         assert records[0][4] == 50.0
         assert records[0][5] == 200.0
         assert records[0][6] == 200.0
+
+    def test_upsert_records(self, sqlite_helper_with_record):
+        sqlite_helper_with_record.upsert_gpx_records(
+            [
+                ("path_01", 1, 200, 50.0, 200.0, 200.0, 10, 1000, None, "name_01", None, "1", None, None, None, None),
+                ("path_02", 0, 100, 25.0, 100.0, 100.0, 20, 2000, "hash", "name_02", "description", "0",
+                 45.0, 6.0, 46.0, 7.0)
+            ])
+        records = sqlite_helper_with_record.get_gpx_records()
+        assert len(records) == 2
+        assert records[0][0] == 1
+        assert records[0][2] == 1
+        assert records[0][3] == 200
+
+    def test_search_records_metadata(self, sqlite_helper_with_records):
+        sqlite_helper_with_records.upsert_gpx_records(
+            [
+                ("path_02", 0, 200, 50.0, 200.0, 200.0, 20, 2000, None, "Mont Blanc", "Chamonix loop", "1",
+                 45.0, 6.0, 46.0, 7.0)
+            ])
+        records = sqlite_helper_with_records.search_gpx_records("chamonix blanc")
+        assert len(records) == 1
+        assert records[0][1] == "path_02"
+
+    def test_search_records_mixed_terms(self, sqlite_helper_with_records):
+        sqlite_helper_with_records.upsert_gpx_records(
+            [
+                ("path_02", 0, 200, 50.0, 200.0, 200.0, 20, 2000, None, "Mont Blanc", "Chamonix loop", "1",
+                 45.0, 6.0, 46.0, 7.0)
+            ])
+        records = sqlite_helper_with_records.search_gpx_records("_02 blanc")
+        assert [record[1] for record in records] == ["path_02"]
+        assert not sqlite_helper_with_records.search_gpx_records("blanc _01")
+        assert sqlite_helper_with_records.count_gpx_records("blanc _02") == 1
+
+    def test_search_records_short_terms(self, sqlite_helper_with_records):
+        records = sqlite_helper_with_records.search_gpx_records("_0")
+        assert len(records) == 2
+        records = sqlite_helper_with_records.search_gpx_records("%")
+        assert len(records) == 0
+
+    def test_search_records_limit(self, sqlite_helper_with_records):
+        records = sqlite_helper_with_records.search_gpx_records("path", limit=1)
+        assert len(records) == 1
+
+    def test_search_pois_records(self):
+        sqlite_helper = SQLiteHelperInMemory()
+        with sqlite_helper._db_cur() as cur:
+            cur.execute("DROP TABLE IF EXISTS poi_rtree")
+            cur.execute("DROP TABLE IF EXISTS poi")
+            cur.execute("""
+                CREATE TABLE poi (
+                    id INTEGER PRIMARY KEY, name TEXT, type TEXT, link TEXT, lat REAL, lng REAL
+                )
+            """)
+            cur.executemany(
+                "INSERT INTO poi(name, type, link, lat, lng) VALUES(?, ?, ?, ?, ?)",
+                [
+                    ("poi_01", "refuge", "link_01", 45.5, 6.5),
+                    ("poi_02", "water", "link_02", 45.6, 6.6),
+                    ("poi_03", "hut", "link_03", 47.0, 8.0)
+                ])
+
+        sqlite_helper = SQLiteHelperInMemory()
+        records = sqlite_helper.search_pois_records((45.0, 6.0, 46.0, 7.0))
+        assert sorted(record[1] for record in records) == ["poi_01", "poi_02"]
+        assert sqlite_helper.search_pois_records((0.0, 0.0, 1.0, 1.0)) == []
+
+    def test_update_mode(self, sqlite_helper_with_record):
+        sqlite_helper_with_record.update_gpx_mode("path_01", 1, (10, 1000, None))
+        records = sqlite_helper_with_record.get_gpx_records()
+        assert records[0][2] == 1
+        assert sqlite_helper_with_record.get_gpx_fingerprints() == {"path_01": (10, 1000, None)}
+
+    def test_get_bounds(self, sqlite_helper_with_record):
+        sqlite_helper_with_record.upsert_gpx_records(
+            [
+                ("path_02", 0, 100, 25.0, 100.0, 100.0, 20, 2000, None, None, None, None, 45.0, 6.0, 46.0, 7.0)
+            ])
+        assert sqlite_helper_with_record.get_gpx_bounds() == {"path_01": None, "path_02": (45.0, 6.0, 46.0, 7.0)}
+        assert sqlite_helper_with_record.get_gpx_bounds(["path_02"]) == {"path_02": (45.0, 6.0, 46.0, 7.0)}
+
+    def test_get_fingerprints(self, sqlite_helper_with_record):
+        sqlite_helper_with_record.update_gpx_fingerprint("path_01", (10, 1000, "hash"))
+        fingerprints = sqlite_helper_with_record.get_gpx_fingerprints()
+        assert fingerprints == {"path_01": (10, 1000, "hash")}
+
+    def test_delete_records(self, sqlite_helper_with_records):
+        sqlite_helper_with_records.delete_gpx_records(["path_01"])
+        records = sqlite_helper_with_records.get_gpx_records()
+        assert len(records) == 1
+        assert records[0][1] == "path_02"
+
+    def test_get_records_by_paths(self, sqlite_helper_with_records):
+        records = sqlite_helper_with_records.get_gpx_records_by_paths(["path_02"])
+        assert len(records) == 1
+        assert records[0][1] == "path_02"
+
+    def test_transaction(self, sqlite_helper_with_record):
+        with pytest.raises(RuntimeError):
+            with sqlite_helper_with_record.transaction():
+                sqlite_helper_with_record.add_gpx_record(("path_02", 0, 100, 25.0, 100.0, 100.0))
+                raise RuntimeError
+        records = sqlite_helper_with_record.get_gpx_records()
+        assert len(records) == 1
+
+    def test_wal_mode(self, sqlite_helper_with_record):
+        with sqlite_helper_with_record._db_cur() as cur:
+            cur.execute("PRAGMA journal_mode")
+            assert cur.fetchone()[0] == "wal"
+
+    def test_count_records(self, sqlite_helper_with_records):
+        assert sqlite_helper_with_records.count_gpx_records() == 2
+        assert sqlite_helper_with_records.count_gpx_records("path_02") == 1
+        assert sqlite_helper_with_records.count_gpx_records("_0") == 2
+
+    def test_get_records_page(self, sqlite_helper_with_records):
+        sqlite_helper_with_records.add_gpx_record(("path_03", 1, 150, 10.0, 50.0, 50.0))
+        records = sqlite_helper_with_records.get_gpx_records_page("points", limit=2)
+        assert [record[1] for record in records] == ["path_01", "path_03"]
+        after = (records[-1][3], records[-1][0])
+        records = sqlite_helper_with_records.get_gpx_records_page("points", after=after, limit=2)
+        assert [record[1] for record in records] == ["path_02"]
+        records = sqlite_helper_with_records.get_gpx_records_page("points", offset=2, limit=2)
+        assert [record[1] for record in records] == ["path_02"]
+
+    def test_get_records_page_descending(self, sqlite_helper_with_records):
+        records = sqlite_helper_with_records.get_gpx_records_page("length", descending=True, limit=1)
+        assert records[0][1] == "path_02"
+        after = (records[0][4], records[0][0])
+        records = sqlite_helper_with_records.get_gpx_records_page("length", descending=True, after=after)
+        assert [record[1] for record in records] == ["path_01"]
+
+    def test_get_records_page_search(self, sqlite_helper_with_records):
+        records = sqlite_helper_with_records.get_gpx_records_page(search_entry="path_02")
+        assert [record[1] for record in records] == ["path_02"]
+        with pytest.raises(ValueError):
+            sqlite_helper_with_records.get_gpx_records_page("name")
+
+    def test_get_records_positions(self, sqlite_helper_with_records):
+        sqlite_helper_with_records.add_gpx_record(("path_03", 1, 150, 10.0, 50.0, 50.0))
+        ids = {record[1]: record[0] for record in sqlite_helper_with_records.get_gpx_records()}
+        assert sqlite_helper_with_records.get_gpx_records_positions([ids["path_03"]], "points") == [1]
+        assert sqlite_helper_with_records.get_gpx_records_positions(
+            [ids["path_01"], ids["path_03"]], "points", descending=True) == [1, 2]
+        assert sqlite_helper_with_records.get_gpx_records_positions(
+            [ids["path_01"], ids["path_03"]], search_entry="path_03") == [0]
+        assert sqlite_helper_with_records.get_gpx_records_positions([]) == []
+
+    def test_gpx_errors(self, sqlite_helper_with_record):
+        sqlite_helper_with_record.upsert_gpx_errors([("path_02", (1, 10, None)), ("path_03", (2, 20, None))])
+        assert sqlite_helper_with_record.get_gpx_errors() == {"path_02": (1, 10), "path_03": (2, 20)}
+        sqlite_helper_with_record.delete_gpx_errors(["path_03"])
+        assert sqlite_helper_with_record.get_gpx_errors() == {"path_02": (1, 10)}
+        sqlite_helper_with_record.upsert_gpx_records(
+            [("path_02", 0, 100, 25.0, 100.0, 100.0, 1, 10, None, None, None, None, None, None, None, None)])
+        assert sqlite_helper_with_record.get_gpx_errors() == {}
+        sqlite_helper_with_record.upsert_gpx_errors([("path_03", (2, 20, None))])
+        sqlite_helper_with_record.clear_gpx_records()
+        assert sqlite_helper_with_record.get_gpx_errors() == {}